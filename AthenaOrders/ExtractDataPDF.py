@@ -4,7 +4,7 @@ import os
 import CommonUtil as cu
 import openpyxl
 import pandas as pd
-import pdfplumber
+import pdf_text
 
 
 def bulkOrderOpening(reportFolderName):
@@ -65,55 +65,61 @@ def extract_pdf(pdf_order):
         mrn=""
         npi=""
         DOB=""
-        with pdfplumber.open(pdf_order) as pdf:
-            for page in pdf.pages:
-                if mrn and start_date and end_date:
+        for text in pdf_text.page_texts(pdf_order):
+            if mrn and start_date and end_date:
+                break
+            # text=text.replace('\n','')
+            print(text)
+            patterns = [r'NPI: (\d+)', r'NPI #(\d+)']
+            for pattern in patterns:
+                match = re.search(pattern, text)
+                if match:
+                    npi = match.group(1) 
                     break
-                text = page.extract_text()
-                # text=text.replace('\n','')
-                print(text)
-                patterns = [r'NPI: (\d+)', r'NPI #(\d+)']
-                for pattern in patterns:
-                    match = re.search(pattern, text)
-                    if match:
-                        npi = match.group(1) 
-                        break
-                pattern = r'DOB: (\d{1,2}/\d{1,2}/\d{4})'
+            pattern = r'DOB: (\d{1,2}/\d{1,2}/\d{4})'
+            match = re.search(pattern, text)
+            if match:
+                DOB = match.group(1)
+            patterns = [r'MR#: (\d+)', r'MRN#: (\d+)', r'MRN: (\d+)', r'MR: (\d+)', r'MRN #(\d+)', r'MR #(\d+)', r'MR: (\w+)', r'MRN: (\w+)', r'MR:(\w+)', r'MRN:(\w+)']
+            for pattern in patterns:
                 match = re.search(pattern, text)
                 if match:
-                    DOB = match.group(1)
-                patterns = [r'MR#: (\d+)', r'MRN#: (\d+)', r'MRN: (\d+)', r'MR: (\d+)', r'MRN #(\d+)', r'MR #(\d+)', r'MR: (\w+)', r'MRN: (\w+)', r'MR:(\w+)', r'MRN:(\w+)']
-                for pattern in patterns:
-                    match = re.search(pattern, text)
-                    if match:
-                        mrn = match.group(1) 
-                        if start_date=="":
-                            patternDate = r'(\d{1,2}/\d{1,2}/\d{4}) - (\d{1,2}/\d{1,2}/\d{4})'
+                    mrn = match.group(1) 
+                    if start_date=="":
+                        patternDate = r'(\d{1,2}/\d{1,2}/\d{4}) - (\d{1,2}/\d{1,2}/\d{4})'
+                        match = re.search(patternDate, text)
+                        if match:
+                            start_date = match.group(1)
+                            end_date = match.group(2)
+                            break 
+                        else:
+                            patternDate = r'(\d{1,2}/\d{1,2}/\d{4})-(\d{1,2}/\d{1,2}/\d{4})'
                             match = re.search(patternDate, text)
                             if match:
                                 start_date = match.group(1)
                                 end_date = match.group(2)
                                 break 
                             else:
-                                patternDate = r'(\d{1,2}/\d{1,2}/\d{4})-(\d{1,2}/\d{1,2}/\d{4})'
-                                match = re.search(patternDate, text)
+                                pattern = r'Episode Start Date: (\d{1,2}/\d{1,2}/\d{4})'
+                                match = re.search(pattern, text)
                                 if match:
                                     start_date = match.group(1)
-                                    end_date = match.group(2)
-                                    break 
-                                else:
-                                    pattern = r'Episode Start Date: (\d{1,2}/\d{1,2}/\d{4})'
-                                    match = re.search(pattern, text)
-                                    if match:
-                                        start_date = match.group(1)
-                                    pattern = r'Episode End Date: (\d{1,2}/\d{1,2}/\d{4})'
-                                    match = re.search(pattern, text)
-                                    if match:
-                                        end_date = match.group(1)
-                                        break
+                                pattern = r'Episode End Date: (\d{1,2}/\d{1,2}/\d{4})'
+                                match = re.search(pattern, text)
+                                if match:
+                                    end_date = match.group(1)
+                                    break
                                 
-                if not mrn:
-                    pattern = r'(\d{1,2}/\d{1,2}/\d{4}) - (\d{1,2}/\d{1,2}/\d{4}) (\d+)'
+            if not mrn:
+                pattern = r'(\d{1,2}/\d{1,2}/\d{4}) - (\d{1,2}/\d{1,2}/\d{4}) (\d+)'
+                match = re.search(pattern, text)
+                if match:
+                    start_date = match.group(1)
+                    end_date = match.group(2)
+                    mrn = match.group(3)
+                    break
+                else:
+                    pattern = r'(\d{1,2}/\d{1,2}/\d{4})-(\d{1,2}/\d{1,2}/\d{4}) (\d+)'
                     match = re.search(pattern, text)
                     if match:
                         start_date = match.group(1)
@@ -121,7 +127,7 @@ def extract_pdf(pdf_order):
                         mrn = match.group(3)
                         break
                     else:
-                        pattern = r'(\d{1,2}/\d{1,2}/\d{4})-(\d{1,2}/\d{1,2}/\d{4}) (\d+)'
+                        pattern = r'(\d{1,2}/\d{1,2}/\d{4})-(\d{1,2}/\d{1,2}/\d{4}) (\d+-\d+)'
                         match = re.search(pattern, text)
                         if match:
                             start_date = match.group(1)
@@ -129,23 +135,15 @@ def extract_pdf(pdf_order):
                             mrn = match.group(3)
                             break
                         else:
-                            pattern = r'(\d{1,2}/\d{1,2}/\d{4})-(\d{1,2}/\d{1,2}/\d{4}) (\d+-\d+)'
+                            pattern = r'Episode Start Date: (\d{1,2}/\d{1,2}/\d{4})'
                             match = re.search(pattern, text)
                             if match:
                                 start_date = match.group(1)
-                                end_date = match.group(2)
-                                mrn = match.group(3)
+                            pattern = r'Episode End Date: (\d{1,2}/\d{1,2}/\d{4})'
+                            match = re.search(pattern, text)
+                            if match:
+                                end_date = match.group(1)
                                 break
-                            else:
-                                pattern = r'Episode Start Date: (\d{1,2}/\d{1,2}/\d{4})'
-                                match = re.search(pattern, text)
-                                if match:
-                                    start_date = match.group(1)
-                                pattern = r'Episode End Date: (\d{1,2}/\d{1,2}/\d{4})'
-                                match = re.search(pattern, text)
-                                if match:
-                                    end_date = match.group(1)
-                                    break
                 
         return start_date,end_date,mrn,npi,DOB
     except Exception as e:
@@ -159,54 +157,60 @@ def extract_and_rename_pdf(pdf_order,order_no,patient_name,document_name):
     npi=""
     DOB=""
     patientFName=patient_name.split(',')[1].strip()
-    with pdfplumber.open(pdf_order) as pdf:
-        for page in pdf.pages:
-            if mrn and start_date and end_date:
-                break
-            text = page.extract_text()
-            # print(text)
-            if patientFName in text and "Auto-Generated" in document_name and "Auto-Generated" in text:
-                patterns = [r'NPI: (\d+)', r'NPI #(\d+)']
-                for pattern in patterns:
-                    match = re.search(pattern, text)
-                    if match:
-                        npi = match.group(1) 
-                        break
-                pattern = r'DOB: (\d{1,2}/\d{1,2}/\d{4})'
+    for text in pdf_text.page_texts(pdf_order):
+        if mrn and start_date and end_date:
+            break
+        # print(text)
+        if patientFName in text and "Auto-Generated" in document_name and "Auto-Generated" in text:
+            patterns = [r'NPI: (\d+)', r'NPI #(\d+)']
+            for pattern in patterns:
                 match = re.search(pattern, text)
                 if match:
-                    DOB = match.group(1)
-                patterns = [r'MR#: (\d+)', r'MRN#: (\d+)', r'MRN: (\d+)', r'MR: (\d+)', r'MRN #(\d+)', r'MR #(\d+)', r'MR: (\w+)', r'MRN: (\w+)', r'MR:(\w+)', r'MRN:(\w+)']
-                for pattern in patterns:
-                    match = re.search(pattern, text)
-                    if match:
-                        mrn = match.group(1) 
-                        if start_date=="":
-                            patternDate = r'(\d{1,2}/\d{1,2}/\d{4}) - (\d{1,2}/\d{1,2}/\d{4})'
+                    npi = match.group(1) 
+                    break
+            pattern = r'DOB: (\d{1,2}/\d{1,2}/\d{4})'
+            match = re.search(pattern, text)
+            if match:
+                DOB = match.group(1)
+            patterns = [r'MR#: (\d+)', r'MRN#: (\d+)', r'MRN: (\d+)', r'MR: (\d+)', r'MRN #(\d+)', r'MR #(\d+)', r'MR: (\w+)', r'MRN: (\w+)', r'MR:(\w+)', r'MRN:(\w+)']
+            for pattern in patterns:
+                match = re.search(pattern, text)
+                if match:
+                    mrn = match.group(1) 
+                    if start_date=="":
+                        patternDate = r'(\d{1,2}/\d{1,2}/\d{4}) - (\d{1,2}/\d{1,2}/\d{4})'
+                        match = re.search(patternDate, text)
+                        if match:
+                            start_date = match.group(1)
+                            end_date = match.group(2)
+                            break 
+                        else:
+                            patternDate = r'(\d{1,2}/\d{1,2}/\d{4})-(\d{1,2}/\d{1,2}/\d{4})'
                             match = re.search(patternDate, text)
                             if match:
                                 start_date = match.group(1)
                                 end_date = match.group(2)
                                 break 
                             else:
-                                patternDate = r'(\d{1,2}/\d{1,2}/\d{4})-(\d{1,2}/\d{1,2}/\d{4})'
-                                match = re.search(patternDate, text)
+                                pattern = r'Episode Start Date: (\d{1,2}/\d{1,2}/\d{4})'
+                                match = re.search(pattern, text)
                                 if match:
                                     start_date = match.group(1)
-                                    end_date = match.group(2)
-                                    break 
-                                else:
-                                    pattern = r'Episode Start Date: (\d{1,2}/\d{1,2}/\d{4})'
-                                    match = re.search(pattern, text)
-                                    if match:
-                                        start_date = match.group(1)
-                                    pattern = r'Episode End Date: (\d{1,2}/\d{1,2}/\d{4})'
-                                    match = re.search(pattern, text)
-                                    if match:
-                                        end_date = match.group(1)
-                                    break
-                if not mrn:
-                    pattern = r'(\d{1,2}/\d{1,2}/\d{4}) - (\d{1,2}/\d{1,2}/\d{4}) (\d+)'
+                                pattern = r'Episode End Date: (\d{1,2}/\d{1,2}/\d{4})'
+                                match = re.search(pattern, text)
+                                if match:
+                                    end_date = match.group(1)
+                                break
+            if not mrn:
+                pattern = r'(\d{1,2}/\d{1,2}/\d{4}) - (\d{1,2}/\d{1,2}/\d{4}) (\d+)'
+                match = re.search(pattern, text)
+                if match:
+                    start_date = match.group(1)
+                    end_date = match.group(2)
+                    mrn = match.group(3)
+                    break
+                else:
+                    pattern = r'(\d{1,2}/\d{1,2}/\d{4})-(\d{1,2}/\d{1,2}/\d{4}) (\d+)'
                     match = re.search(pattern, text)
                     if match:
                         start_date = match.group(1)
@@ -214,7 +218,7 @@ def extract_and_rename_pdf(pdf_order,order_no,patient_name,document_name):
                         mrn = match.group(3)
                         break
                     else:
-                        pattern = r'(\d{1,2}/\d{1,2}/\d{4})-(\d{1,2}/\d{1,2}/\d{4}) (\d+)'
+                        pattern = r'(\d{1,2}/\d{1,2}/\d{4})-(\d{1,2}/\d{1,2}/\d{4}) (\d+-\d+)'
                         match = re.search(pattern, text)
                         if match:
                             start_date = match.group(1)
@@ -222,23 +226,15 @@ def extract_and_rename_pdf(pdf_order,order_no,patient_name,document_name):
                             mrn = match.group(3)
                             break
                         else:
-                            pattern = r'(\d{1,2}/\d{1,2}/\d{4})-(\d{1,2}/\d{1,2}/\d{4}) (\d+-\d+)'
+                            pattern = r'Episode Start Date: (\d{1,2}/\d{1,2}/\d{4})'
                             match = re.search(pattern, text)
                             if match:
                                 start_date = match.group(1)
-                                end_date = match.group(2)
-                                mrn = match.group(3)
-                                break
-                            else:
-                                pattern = r'Episode Start Date: (\d{1,2}/\d{1,2}/\d{4})'
-                                match = re.search(pattern, text)
-                                if match:
-                                    start_date = match.group(1)
-                                pattern = r'Episode End Date: (\d{1,2}/\d{1,2}/\d{4})'
-                                match = re.search(pattern, text)
-                                if match:
-                                    end_date = match.group(1)
-                                break
+                            pattern = r'Episode End Date: (\d{1,2}/\d{1,2}/\d{4})'
+                            match = re.search(pattern, text)
+                            if match:
+                                end_date = match.group(1)
+                            break
     directory, old_name = os.path.split(pdf_order)
     new_file_path = os.path.join(directory, str(order_no)+".pdf")
     os.rename(pdf_order, new_file_path)
@@ -1,4 +1,4 @@
-import requests
+import http_client
 import json
 import ReadConfig as rc
 
@@ -15,7 +15,7 @@ def getConfigData():
     endpoint = f"/api/Config/GetConfigDataByName/{rpaName}"
     api_endpoint = api_url + endpoint
     config_data = {}
-    response = requests.get(api_endpoint, headers=headers)
+    response = http_client.get(api_endpoint, headers=headers)
 
     if response.status_code == 200:
         data = response.json()
@@ -1,4 +1,4 @@
-import pdfplumber
+from pdf_text import extract_text, page_links
 import openpyxl
 import json
 import time
@@ -55,15 +55,9 @@ def get_efax_detail(credName, reportFolderName):
                     efaxdata = efaxdata.replace('\\', '/')
                     text=""
                     links=[]
-                    with pdfplumber.open(efaxdata) as pdf:
-                        for page in pdf.pages:
-                            text = page.extract_text()
-                            # print(text)
-                            annotations = page.annots
-                            links = [annot['uri'] for annot in annotations if annot['uri'] ]
-                            # for link in links:
-                            #     print(link)
-                            break
+                    # Only the first page of the eFax report is needed
+                    text = extract_text(efaxdata, max_pages=1)
+                    links = page_links(efaxdata, 0)
                     efax_list=[]
                     efax_list=extract_data(text, links)
                     for ef in efax_list:
@@ -19,7 +19,7 @@ from selenium.webdriver.support.ui import Select
 import calendar
 import pyautogui
 import CommonUtil as cu
-import requests
+import http_client
 
 def wait_and_find_element(driver, by, value, timeout=10):
     return WebDriverWait(driver, timeout).until(
@@ -165,5 +165,5 @@ def upload_doc_status(id, message):
     headers["X-SERVICE-KEY"] = api_key
     endpoint = "api/Efax/UpdateDocUploadStatus/" + id + "/" + message
     api_endpoint = api_url + endpoint
-    requests.put(api_endpoint, headers=headers)
+    http_client.put(api_endpoint, headers=headers)
         
\ No newline at end of file
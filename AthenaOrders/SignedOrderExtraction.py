@@ -20,7 +20,7 @@ import calendar
 import pyautogui
 import CommonUtil as cu
 import shutil
-import pdfplumber
+import pdf_text
 
 
 def wait_and_find_element(driver, by, value, timeout=10):
@@ -107,40 +107,46 @@ def extract_pdf(pdf_order):
         npi=""
         orderno=""
         signed_date=""
-        with pdfplumber.open(pdf_order) as pdf:
-            for page in pdf.pages:
-                if mrn and start_date and end_date:
-                    break
-                text = page.extract_text()
-                # text=text.replace('\n','')
-                print(text)
-                if not text:
-                    raise Exception("PDF is not readable!")
+        for text in pdf_text.page_texts(pdf_order):
+            if mrn and start_date and end_date:
+                break
+            # text=text.replace('\n','')
+            print(text)
+            if not text:
+                raise Exception("PDF is not readable!")
              
-                patterns = [r'Order#: (\d+)', r'Order: (\d+)', r'Order: #(\d+)', r'Order #(\d+)', r'Order# (\d+)']
-                for pattern in patterns:
-                    match = re.search(pattern, text)
-                    if match:
-                        orderno = match.group(1) 
-                        break
+            patterns = [r'Order#: (\d+)', r'Order: (\d+)', r'Order: #(\d+)', r'Order #(\d+)', r'Order# (\d+)']
+            for pattern in patterns:
+                match = re.search(pattern, text)
+                if match:
+                    orderno = match.group(1) 
+                    break
                 
-                patterns = [r'MR#: (\d+)', r'MRN#: (\d+)', r'MRN: (\d+)', r'MR: (\d+)', r'MRN #(\d+)', r'MR #(\d+)', r'MR: (\w+)', r'MRN: (\w+)', r'MR:(\w+)', r'MRN:(\w+)']
-                for pattern in patterns:
-                    match = re.search(pattern, text)
-                    if match:
-                        mrn = match.group(1) 
-                        break
+            patterns = [r'MR#: (\d+)', r'MRN#: (\d+)', r'MRN: (\d+)', r'MR: (\d+)', r'MRN #(\d+)', r'MR #(\d+)', r'MR: (\w+)', r'MRN: (\w+)', r'MR:(\w+)', r'MRN:(\w+)']
+            for pattern in patterns:
+                match = re.search(pattern, text)
+                if match:
+                    mrn = match.group(1) 
+                    break
 
-                patterns = [r'(\d{1,2}/\d{1,2}/\d{4}) - (\d{1,2}/\d{1,2}/\d{4})', r'(\d{1,2}/\d{1,2}/\d{4})-(\d{1,2}/\d{1,2}/\d{4})']
-                for pattern in patterns:
-                    match = re.search(pattern, text)
-                    if match:
-                        start_date = match.group(1)
-                        end_date = match.group(2)
-                        break
+            patterns = [r'(\d{1,2}/\d{1,2}/\d{4}) - (\d{1,2}/\d{1,2}/\d{4})', r'(\d{1,2}/\d{1,2}/\d{4})-(\d{1,2}/\d{1,2}/\d{4})']
+            for pattern in patterns:
+                match = re.search(pattern, text)
+                if match:
+                    start_date = match.group(1)
+                    end_date = match.group(2)
+                    break
                                 
-                if not mrn and not start_date and not end_date:
-                    pattern = r'(\d{1,2}/\d{1,2}/\d{4}) - (\d{1,2}/\d{1,2}/\d{4}) (\d+)'
+            if not mrn and not start_date and not end_date:
+                pattern = r'(\d{1,2}/\d{1,2}/\d{4}) - (\d{1,2}/\d{1,2}/\d{4}) (\d+)'
+                match = re.search(pattern, text)
+                if match:
+                    start_date = match.group(1)
+                    end_date = match.group(2)
+                    mrn = match.group(3)
+                    break
+                else:
+                    pattern = r'(\d{1,2}/\d{1,2}/\d{4})-(\d{1,2}/\d{1,2}/\d{4}) (\d+)'
                     match = re.search(pattern, text)
                     if match:
                         start_date = match.group(1)
@@ -148,7 +154,7 @@ def extract_pdf(pdf_order):
                         mrn = match.group(3)
                         break
                     else:
-                        pattern = r'(\d{1,2}/\d{1,2}/\d{4})-(\d{1,2}/\d{1,2}/\d{4}) (\d+)'
+                        pattern = r'(\d{1,2}/\d{1,2}/\d{4})-(\d{1,2}/\d{1,2}/\d{4}) (\d+-\d+)'
                         match = re.search(pattern, text)
                         if match:
                             start_date = match.group(1)
@@ -156,23 +162,15 @@ def extract_pdf(pdf_order):
                             mrn = match.group(3)
                             break
                         else:
-                            pattern = r'(\d{1,2}/\d{1,2}/\d{4})-(\d{1,2}/\d{1,2}/\d{4}) (\d+-\d+)'
+                            pattern = r'Episode Start Date: (\d{1,2}/\d{1,2}/\d{4})'
                             match = re.search(pattern, text)
                             if match:
                                 start_date = match.group(1)
-                                end_date = match.group(2)
-                                mrn = match.group(3)
+                            pattern = r'Episode End Date: (\d{1,2}/\d{1,2}/\d{4})'
+                            match = re.search(pattern, text)
+                            if match:
+                                end_date = match.group(1)
                                 break
-                            else:
-                                pattern = r'Episode Start Date: (\d{1,2}/\d{1,2}/\d{4})'
-                                match = re.search(pattern, text)
-                                if match:
-                                    start_date = match.group(1)
-                                pattern = r'Episode End Date: (\d{1,2}/\d{1,2}/\d{4})'
-                                match = re.search(pattern, text)
-                                if match:
-                                    end_date = match.group(1)
-                                    break
                 
         return start_date,end_date,mrn,npi,orderno,signed_date
     except Exception as e:
@@ -1,4 +1,5 @@
 import PyPDF2
+import pdf_text
 import re
 import os
 import shutil
@@ -24,13 +25,12 @@ def split_and_extract_info(reportFolderName):
     dfOrder = pd.read_excel(order_excel_path, skiprows=1)
 
 
+    # PyPDF2 is only used to copy pages into the split files; text comes from pdf_text (PyMuPDF)
     pdf_reader = PyPDF2.PdfReader(input_pdf_path)
-    total_pages = len(pdf_reader.pages)
+    page_texts = pdf_text.page_texts(input_pdf_path)
     order_ctr=1
     page_ctr=1
-    for page_num in range(total_pages):
-        page = pdf_reader.pages[page_num]
-        text = page.extract_text()
+    for page_num, text in enumerate(page_texts):
         text= text.replace('\n','')
         
         page_match = re.search(r'Page \d+ of \d+', text)
@@ -75,12 +75,7 @@ def get_order_number(text,dfOrder):
     return order_no
             
 def rename_pdf(pdf_path, df, split_folder):
-    pdf_reader = PyPDF2.PdfReader(pdf_path)
-    total_pages = len(pdf_reader.pages)
-    text=""
-    for page_num in range(total_pages):
-        page = pdf_reader.pages[page_num]
-        text = text + page.extract_text()
+    text = pdf_text.extract_text(pdf_path, separator="")
     order_number= get_order_number(text,df)
     if order_number:
         output_pdf_path = split_folder+"/"+str(order_number)+".pdf"
@@ -1,22 +1,59 @@
+"""
+Extract MRN / DOB / SOC / episode dates from DA documents with Azure Document Intelligence.
+
+Every analysis is stored per PDF (analysis_cache.py) and reused for the same PDF and
+model; --remap-only re-runs the key-value extraction and map_fields on the stored
+analyses without calling DA or Azure.
+
+With --leading-pages N (AZURE_LEADING_PAGES) only pages 1-N are analyzed first; the
+remaining pages are analyzed only when REQUIRED_FIELDS are still empty after
+map_fields (Azure bills per analyzed page).
+
+One AzureFieldExtractor (one DocumentIntelligenceClient) serves the whole run. Its
+requests.Session-based transport keeps a connection pool of --pool-size
+(AZURE_POOL_SIZE) connections, so TLS is negotiated once. A resource-details
+request at startup opens the first connection and checks the endpoint and key
+before any document is fetched.
+
+Azure calls do not go through http_client's per-host limiter, so analyze
+submissions take a token bucket at half the resource's transactions per second
+(--tps, AZURE_FORM_TPS) and the poller's status requests are spaced to stay
+within the other half, as in enhanced_medical_extractor.py.
+
+Usage:
+    python ai_extract_fields.py [input.csv] [--remap-only] [--leading-pages 2] [--pool-size 10] [--tps 15]
+"""
+import argparse
 import csv
 import io
 import os
 import sys
-import base64
-import time
 from datetime import datetime
 from typing import Dict, Optional
 
-import requests
 from dotenv import load_dotenv
 
+import requests
+from requests.adapters import HTTPAdapter
+
+import document_store
+from http_client import TokenBucket
+
 try:
     from azure.ai.documentintelligence import DocumentIntelligenceClient  # type: ignore
     from azure.core.credentials import AzureKeyCredential  # type: ignore
+    from azure.core.pipeline.transport import RequestsTransport  # type: ignore
 except ImportError:
     print("\n[ERROR] azure-ai-documentintelligence package not found.\nInstall it with:  pip install azure-ai-documentintelligence==1.0.0b2\n")
     sys.exit(1)
 
+try:
+    from azure.ai.documentintelligence import DocumentIntelligenceAdministrationClient  # type: ignore
+except ImportError:  # older betas: no warm-up request
+    DocumentIntelligenceAdministrationClient = None
+
+import analysis_cache
+
 # ---------------------------------------------------------------------------
 # Configuration – load from .env or set directly here
 # ---------------------------------------------------------------------------
@@ -28,8 +65,17 @@ DA_GETFILE_URL = os.getenv("DA_GETFILE_URL", "https://api.doctoralliance.com/doc
 AZURE_ENDPOINT = os.getenv("AZURE_FORM_ENDPOINT", "")  # e.g. https://<resource>.cognitiveservices.azure.com/
 AZURE_KEY      = os.getenv("AZURE_FORM_KEY", "")
 AZURE_MODEL    = os.getenv("AZURE_FORM_MODEL", "prebuilt-document")  # or custom model id
+# prebuilt-document is retired in the 4.0 API; prebuilt-layout returns the key-value pairs instead
+MODEL_TO_USE   = AZURE_MODEL if AZURE_MODEL != "prebuilt-document" else "prebuilt-layout"
+FALLBACK_MODEL = "prebuilt-read"
+LEADING_PAGES  = int(os.getenv("AZURE_LEADING_PAGES", "0"))  # 0 = analyze every page at once
+# Fields that make the remaining pages worth analyzing when the leading pages did not fill them
+REQUIRED_FIELDS = ["dob", "start_of_care", "episode_start", "episode_end", "mrn"]
+AZURE_POOL_SIZE = int(os.getenv("AZURE_POOL_SIZE", "10"))  # connections kept open to the Azure endpoint
+AZURE_TPS = float(os.getenv("AZURE_FORM_TPS", "15"))  # transactions/second of the resource (S0 default)
+MIN_POLLING_INTERVAL = 1.0  # seconds; the SDK default
 
-INPUT_CSV      = sys.argv[1] if len(sys.argv) > 1 else "Inbox/Inbox_Extracted_Data.csv"
+INPUT_CSV      = "Inbox/Inbox_Extracted_Data.csv"
 TIMESTAMP      = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
 OUTPUT_CSV     = f"csv_outputs/Extracted_{TIMESTAMP}.csv"
 
@@ -50,66 +96,166 @@ def get_da_token() -> str:
 def fetch_pdf_bytes(doc_id: str, token: str) -> bytes:
     url = DA_GETFILE_URL.format(doc_id=doc_id)
     headers = {"Authorization": f"Bearer {token}"}
+    # Some instances require a JSON body with caretakerId to retrieve the buffer
+    request_body = {
+        "onlyUnfiled": True,
+        "careProviderId": {"id": 0, "externalId": ""},
+        "dateFrom": None,
+        "dateTo": None,
+        "page": 1,
+        "recordsPerPage": 10
+    }
     print(f"[DA] GET {url}")
-    r = requests.get(url, headers=headers, timeout=60)
-    print(f"[DA] status {r.status_code}")
-    payload = r.json().get("value", {})
-    buffer_b64 = payload.get("documentBuffer")
+    document = document_store.get_store().fetch(doc_id, url, headers, retry_body=request_body)
+    source = "local store" if document.from_cache else "DA API"
+    print(f"[DA] retrieved {len(document.pdf_bytes)} bytes ({source})")
+    return document.pdf_bytes
 
-    # Some instances require a JSON body with caretakerId to retrieve the buffer
-    if not buffer_b64:
-        print("[DA] missing buffer -> retry with body")
-        request_body = {
-            "onlyUnfiled": True,
-            "careProviderId": {"id": 0, "externalId": ""},
-            "dateFrom": None,
-            "dateTo": None,
-            "page": 1,
-            "recordsPerPage": 10
-        }
-        r2 = requests.get(url, headers=headers, json=request_body, timeout=60)
-        print(f"[DA] second attempt status {r2.status_code}")
-        payload = r2.json().get("value", {})
-        buffer_b64 = payload.get("documentBuffer")
 
-    if not buffer_b64:
-        raise RuntimeError("documentBuffer missing in response")
-    pdf_bytes = base64.b64decode(buffer_b64)
-    print(f"[DA] retrieved {len(pdf_bytes)} bytes")
-    return pdf_bytes
+def cached_analysis(pdf_hash: str, pages: Optional[str] = None):
+    """Stored AnalyzeResult of this PDF (and page range) from MODEL_TO_USE or the fallback model, or None"""
+    for model_id in (MODEL_TO_USE, FALLBACK_MODEL):
+        result = analysis_cache.load(pdf_hash, model_id, pages)
+        if result is not None:
+            print(f"[Azure] reusing stored {model_id} analysis (pages {pages or 'all'})")
+            return result
+    return None
 
 
-def analyze_with_azure(pdf_bytes: bytes) -> Dict[str, str]:
-    credential = AzureKeyCredential(AZURE_KEY)
-    client = DocumentIntelligenceClient(AZURE_ENDPOINT, credential)
+class AzureFieldExtractor:
+    """Azure analysis for the whole run over one client and one pooled HTTP transport"""
 
-    print(f"[Azure] Analyzing (bytes={len(pdf_bytes)})")
-    
-    # Try with prebuilt-layout model (most common for general document analysis)
-    model_to_use = AZURE_MODEL if AZURE_MODEL != "prebuilt-document" else "prebuilt-layout"
-    
-    try:
-        poller = client.begin_analyze_document(
-            model_to_use,             # model_id positional
+    def __init__(self, pool_size: int = AZURE_POOL_SIZE, leading_pages: int = LEADING_PAGES, tps: float = AZURE_TPS):
+        self.leading_pages = leading_pages
+        # Half the TPS for analyze submissions, half for the poller's status requests
+        self.submit_bucket = TokenBucket(tps / 2 if tps > 0 else 0)
+        self.polling_interval = max(MIN_POLLING_INTERVAL, 2 / tps) if tps > 0 else MIN_POLLING_INTERVAL
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        # session_owner=False: closing a client does not close the session shared with the admin client
+        self.transport = RequestsTransport(session=self.session, session_owner=False)
+        self.credential = AzureKeyCredential(AZURE_KEY)
+        self.client = DocumentIntelligenceClient(AZURE_ENDPOINT, self.credential, transport=self.transport)
+
+    def warm_up(self) -> bool:
+        """Open the first connection (TLS handshake) and check endpoint/key with a resource-details request"""
+        if DocumentIntelligenceAdministrationClient is None:
+            return False
+        try:
+            admin = DocumentIntelligenceAdministrationClient(AZURE_ENDPOINT, self.credential, transport=self.transport)
+            details = admin.get_resource_details()
+            print(f"[Azure] connected; custom models {details.custom_document_models.count}"
+                  f"/{details.custom_document_models.limit}")
+            return True
+        except Exception as e:
+            print(f"[Azure] warm-up request failed: {e}")
+            return False
+
+    def begin_analyze(self, model_id: str, pdf_bytes: bytes, pages: Optional[str] = None):
+        """Submit one analysis within the TPS budget; returns the poller"""
+        self.submit_bucket.acquire()
+        return self.client.begin_analyze_document(
+            model_id,                 # model_id positional
             body=pdf_bytes,           # changed from document= to body=
-            content_type="application/pdf"
+            content_type="application/pdf",
+            pages=pages,
+            polling_interval=self.polling_interval
         )
-        result = poller.result()
-        print("[Azure] analysis completed")
-    except Exception as e:
-        if "ModelNotFound" in str(e):
-            print(f"[Azure] Model {model_to_use} not found, trying prebuilt-read")
-            # Fallback to prebuilt-read model
-            poller = client.begin_analyze_document(
-                "prebuilt-read",
-                body=pdf_bytes,
-                content_type="application/pdf"
-            )
+
+    def run_analysis(self, pdf_bytes: bytes, pages: Optional[str] = None):
+        """AnalyzeResult for the PDF (or a page range like "1-2"), from the analysis cache or a new Azure analysis"""
+        pdf_hash = analysis_cache.content_hash(pdf_bytes)
+        result = cached_analysis(pdf_hash, pages)
+        if result is not None:
+            return result
+
+        print(f"[Azure] Analyzing (bytes={len(pdf_bytes)}, pages={pages or 'all'})")
+        
+        # Try with prebuilt-layout model (most common for general document analysis)
+        model_id = MODEL_TO_USE
+        
+        try:
+            poller = self.begin_analyze(model_id, pdf_bytes, pages)
             result = poller.result()
-            print("[Azure] analysis completed with prebuilt-read")
-        else:
-            raise e
+            print("[Azure] analysis completed")
+        except Exception as e:
+            if "ModelNotFound" in str(e):
+                print(f"[Azure] Model {model_id} not found, trying {FALLBACK_MODEL}")
+                # Fallback to prebuilt-read model
+                model_id = FALLBACK_MODEL
+                poller = self.begin_analyze(model_id, pdf_bytes, pages)
+                result = poller.result()
+                print(f"[Azure] analysis completed with {FALLBACK_MODEL}")
+            else:
+                raise e
+
+        analysis_cache.save(pdf_hash, model_id, result, pages)
+        return result
+
+    def analyze_with_azure(self, pdf_bytes: bytes, pages: Optional[str] = None) -> Dict[str, str]:
+        return extract_key_values(self.run_analysis(pdf_bytes, pages))
+
+    def extract_document_fields(self, pdf_bytes: bytes) -> Dict[str, str]:
+        """Mapped fields for one PDF; a stored whole-document analysis is reused as is"""
+        result = cached_analysis(analysis_cache.content_hash(pdf_bytes))
+        if result is not None:
+            return map_fields(extract_key_values(result))
+        return extract_adaptive(lambda pages: self.analyze_with_azure(pdf_bytes, pages),
+                                analysis_cache.page_count(pdf_bytes), self.leading_pages)
+
+    def close(self):
+        self.client.close()
+        self.session.close()
+
 
+def extract_adaptive(analyze_kv, page_count: Optional[int], leading_pages: int) -> Dict[str, str]:
+    """map_fields over the leading pages, adding the remaining pages only when REQUIRED_FIELDS are
+    still empty. analyze_kv(pages) returns the key-value pairs for a page range (None = all)."""
+    if not leading_pages or (page_count is not None and page_count <= leading_pages):
+        return map_fields(analyze_kv(None))
+
+    kv = analyze_kv(f"1-{leading_pages}")
+    mapped = map_fields(kv)
+    missing = [field for field in REQUIRED_FIELDS if not mapped.get(field)]
+    if not missing:
+        return mapped
+
+    # Page count unknown (no PyPDF2): analyze the whole document instead of guessing the last page
+    rest = f"{leading_pages + 1}-{page_count}" if page_count else None
+    print(f"[Azure] missing {missing} on pages 1-{leading_pages}, analyzing pages {rest or 'all'}")
+    try:
+        rest_kv = analyze_kv(rest)
+    except LookupError as e:  # --remap-only and the remaining pages were never analyzed
+        print(f"[Azure] {e}")
+        return mapped
+    # Values from the leading pages win
+    return map_fields({**rest_kv, **kv})
+
+
+def remap_from_store(doc_id: str, leading_pages: int = LEADING_PAGES) -> Dict[str, str]:
+    """Mapped fields from the stored analyses of a document, without calling DA or Azure"""
+    pdf_bytes = analysis_cache.stored_pdf(doc_id)
+    if pdf_bytes is None:
+        raise LookupError(f"{doc_id} is not in the local document store; run without --remap-only first")
+    pdf_hash = analysis_cache.content_hash(pdf_bytes)
+
+    def stored_kv(pages):
+        result = cached_analysis(pdf_hash, pages)
+        if result is None:
+            raise LookupError(f"no stored Azure analysis of pages {pages or 'all'} for {doc_id}; "
+                              f"run without --remap-only first")
+        return extract_key_values(result)
+
+    result = cached_analysis(pdf_hash)
+    if result is not None:
+        return map_fields(extract_key_values(result))
+    return extract_adaptive(stored_kv, analysis_cache.page_count(pdf_bytes), leading_pages)
+
+
+def extract_key_values(result) -> Dict[str, str]:
+    """Key-value pairs, table cells and (when those are sparse) regex matches from an AnalyzeResult"""
     extracted: Dict[str, str] = {}
 
     # Collect key-value pairs (supports prebuilt-layout or custom model)
@@ -174,9 +320,25 @@ def map_fields(kv: Dict[str, str]) -> Dict[str, str]:
 # ---------------------------------------------------------------------------
 
 def main():
-    token = get_da_token()
+    parser = argparse.ArgumentParser(description="Extract MRN / DOB / episode dates from DA documents with Azure")
+    parser.add_argument("input_csv", nargs="?", default=INPUT_CSV, help="Inbox CSV with an ID column")
+    parser.add_argument("--remap-only", action="store_true",
+                        help="Re-run extraction and map_fields on stored Azure analyses without calling DA or Azure")
+    parser.add_argument("--leading-pages", type=int, default=LEADING_PAGES,
+                        help="Analyze only pages 1-N first and the rest only if required fields are missing (0 = all pages)")
+    parser.add_argument("--pool-size", type=int, default=AZURE_POOL_SIZE,
+                        help="HTTP connections kept open to the Azure endpoint")
+    parser.add_argument("--tps", type=float, default=AZURE_TPS,
+                        help="Transactions per second allowed by the Azure resource (0 = unlimited)")
+    args = parser.parse_args()
+
+    token = None if args.remap_only else get_da_token()
+    extractor = None
+    if not args.remap_only:
+        extractor = AzureFieldExtractor(pool_size=args.pool_size, leading_pages=args.leading_pages, tps=args.tps)
+        extractor.warm_up()
 
-    with open(INPUT_CSV, newline="", encoding="utf-8") as src, \
+    with open(args.input_csv, newline="", encoding="utf-8") as src, \
          open(OUTPUT_CSV, "w", newline="", encoding="utf-8") as dest:
 
         reader = csv.DictReader(src)
@@ -194,9 +356,11 @@ def main():
 
             try:
                 print(f"Processing {doc_id} …", end=" ")
-                pdf_bytes = fetch_pdf_bytes(doc_id, token)
-                kv_pairs = analyze_with_azure(pdf_bytes)
-                mapped = map_fields(kv_pairs)
+                if args.remap_only:
+                    mapped = remap_from_store(doc_id, args.leading_pages)
+                else:
+                    pdf_bytes = fetch_pdf_bytes(doc_id, token)
+                    mapped = extractor.extract_document_fields(pdf_bytes)
                 for k, v in mapped.items():
                     if v:
                         row[k] = v
@@ -206,8 +370,9 @@ def main():
                 print(f"Failed: {e}")
                 writer.writerow(row)
                 continue
-            time.sleep(0.2)  # rudimentary rate-limit
 
+    if extractor is not None:
+        extractor.close()
     print(f"\nDone. Extracted data written to {OUTPUT_CSV}")
 
 
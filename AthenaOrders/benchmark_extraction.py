@@ -0,0 +1,124 @@
+"""
+Benchmark the Gemini extraction modes of final_version.py over a fixed PDF corpus.
+
+Compares the two-call path (extract_patient_data + extract_order_data) with the
+single structured call (extract_combined_data) on the same document text and
+reports latency and token usage for each.
+
+Usage (run from AthenaOrders/, like final_version.py):
+    python benchmark_extraction.py --corpus ../azure_training_samples --limit 10
+"""
+import argparse
+import glob
+import json
+import os
+import time
+from datetime import datetime
+
+import final_version as fv
+
+
+def usage_totals():
+    """Sum the calls/seconds/tokens accumulated in final_version.llm_usage"""
+    totals = {"calls": 0, "seconds": 0.0, "prompt_tokens": 0, "output_tokens": 0}
+    with fv.llm_usage_lock:
+        for stats in fv.llm_usage.values():
+            for key in totals:
+                totals[key] += stats[key]
+        fv.llm_usage.clear()
+    return totals
+
+
+def run_separate(text, doc_id):
+    started = time.monotonic()
+    patient_data = fv.extract_patient_data(text, doc_id)
+    order_data = fv.extract_order_data(text, doc_id)
+    wall = time.monotonic() - started
+    return wall, usage_totals(), bool(patient_data), bool(order_data)
+
+
+def run_combined(text, doc_id):
+    started = time.monotonic()
+    patient_data, order_data = fv.extract_combined_data(text, doc_id)
+    if order_data is None:
+        order_data = fv.extract_order_data(text, doc_id)
+    wall = time.monotonic() - started
+    return wall, usage_totals(), bool(patient_data), bool(order_data)
+
+
+def summarize(results, mode):
+    rows = [r[mode] for r in results]
+    count = len(rows) or 1
+    return {
+        "documents": len(rows),
+        "avg_seconds": sum(r["seconds"] for r in rows) / count,
+        "total_calls": sum(r["calls"] for r in rows),
+        "total_prompt_tokens": sum(r["prompt_tokens"] for r in rows),
+        "total_output_tokens": sum(r["output_tokens"] for r in rows),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark separate vs combined Gemini extraction")
+    parser.add_argument("--corpus", default="../azure_training_samples", help="Directory of PDFs to extract")
+    parser.add_argument("--limit", type=int, default=10, help="Maximum number of PDFs to benchmark")
+    parser.add_argument("--prune", action="store_true",
+                        help="Send the text through final_version.prune_text first (first page + label windows)")
+    parser.add_argument("--output", default=None, help="Path of the JSON report")
+    args = parser.parse_args()
+
+    pdf_paths = sorted(glob.glob(os.path.join(args.corpus, "*.pdf")))[:args.limit]
+    if not pdf_paths:
+        print(f"No PDFs found in {args.corpus}")
+        return
+
+    results = []
+    for path in pdf_paths:
+        doc_id = os.path.splitext(os.path.basename(path))[0]
+        with open(path, "rb") as f:
+            text = fv.extract_text_from_pdf_bytes(f.read(), doc_id)
+        text_chars = len(text)
+        if args.prune:
+            text = fv.prune_text(text, doc_id)
+        usage_totals()  # discard anything recorded during text extraction
+
+        sep_wall, sep_usage, sep_patient, sep_order = run_separate(text, doc_id)
+        comb_wall, comb_usage, comb_patient, comb_order = run_combined(text, doc_id)
+        results.append({
+            "doc_id": doc_id,
+            "text_chars": text_chars,
+            "prompt_text_chars": len(text),
+            "separate": {**sep_usage, "seconds": sep_wall, "patient_ok": sep_patient, "order_ok": sep_order},
+            "combined": {**comb_usage, "seconds": comb_wall, "patient_ok": comb_patient, "order_ok": comb_order},
+        })
+        print(f"{doc_id}: separate {sep_wall:.2f}s / {sep_usage['prompt_tokens']} prompt tokens, "
+              f"combined {comb_wall:.2f}s / {comb_usage['prompt_tokens']} prompt tokens")
+
+    separate = summarize(results, "separate")
+    combined = summarize(results, "combined")
+    report = {
+        "model": fv.GEMINI_MODEL,
+        "corpus": os.path.abspath(args.corpus),
+        "pruned": args.prune,
+        "separate": separate,
+        "combined": combined,
+        "documents": results,
+    }
+
+    print("\nMode      Docs  Avg s/doc  Calls  Prompt tokens  Output tokens")
+    for mode, summary in (("separate", separate), ("combined", combined)):
+        print(f"{mode:<9} {summary['documents']:>4}  {summary['avg_seconds']:>9.2f}  {summary['total_calls']:>5}  "
+              f"{summary['total_prompt_tokens']:>13}  {summary['total_output_tokens']:>13}")
+    if separate["avg_seconds"] and separate["total_prompt_tokens"]:
+        print(f"\nLatency saved: {(1 - combined['avg_seconds'] / separate['avg_seconds']) * 100:.1f}%  "
+              f"Prompt tokens saved: {(1 - combined['total_prompt_tokens'] / separate['total_prompt_tokens']) * 100:.1f}%")
+
+    output = args.output or f"api_outputs/extraction_benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {output}")
+    fv.logger.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Benchmark the OCR backends in ocr_backends.py over a fixed PDF corpus.
+
+Every page is rendered once at the production DPI and then OCR'd by each backend
+on a single core (engine start-up timed separately), and optionally through an
+OCRFarm process pool, reporting pages/second for each.
+
+Usage (run from AthenaOrders/, like final_version.py):
+    python benchmark_ocr.py --corpus ../azure_training_samples_bulk --max-pages 60 --farm-workers 4
+"""
+import argparse
+import glob
+import json
+import os
+import time
+from datetime import datetime
+
+import fitz
+
+import ocr_backends
+from ocr_farm import OCRFarm
+
+
+def load_pages(pdf_paths, max_pages, dpi):
+    """Render up to max_pages pages as raw pixmaps: [(doc_id, page_num, samples, width, height, channels)]"""
+    matrix = fitz.Matrix(dpi / 72, dpi / 72)
+    pages = []
+    for path in pdf_paths:
+        doc_id = os.path.splitext(os.path.basename(path))[0]
+        with fitz.open(path) as pdf_document:
+            for page_num in range(len(pdf_document)):
+                if len(pages) >= max_pages:
+                    return pages
+                pix = pdf_document[page_num].get_pixmap(matrix=matrix)
+                pages.append((doc_id, page_num, pix.samples, pix.width, pix.height, pix.n))
+    return pages
+
+
+def run_in_process(name, pages, config):
+    started = time.monotonic()
+    backend = ocr_backends.create_backend(name, config)
+    startup = time.monotonic() - started
+    chars = 0
+    started = time.monotonic()
+    for _, _, samples, width, height, channels in pages:
+        chars += len(backend.raw_to_string(samples, width, height, channels))
+    elapsed = time.monotonic() - started
+    backend.close()
+    return {
+        "backend": backend.name,
+        "mode": "in-process",
+        "pages": len(pages),
+        "startup_seconds": startup,
+        "seconds": elapsed,
+        "pages_per_second": len(pages) / elapsed if elapsed else 0.0,
+        "chars": chars,
+    }
+
+
+def run_farm(name, pdf_paths, max_pages, config, workers, dpi):
+    started = time.monotonic()
+    farm = OCRFarm(workers, config, backend=name)
+    pages = chars = 0
+    try:
+        for path in pdf_paths:
+            if pages >= max_pages:
+                break
+            with fitz.open(path) as pdf_document:
+                page_numbers = list(range(min(len(pdf_document), max_pages - pages)))
+                texts = farm.ocr_pages(pdf_document, page_numbers, dpi=dpi)
+            pages += len(page_numbers)
+            chars += sum(len(text) for text in texts.values())
+    finally:
+        farm.shutdown()
+    elapsed = time.monotonic() - started
+    return {
+        "backend": farm.backend,
+        "mode": f"farm x{workers}",
+        "pages": pages,
+        "startup_seconds": None,
+        "seconds": elapsed,
+        "pages_per_second": pages / elapsed if elapsed else 0.0,
+        "chars": chars,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark OCR backends (pages/second)")
+    parser.add_argument("--corpus", default="../azure_training_samples_bulk", help="Directory of PDFs to OCR")
+    parser.add_argument("--max-pages", type=int, default=60, help="Maximum number of pages to OCR per run")
+    parser.add_argument("--backends", nargs="+", default=["pytesseract", "tesserocr"],
+                        choices=sorted(ocr_backends.BACKENDS), help="Backends to compare")
+    parser.add_argument("--farm-workers", type=int, default=0,
+                        help="Also run each backend through an OCRFarm with this many processes (0 = skip)")
+    parser.add_argument("--dpi", type=int, default=ocr_backends.DEFAULT_DPI)
+    parser.add_argument("--output", default=None, help="Path of the JSON report")
+    args = parser.parse_args()
+
+    pdf_paths = sorted(glob.glob(os.path.join(args.corpus, "*.pdf")))
+    if not pdf_paths:
+        print(f"No PDFs found in {args.corpus}")
+        return
+
+    backends = []
+    for name in args.backends:
+        if name == "tesserocr" and ocr_backends.tesserocr is None:
+            print("tesserocr is not installed; skipping it")
+            continue
+        backends.append(name)
+
+    pages = load_pages(pdf_paths, args.max_pages, args.dpi)
+    print(f"Rendered {len(pages)} pages from {args.corpus} at {args.dpi} DPI")
+
+    results = []
+    for name in backends:
+        results.append(run_in_process(name, pages, ocr_backends.DEFAULT_CONFIG))
+        if args.farm_workers > 0:
+            results.append(run_farm(name, pdf_paths, args.max_pages, ocr_backends.DEFAULT_CONFIG,
+                                    args.farm_workers, args.dpi))
+
+    print("\nBackend      Mode         Pages  Startup s  Seconds  Pages/s")
+    for r in results:
+        startup = f"{r['startup_seconds']:.3f}" if r["startup_seconds"] is not None else "-"
+        print(f"{r['backend']:<12} {r['mode']:<12} {r['pages']:>5}  {startup:>9}  {r['seconds']:>7.2f}  "
+              f"{r['pages_per_second']:>7.2f}")
+
+    report = {
+        "corpus": os.path.abspath(args.corpus),
+        "dpi": args.dpi,
+        "config": ocr_backends.DEFAULT_CONFIG,
+        "results": results,
+    }
+    os.makedirs("api_outputs", exist_ok=True)
+    output = args.output or f"api_outputs/ocr_benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+Benchmark the PDF text-extraction paths of final_version.py over a fixed PDF corpus.
+
+Methods (each runs over the whole corpus in its own fresh process, so peak RSS
+is per method rather than cumulative):
+    is_scanned     final_version.is_scanned_pdf (pdfplumber, first 3 pages)
+    pdfplumber     pdfplumber page.extract_text(), the digital path of the original get_pdf_text
+    pymupdf        PyMuPDF page.get_text()
+    hybrid         final_version.extract_text_from_pdf_bytes, what get_pdf_text runs today
+    ocr            final_version.extract_text_with_ocr (every page through Tesseract)
+
+Writes per-document and per-page CSVs plus a JSON summary to api_outputs/, tagged
+with the current git commit so runs can be compared between commits.
+
+Usage (run from AthenaOrders/, like final_version.py):
+    python benchmark_text_extraction.py --max-docs 50 --methods is_scanned pdfplumber pymupdf hybrid
+    python benchmark_text_extraction.py --corpus ../azure_training_samples --ocr-workers 4
+"""
+import argparse
+import csv
+import glob
+import io
+import json
+import math
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+METHODS = ["is_scanned", "pdfplumber", "pymupdf", "hybrid", "ocr"]
+DEFAULT_CORPORA = ["../azure_training_samples_bulk", "../azure_training_samples"]
+DOCUMENT_FIELDS = ["method", "doc_id", "pages", "seconds", "seconds_per_page", "chars", "result", "error"]
+PAGE_FIELDS = ["method", "doc_id", "page", "seconds", "chars"]
+
+
+def peak_rss_mb(who=None):
+    """Peak resident set size of this process (or its children) in MB, None where unsupported"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who is None else who)
+    # ru_maxrss is kilobytes on Linux, bytes on macOS
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(usage.ru_maxrss / divisor, 1)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list (same as final_version.percentile)"""
+    ordered = sorted(values)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _pdfplumber_pages(pdf_bytes):
+    import pdfplumber
+    texts = []
+    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+        for page in pdf.pages:
+            started = time.perf_counter()
+            text = page.extract_text() or ""
+            texts.append((time.perf_counter() - started, text))
+    return texts
+
+
+def _pymupdf_pages(pdf_bytes):
+    import fitz
+    texts = []
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as pdf_document:
+        for page in pdf_document:
+            started = time.perf_counter()
+            text = page.get_text()
+            texts.append((time.perf_counter() - started, text))
+    return texts
+
+
+def _page_count(pdf_bytes):
+    import fitz
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as pdf_document:
+        return len(pdf_document)
+
+
+def run_method(method, pdf_paths, ocr_workers, ocr_backend):
+    """Child process entry point: run one method over the corpus; returns (documents, pages, rss)"""
+    import final_version
+
+    final_version.logger.set_level("WARNING")
+    final_version.OCR_BACKEND = ocr_backend
+    if method == "ocr" and ocr_workers > 0:
+        final_version.ocr_farm = final_version.OCRFarm(ocr_workers, final_version.OCR_CONFIG,
+                                                       backend=final_version.OCR_BACKEND)
+
+    documents, pages = [], []
+    try:
+        for path in pdf_paths:
+            doc_id = os.path.splitext(os.path.basename(path))[0]
+            with open(path, "rb") as f:
+                pdf_bytes = f.read()
+            try:
+                page_count = _page_count(pdf_bytes)
+            except Exception as e:
+                print(f"Skipping unreadable PDF {path}: {e}")
+                continue
+            row = {"method": method, "doc_id": doc_id, "pages": page_count, "chars": None,
+                   "result": None, "error": None}
+            started = time.perf_counter()
+            try:
+                if method == "is_scanned":
+                    row["result"] = final_version.is_scanned_pdf(pdf_bytes)
+                elif method in ("pdfplumber", "pymupdf"):
+                    page_texts = _pdfplumber_pages(pdf_bytes) if method == "pdfplumber" else _pymupdf_pages(pdf_bytes)
+                    row["chars"] = sum(len(text) for _, text in page_texts)
+                    for page_num, (seconds, text) in enumerate(page_texts):
+                        pages.append({"method": method, "doc_id": doc_id, "page": page_num + 1,
+                                      "seconds": round(seconds, 6), "chars": len(text)})
+                elif method == "hybrid":
+                    row["chars"] = len(final_version.extract_text_from_pdf_bytes(pdf_bytes, doc_id))
+                elif method == "ocr":
+                    row["chars"] = len(final_version.extract_text_with_ocr(pdf_bytes, doc_id))
+            except Exception as e:
+                row["error"] = str(e)
+            seconds = time.perf_counter() - started
+            row["seconds"] = round(seconds, 6)
+            row["seconds_per_page"] = round(seconds / page_count, 6) if page_count else None
+            documents.append(row)
+    finally:
+        if final_version.ocr_farm is not None:
+            final_version.ocr_farm.shutdown()
+        final_version.logger.close()
+
+    rss = {"peak_rss_mb": peak_rss_mb()}
+    if resource is not None:
+        rss["peak_child_rss_mb"] = peak_rss_mb(resource.RUSAGE_CHILDREN)  # OCR farm workers / tesseract
+    return documents, pages, rss
+
+
+def summarize(method, documents, rss):
+    timed = [d for d in documents if not d["error"]]
+    seconds = [d["seconds"] for d in timed]
+    total_pages = sum(d["pages"] for d in timed)
+    total_seconds = sum(seconds)
+    summary = {
+        "method": method,
+        "documents": len(timed),
+        "errors": len(documents) - len(timed),
+        "pages": total_pages,
+        "seconds": round(total_seconds, 3),
+        "pages_per_second": round(total_pages / total_seconds, 2) if total_seconds else 0.0,
+        "doc_p50": round(percentile(seconds, 50), 4) if seconds else None,
+        "doc_p95": round(percentile(seconds, 95), 4) if seconds else None,
+        "doc_max": round(max(seconds), 4) if seconds else None,
+    }
+    summary.update(rss)
+    if method == "is_scanned":
+        summary["scanned"] = sum(1 for d in timed if d["result"])
+    return summary
+
+
+def write_csv(path, fields, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PDF text extraction (per document and per page)")
+    parser.add_argument("--corpus", nargs="+", default=DEFAULT_CORPORA, help="Directories of PDFs")
+    parser.add_argument("--max-docs", type=int, default=0, help="Only use the first N PDFs (0 = all)")
+    parser.add_argument("--methods", nargs="+", default=METHODS, choices=METHODS, help="Methods to time")
+    parser.add_argument("--ocr-workers", type=int, default=0,
+                        help="Run the ocr method through an OCRFarm with this many processes (0 = per-document threads)")
+    parser.add_argument("--ocr-backend", choices=["auto", "tesserocr", "pytesseract"], default="auto")
+    parser.add_argument("--output", default=None, help="Report path prefix (default api_outputs/text_benchmark_<timestamp>)")
+    args = parser.parse_args()
+
+    pdf_paths = []
+    for corpus in args.corpus:
+        pdf_paths.extend(sorted(glob.glob(os.path.join(corpus, "*.pdf"))))
+    if args.max_docs > 0:
+        pdf_paths = pdf_paths[:args.max_docs]
+    if not pdf_paths:
+        print(f"No PDFs found in {', '.join(args.corpus)}")
+        return
+    print(f"Benchmarking {len(pdf_paths)} PDFs: {', '.join(args.methods)}")
+
+    # spawn, not fork: each method starts from a clean interpreter so its peak RSS is its own
+    context = multiprocessing.get_context("spawn")
+    documents, pages, summaries = [], [], []
+    for method in args.methods:
+        with context.Pool(1) as pool:
+            method_documents, method_pages, rss = pool.apply(
+                run_method, (method, pdf_paths, args.ocr_workers, args.ocr_backend))
+        documents.extend(method_documents)
+        pages.extend(method_pages)
+        summaries.append(summarize(method, method_documents, rss))
+        print(f"  {method:<11} done in {summaries[-1]['seconds']:.2f}s")
+
+    print("\nMethod       Docs  Pages  Seconds  Pages/s  Doc p50 s  Doc p95 s  Peak RSS MB")
+    for s in summaries:
+        rss = f"{s['peak_rss_mb']:.1f}" if s["peak_rss_mb"] is not None else "-"
+        p50 = f"{s['doc_p50']:.4f}" if s["doc_p50"] is not None else "-"
+        p95 = f"{s['doc_p95']:.4f}" if s["doc_p95"] is not None else "-"
+        print(f"{s['method']:<11} {s['documents']:>5}  {s['pages']:>5}  {s['seconds']:>7.2f}  "
+              f"{s['pages_per_second']:>7.2f}  {p50:>9}  {p95:>9}  {rss:>11}")
+
+    os.makedirs("api_outputs", exist_ok=True)
+    prefix = args.output or f"api_outputs/text_benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    write_csv(f"{prefix}_documents.csv", DOCUMENT_FIELDS, documents)
+    write_csv(f"{prefix}_pages.csv", PAGE_FIELDS, pages)
+    report = {
+        "commit": git_commit(),
+        "corpus": [os.path.abspath(corpus) for corpus in args.corpus],
+        "documents": len(pdf_paths),
+        "ocr_workers": args.ocr_workers,
+        "ocr_backend": args.ocr_backend,
+        "methods": summaries,
+    }
+    with open(f"{prefix}.json", "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {prefix}.json, {prefix}_documents.csv and {prefix}_pages.csv")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+Local on-disk store for DA `document/getfile` downloads and their extracted text.
+
+Decoded PDFs are kept under DOCUMENT_STORE_DIR keyed by docId plus the sha256 of
+the PDF content; extracted text is stored per (content hash, extractor) so a
+change to the PDF or to the extraction code never serves stale text. Total size
+is capped (DOCUMENT_STORE_MAX_MB) with least-recently-used eviction.
+
+fetch() looks documents up by docId alone: a stored PDF and its metadata are
+served as they were when downloaded. DA documents change when they are signed
+(new PDF, new status dates), so callers that need the current version, such as
+signed-order downloads, pass refresh=True; the new download replaces the entry.
+
+This file is shared by the bot folders (copied like CommonUtil.py / ReadConfig.py);
+keep the copies identical.
+
+Usage:
+    store = document_store.get_store()
+    doc = store.fetch(doc_id, url, headers)          # downloads only on a miss
+    doc = store.fetch(doc_id, url, headers, refresh=True)  # always downloads (signed documents)
+    doc.pdf_bytes, doc.metadata, doc.content_hash
+    text = store.get_text(doc.content_hash, "my-extractor-v1")
+    store.put_text(doc.content_hash, "my-extractor-v1", text)
+"""
+import base64
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import http_client
+
+DEFAULT_STORE_DIR = os.getenv("DOCUMENT_STORE_DIR", "document_store")
+DEFAULT_MAX_MB = float(os.getenv("DOCUMENT_STORE_MAX_MB", "2048"))
+
+
+class DocumentFetchError(RuntimeError):
+    def __init__(self, message, status_code=None, response_text=""):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response_text = response_text
+
+
+class StoredDocument:
+    def __init__(self, doc_id, pdf_bytes, metadata, content_hash, from_cache):
+        self.doc_id = doc_id
+        self.pdf_bytes = pdf_bytes
+        self.metadata = metadata          # getfile "value" object without documentBuffer
+        self.content_hash = content_hash
+        self.from_cache = from_cache
+
+
+def _atomic_write(path, data):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class DocumentStore:
+    def __init__(self, root=DEFAULT_STORE_DIR, max_bytes=int(DEFAULT_MAX_MB * 1024 * 1024)):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.lock = threading.RLock()
+        os.makedirs(os.path.join(root, "pdf"), exist_ok=True)
+        os.makedirs(os.path.join(root, "text"), exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(root, "index.sqlite"), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS documents (
+                doc_id TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                metadata TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS blobs (
+                path TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_blobs_hash ON blobs (content_hash)")
+        self.conn.commit()
+
+    # -- paths -----------------------------------------------------------
+    def _pdf_path(self, content_hash):
+        return os.path.join(self.root, "pdf", f"{content_hash}.pdf")
+
+    def _text_path(self, content_hash, extractor):
+        safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in extractor)
+        return os.path.join(self.root, "text", f"{content_hash}.{safe}.txt")
+
+    def _touch(self, path, content_hash, size):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO blobs (path, content_hash, size, last_access) VALUES (?, ?, ?, ?)",
+            (path, content_hash, size, time.time()),
+        )
+
+    # -- PDFs ------------------------------------------------------------
+    def get(self, doc_id):
+        """Cached StoredDocument for doc_id, or None"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT content_hash, metadata FROM documents WHERE doc_id=?", (str(doc_id),)
+            ).fetchone()
+            if row is None:
+                return None
+            content_hash, metadata = row
+            path = self._pdf_path(content_hash)
+            if not os.path.exists(path):
+                self.conn.execute("DELETE FROM documents WHERE doc_id=?", (str(doc_id),))
+                self.conn.commit()
+                return None
+            now = time.time()
+            self.conn.execute("UPDATE documents SET last_access=? WHERE doc_id=?", (now, str(doc_id)))
+            self.conn.execute("UPDATE blobs SET last_access=? WHERE path=?", (now, path))
+            self.conn.commit()
+        with open(path, "rb") as f:
+            pdf_bytes = f.read()
+        return StoredDocument(str(doc_id), pdf_bytes, json.loads(metadata), content_hash, True)
+
+    def put(self, doc_id, pdf_bytes, metadata=None):
+        content_hash = hashlib.sha256(pdf_bytes).hexdigest()
+        path = self._pdf_path(content_hash)
+        if not os.path.exists(path):
+            _atomic_write(path, pdf_bytes)
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO documents (doc_id, content_hash, metadata, fetched_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (str(doc_id), content_hash, json.dumps(metadata or {}), now, now),
+            )
+            self._touch(path, content_hash, len(pdf_bytes))
+            self._evict_locked()
+            self.conn.commit()
+        return StoredDocument(str(doc_id), pdf_bytes, metadata or {}, content_hash, False)
+
+    def fetch(self, doc_id, url, headers, body=None, retry_body=None, timeout=60, refresh=False):
+        """Return the document from the store, downloading and decoding it from DA on a miss.
+
+        body is sent as the JSON body of the GET; retry_body is sent on a second attempt
+        when the first response has no documentBuffer. refresh=True skips the stored copy
+        and replaces it with the new download. Raises DocumentFetchError on failure.
+        """
+        if not refresh:
+            cached = self.get(doc_id)
+            if cached is not None:
+                return cached
+
+        response = http_client.get(url, headers=headers, json=body, timeout=timeout)
+        if response.status_code != 200:
+            raise DocumentFetchError(f"API request failed: {response.status_code}", response.status_code, response.text)
+        value = response.json().get("value") or {}
+        buffer_b64 = value.get("documentBuffer")
+
+        if not buffer_b64 and retry_body is not None:
+            response = http_client.get(url, headers=headers, json=retry_body, timeout=timeout)
+            if response.status_code != 200:
+                raise DocumentFetchError(f"Second API request failed: {response.status_code}", response.status_code, response.text)
+            value = response.json().get("value") or {}
+            buffer_b64 = value.get("documentBuffer")
+
+        if not buffer_b64:
+            raise DocumentFetchError("documentBuffer missing in response", response.status_code, response.text)
+
+        metadata = {k: v for k, v in value.items() if k != "documentBuffer"}
+        return self.put(doc_id, base64.b64decode(buffer_b64), metadata)
+
+    # -- extracted text --------------------------------------------------
+    def get_text(self, content_hash, extractor):
+        path = self._text_path(content_hash, extractor)
+        if not os.path.exists(path):
+            return None
+        with self.lock:
+            self.conn.execute("UPDATE blobs SET last_access=? WHERE path=?", (time.time(), path))
+            self.conn.commit()
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def put_text(self, content_hash, extractor, text):
+        path = self._text_path(content_hash, extractor)
+        data = text.encode("utf-8")
+        _atomic_write(path, data)
+        with self.lock:
+            self._touch(path, content_hash, len(data))
+            self._evict_locked()
+            self.conn.commit()
+
+    # -- eviction --------------------------------------------------------
+    def _evict_locked(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+        # Evict whole documents (PDF + all of its text) in least-recently-used order
+        hashes = self.conn.execute(
+            "SELECT content_hash, MAX(last_access) AS used, SUM(size) FROM blobs "
+            "GROUP BY content_hash ORDER BY used ASC"
+        ).fetchall()
+        removed = 0
+        for content_hash, _, size in hashes:
+            if total <= self.max_bytes:
+                break
+            for (path,) in self.conn.execute("SELECT path FROM blobs WHERE content_hash=?", (content_hash,)).fetchall():
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self.conn.execute("DELETE FROM blobs WHERE content_hash=?", (content_hash,))
+            self.conn.execute("DELETE FROM documents WHERE content_hash=?", (content_hash,))
+            total -= size
+            removed += 1
+        return removed
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_store():
+    """Process-wide DocumentStore rooted at DOCUMENT_STORE_DIR"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = DocumentStore()
+        return _default_store
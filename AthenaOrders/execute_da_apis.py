@@ -1,12 +1,12 @@
-import requests
+import http_client
 import ReadConfig as rc
 from datetime import datetime
 import CommonUtil as cu
 import openpyxl
 import json
 import os
-import base64
 import re
+import document_store
 
 def execute_da_signed_order_download(access_token, daAPIPatientUrl, reportFolderName, daAPITokenCaretakerId):
     base_folder = cu.getFolderPath("O", reportFolderName)
@@ -64,23 +64,23 @@ def get_Signed_pdf(access_token, daAPIPatientUrl, doc_id, signed_orders_folder,
     "page": 1,
     "recordsPerPage": 10
     }
-    response = requests.get(url, headers=headers, json=data)
+    try:
+        # Always download: a stored copy of this docId may predate the signature
+        document = document_store.get_store().fetch(doc_id, url, headers, body=data, refresh=True)
+    except document_store.DocumentFetchError:
+        document = None
 
-    if response.status_code == 200:
-        response_json = json.loads(response.content)
-        # data = response.json()
-        document_buffer = response_json['value']['documentBuffer']
+    if document:
         try:
-            start_of_care = cu.date_in_standard_format(response_json['value']['document']['status']['startOfCareDate'])
-            cert_period_from = cu.date_in_standard_format(response_json['value']['document']['status']['certPeriodFrom'])
-            cert_period_to = cu.date_in_standard_format(response_json['value']['document']['status']['certPeriodTo'])
+            start_of_care = cu.date_in_standard_format(document.metadata['document']['status']['startOfCareDate'])
+            cert_period_from = cu.date_in_standard_format(document.metadata['document']['status']['certPeriodFrom'])
+            cert_period_to = cu.date_in_standard_format(document.metadata['document']['status']['certPeriodTo'])
         except Exception as e:
             pass
-        document_data_bytes = base64.b64decode(document_buffer)
         destination_path=os.path.join(signed_orders_folder,f"{doc_id}.pdf")
         destination_path = destination_path.replace('\\', '/')
         with open(destination_path, "wb") as f:
-            f.write(document_data_bytes)
+            f.write(document.pdf_bytes)
         signed_date=get_signed_date(access_token, daAPIPatientUrl, doc_id)
     return signed_date,start_of_care,cert_period_from,cert_period_to
 
@@ -92,7 +92,7 @@ def get_signed_date(access_token, daAPIPatientUrl, doc_id):
         'Content-Type': 'application/json',
         'Authorization': 'Bearer ' + access_token
     }
-    response = requests.get(url, headers=headers)
+    response = http_client.get(url, headers=headers)
     if response.status_code == 200:
         response_json = json.loads(response.content)
         try:
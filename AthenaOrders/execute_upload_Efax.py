@@ -1,5 +1,5 @@
 import openpyxl
-import requests
+import http_client
 from requests_toolbelt.multipart.encoder import MultipartEncoder
 from datetime import datetime
 import json
@@ -70,7 +70,7 @@ def upload_file(api_key,api_url, source, pgname,efaxno,efaxdate,hhah_name,patien
             "isEfaxDeleted": False,
             "ehR_EFAX_DOC_ID":efaxdocid
         }
-        response = requests.post(api_endpoint, headers=headers, json=payload)
+        response = http_client.post(api_endpoint, headers=headers, json=payload)
         if response.status_code == 200:
             efax_id = response.text
         
@@ -96,7 +96,7 @@ def get_filepath(api_key,api_url,working_folder,efaxno):
             'Content-Type': multipart_encoder.content_type,
             }
 
-            response = requests.post(api_endpoint, data=multipart_encoder, headers=headers, timeout=300)
+            response = http_client.post(api_endpoint, data=multipart_encoder, headers=headers, timeout=300)
             if response.status_code == 200:
                 cloudPath=response.text
 
@@ -1,5 +1,6 @@
 import openpyxl
 import requests
+import http_client
 from requests_toolbelt.multipart.encoder import MultipartEncoder
 from datetime import datetime
 import json
@@ -35,7 +36,7 @@ def upload_file(api_key,api_url,working_file):
         headers = {'Content-Type': multipart_encoder.content_type, 'X-SERVICE-KEY': api_key}
 
         try:
-            response = requests.post(api_endpoint, data=multipart_encoder, headers=headers, timeout=300)
+            response = http_client.post(api_endpoint, data=multipart_encoder, headers=headers, timeout=300)
             response.raise_for_status()
 
             failed_list = get_failed_list_from_response(response)
@@ -1,17 +1,36 @@
 import csv
 import json
-import base64
-import io
+import math
 import re
 import os
+import time
+import argparse
+import atexit
+import functools
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-import requests
-import pdfplumber
-import google.generativeai as genai
 from dotenv import load_dotenv
+
+# Load environment first: the modules below and the module logger read their settings
+# (LOG_LEVEL, LOG_MAX_MB, GEMINI_RPM, HTTP_RATE_PER_HOST, DOCUMENT_STORE_DIR, ...) at import time
+load_dotenv()
+
+import http_client
+import google.generativeai as genai
 import fitz
-from PIL import Image
-import pytesseract
+import llm_cache
+import llm_scheduler
+import ocr_backends
+import pdf_text
+import rule_extractor
+import text_pruner
+import document_store
+from patient_roster import PatientRoster
+from ocr_farm import OCRFarm
+from run_journal import RunJournal
+from patient_id_store import PatientIdStore
 
 # Create necessary directories
 os.makedirs("logs", exist_ok=True)
@@ -19,7 +38,41 @@ os.makedirs("api_outputs", exist_ok=True)
 os.makedirs("csv_outputs", exist_ok=True)
 
 # Enhanced Logger from final_version.py
+class RotatingLogFile:
+    """Append-only text file rolled over to <name>.1, <name>.2, ... once it exceeds max_bytes"""
+    def __init__(self, path, max_bytes, backup_count):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.file = open(path, "a", encoding='utf-8')
+    def write_lines(self, lines):
+        self.file.write("".join(line + "\n" for line in lines))
+        if self.max_bytes and self.file.tell() >= self.max_bytes:
+            self.rotate()
+    def rotate(self):
+        self.file.close()
+        root, ext = os.path.splitext(self.path)
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{root}.{index}{ext}"
+            if os.path.exists(source):
+                os.replace(source, f"{root}.{index + 1}{ext}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{root}.1{ext}")
+        else:
+            os.remove(self.path)
+        self.file = open(self.path, "a", encoding='utf-8')
+    def flush(self):
+        self.file.flush()
+    def close(self):
+        self.file.close()
+
 class Logger:
+    """Console + file logger; messages are formatted and written by a background thread in batches.
+
+    Levels: DEBUG (data dumps), INFO (info/success/progress/header), WARNING, ERROR.
+    With json_lines=True every record is also written to logs/processing_log_*.jsonl
+    with timestamp, level, doc_id and any extra fields (stage=..., duration=...).
+    """
     COLORS = {
         'RED': '\033[91m',
         'GREEN': '\033[92m',
@@ -32,99 +85,177 @@ class Logger:
         'UNDERLINE': '\033[4m',
         'RESET': '\033[0m'
     }
-    def __init__(self):
+    LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'ERROR': 40}
+    ANSI_RE = re.compile(r'\033\[[0-9;]*[a-zA-Z]')
+    def __init__(self, level=None, json_lines=False, max_bytes=None, backup_count=5,
+                 flush_interval=0.5, batch_size=500):
+        # Defaults come from the environment at construction time, so .env values apply
+        level = level or os.getenv("LOG_LEVEL", "DEBUG")
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv("LOG_MAX_MB", "50")) * 1024 * 1024)
+        self.level = self.LEVELS[level.upper()]
+        self.json_lines = json_lines
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
         self.log_file = None
+        self.json_file = None
+        self.queue = queue.Queue()
+        self.closed = False
         self.setup_log_file()
+        self.writer = threading.Thread(target=self._writer_loop, name="logger-writer", daemon=True)
+        self.writer.start()
+        atexit.register(self.close)
     def setup_log_file(self):
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         log_dir = "logs"
         os.makedirs(log_dir, exist_ok=True)
-        self.log_file = open(os.path.join(log_dir, f"processing_log_{timestamp}.txt"), "w", encoding='utf-8')
-    def _write_to_file(self, message):
-        if self.log_file:
-            clean_message = re.sub(r'\033\[[0-9;]*[a-zA-Z]', '', message)
-            self.log_file.write(clean_message + "\n")
+        self.log_path = os.path.join(log_dir, f"processing_log_{timestamp}.txt")
+        self.log_file = RotatingLogFile(self.log_path, self.max_bytes, self.backup_count)
+        if self.json_lines:
+            self.enable_json_lines()
+    def enable_json_lines(self):
+        """Also write structured records to logs/processing_log_*.jsonl (e.g. from --log-json)"""
+        self.json_lines = True
+        if self.json_file is None:
+            self.json_file = RotatingLogFile(os.path.splitext(self.log_path)[0] + ".jsonl",
+                                             self.max_bytes, self.backup_count)
+    def set_level(self, level):
+        self.level = self.LEVELS[level.upper()]
+    def is_enabled(self, level):
+        return self.LEVELS[level] >= self.level
+    def _emit(self, kind, level, message, doc_id=None, data=None, **fields):
+        if self.LEVELS[level] < self.level or self.closed:
+            return
+        self.queue.put((time.time(), kind, level, message, doc_id, data, fields))
+    def _writer_loop(self):
+        while True:
+            item = self.queue.get()
+            batch = [item]
+            try:
+                # Pick up whatever else arrives within the flush window, up to batch_size records
+                deadline = time.monotonic() + self.flush_interval
+                while item is not None and len(batch) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self.queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    batch.append(item)
+                self._write_batch([record for record in batch if record is not None])
+            except Exception as e:
+                print(f"Logger writer error: {e}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+            if batch[-1] is None:
+                return
+    def _write_batch(self, records):
+        console, lines, json_lines = [], [], []
+        for ts, kind, level, message, doc_id, data, fields in records:
+            for line in self._format(ts, kind, message, doc_id, data):
+                console.append(line)
+                lines.append(self.ANSI_RE.sub('', line))
+            if self.json_file is not None:
+                record = {"ts": datetime.fromtimestamp(ts).isoformat(timespec="milliseconds"),
+                          "level": level, "kind": kind, "message": message}
+                if doc_id:
+                    record["doc_id"] = doc_id
+                if data is not None:
+                    record["data"] = data
+                record.update(fields)
+                json_lines.append(json.dumps(record, default=str, ensure_ascii=False))
+        if console:
+            print("\n".join(console), flush=True)
+        if self.log_file and lines:
+            self.log_file.write_lines(lines)
             self.log_file.flush()
-    def _colorize(self, text, color):
-        return f"{Logger.COLORS.get(color, '')}{text}{Logger.COLORS['RESET']}"
-    def _get_timestamp(self):
-        return datetime.now().strftime("%H:%M:%S")
-    def header(self, title):
-        message = f"\n{'='*80}\n{title.center(80)}\n{'='*80}"
-        print(self._colorize(message, 'CYAN'))
-        self._write_to_file(message)
-    def info(self, message, doc_id=None):
-        timestamp = self._get_timestamp()
-        prefix = f"[{timestamp}]"
-        if doc_id:
-            prefix += f" [DOC: {doc_id}]"
-        message = f"{self._colorize(prefix, 'BLUE')} ℹ️  {message}"
-        print(message)
-        self._write_to_file(message)
-    def success(self, message, doc_id=None):
-        timestamp = self._get_timestamp()
-        prefix = f"[{timestamp}]"
-        if doc_id:
-            prefix += f" [DOC: {doc_id}]"
-        message = f"{self._colorize(prefix, 'GREEN')} ✅ {self._colorize(message, 'GREEN')}"
-        print(message)
-        self._write_to_file(message)
-    def error(self, message, doc_id=None):
-        timestamp = self._get_timestamp()
-        prefix = f"[{timestamp}]"
+        if self.json_file is not None and json_lines:
+            self.json_file.write_lines(json_lines)
+            self.json_file.flush()
+    def _format(self, ts, kind, message, doc_id, data):
+        if kind == 'header':
+            return [self._colorize(f"\n{'='*80}\n{message.center(80)}\n{'='*80}", 'CYAN')]
+        prefix = f"[{datetime.fromtimestamp(ts).strftime('%H:%M:%S')}]"
         if doc_id:
             prefix += f" [DOC: {doc_id}]"
-        message = f"{self._colorize(prefix, 'RED')} ❌ {self._colorize(message, 'RED')}"
-        print(message)
-        self._write_to_file(message)
-    def warning(self, message, doc_id=None):
-        timestamp = self._get_timestamp()
-        prefix = f"[{timestamp}]"
-        if doc_id:
-            prefix += f" [DOC: {doc_id}]"
-        message = f"{self._colorize(prefix, 'YELLOW')} ⚠️  {self._colorize(message, 'YELLOW')}"
-        print(message)
-        self._write_to_file(message)
-    def progress(self, message, doc_id=None):
-        timestamp = self._get_timestamp()
-        prefix = f"[{timestamp}]"
-        if doc_id:
-            prefix += f" [DOC: {doc_id}]"
-        message = f"{self._colorize(prefix, 'PURPLE')} 🔄 {message}"
-        print(message)
-        self._write_to_file(message)
-    def data(self, title, data, doc_id=None):
-        timestamp = self._get_timestamp()
-        prefix = f"[{timestamp}]"
-        if doc_id:
-            prefix += f" [DOC: {doc_id}]"
-        message = f"{self._colorize(prefix, 'CYAN')} 📊 {self._colorize(title, 'BOLD')}"
-        print(message)
-        self._write_to_file(message)
+        if kind == 'info':
+            return [f"{self._colorize(prefix, 'BLUE')} ℹ️  {message}"]
+        if kind == 'debug':
+            return [f"{self._colorize(prefix, 'WHITE')} 🔍 {message}"]
+        if kind == 'success':
+            return [f"{self._colorize(prefix, 'GREEN')} ✅ {self._colorize(message, 'GREEN')}"]
+        if kind == 'error':
+            return [f"{self._colorize(prefix, 'RED')} ❌ {self._colorize(message, 'RED')}"]
+        if kind == 'warning':
+            return [f"{self._colorize(prefix, 'YELLOW')} ⚠️  {self._colorize(message, 'YELLOW')}"]
+        if kind == 'progress':
+            return [f"{self._colorize(prefix, 'PURPLE')} 🔄 {message}"]
+        # data
+        lines = [f"{self._colorize(prefix, 'CYAN')} 📊 {self._colorize(message, 'BOLD')}"]
         if isinstance(data, dict):
             for key, value in data.items():
-                message = f"     └─ {self._colorize(key, 'CYAN')}: {value}"
-                print(message)
-                self._write_to_file(message)
+                lines.append(f"     └─ {self._colorize(key, 'CYAN')}: {value}")
         else:
-            message = f"     └─ {data}"
-            print(message)
-            self._write_to_file(message)
+            lines.append(f"     └─ {data}")
+        return lines
+    def _colorize(self, text, color):
+        return f"{Logger.COLORS.get(color, '')}{text}{Logger.COLORS['RESET']}"
+    def header(self, title):
+        self._emit('header', 'INFO', title)
+    def debug(self, message, doc_id=None, **fields):
+        self._emit('debug', 'DEBUG', message, doc_id, **fields)
+    def info(self, message, doc_id=None, **fields):
+        self._emit('info', 'INFO', message, doc_id, **fields)
+    def success(self, message, doc_id=None, **fields):
+        self._emit('success', 'INFO', message, doc_id, **fields)
+    def error(self, message, doc_id=None, **fields):
+        self._emit('error', 'ERROR', message, doc_id, **fields)
+    def warning(self, message, doc_id=None, **fields):
+        self._emit('warning', 'WARNING', message, doc_id, **fields)
+    def progress(self, message, doc_id=None, **fields):
+        self._emit('progress', 'INFO', message, doc_id, **fields)
+    def data(self, title, data, doc_id=None, **fields):
+        """Verbose dump of a dict or text excerpt; only written at DEBUG level"""
+        self._emit('data', 'DEBUG', title, doc_id, data=data, **fields)
+    def flush(self):
+        """Block until every queued message has been written"""
+        if not self.closed:
+            self.queue.join()
     def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(None)
+        self.writer.join()
         if self.log_file:
             self.log_file.close()
+        if self.json_file is not None:
+            self.json_file.close()
 
 logger = Logger()
 
-# Load environment
-load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+# Base URLs can be pointed at a local stand-in (see ../mock_services.py) for offline benchmarking
+DA_API_BASE = os.getenv("DA_API_BASE", "https://api.doctoralliance.com").rstrip("/")
+WAV_API_BASE = os.getenv("WAV_API_BASE", "https://dawavorderpatient-hqe2apddbje9gte0.eastus-01.azurewebsites.net").rstrip("/")
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")
+
+if GEMINI_API_ENDPOINT:
+    genai.configure(api_key=os.getenv("GEMINI_API_KEY"), transport="rest",
+                    client_options={"api_endpoint": GEMINI_API_ENDPOINT})
+else:
+    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
 
 TOKEN = os.getenv("AUTH_TOKEN")
-DOC_API_URL = "https://api.doctoralliance.com/document/getfile?docId.id="
-DOC_STATUS_URL = "https://api.doctoralliance.com/document/get?docId.id="
-PATIENT_CREATE_URL = "https://dawavorderpatient-hqe2apddbje9gte0.eastus-01.azurewebsites.net/api/Patient/create"
-ORDER_PUSH_URL = "https://dawavorderpatient-hqe2apddbje9gte0.eastus-01.azurewebsites.net/api/Order"
+DOC_API_URL = f"{DA_API_BASE}/document/getfile?docId.id="
+DOC_STATUS_URL = f"{DA_API_BASE}/document/get?docId.id="
+PATIENT_CREATE_URL = f"{WAV_API_BASE}/api/Patient/create"
+ORDER_PUSH_URL = f"{WAV_API_BASE}/api/Order"
+PATIENT_LIST_URL = WAV_API_BASE + "/api/Patient/company/pg/{pg_id}"
+PATIENT_DETAILS_URL = WAV_API_BASE + "/api/Patient/get-patient/{patient_id}"
 
 
 
@@ -135,101 +266,331 @@ PG_NPI = "1265422596"
 with open("output.json") as f:
     company_map = json.load(f)
 
-if os.path.exists("hawthorn_internalmedicine.json") and os.path.getsize("hawthorn_internalmedicine.json") > 0:
-    with open("hawthorn_internalmedicine.json") as f:
-        created_patients = json.load(f)
-else:
-    created_patients = {}
+# FNAME_LNAME_DOB -> patientId, persisted one upsert at a time (imports the old JSON map on first use)
+created_patients = PatientIdStore("patient_ids.sqlite", legacy_json="hawthorn_internalmedicine.json")
 
 HEADERS = {"Authorization": f"Bearer {TOKEN}"}
+
+# Patient list for the PG, downloaded once per run and indexed by name + DOB / MRN / ID
+patient_roster = PatientRoster(PATIENT_LIST_URL.format(pg_id=PG_ID), HEADERS)
 AUDIT_PATIENTS_FILE = "audit_patients.csv"
 AUDIT_ORDERS_FILE = "audit_orders.csv"
 
+# "separate" = one Gemini call each for patient and order data, "combined" = one structured call for both
+EXTRACTION_MODE = "separate"
+
+# Shared state guards for concurrent mode (--workers > 1)
+patient_key_locks_lock = threading.Lock()
+patient_key_locks = {}
+
+class AuditSink:
+    """Buffered, thread-safe writer for the audit CSVs.
+
+    Rows are (timestamp, doc_id, reason_code, message); they are appended to their file
+    once max_rows are pending, when flush_interval seconds have passed, and on close().
+    An existing file in another layout (the old headerless doc_id, message rows) is moved
+    to <name>.legacy.csv before the first row is written, so each file has one layout.
+    """
+    HEADER = ["Timestamp", "Document_ID", "Reason_Code", "Message"]
+    def __init__(self, max_rows=100, flush_interval=5.0):
+        self.max_rows = max_rows
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.pending = {}  # audit file -> [rows]
+        self.pending_count = 0
+        self.checked = set()  # audit files whose layout was checked this run
+        self.stop_event = threading.Event()
+        self.flusher = threading.Thread(target=self._flush_loop, name="audit-flusher", daemon=True)
+        self.flusher.start()
+        atexit.register(self.close)
+    def record(self, audit_file, doc_id, reason_code, message):
+        row = [datetime.now().strftime("%Y-%m-%d %H:%M:%S"), doc_id, reason_code, message]
+        with self.lock:
+            self.pending.setdefault(audit_file, []).append(row)
+            self.pending_count += 1
+            if self.pending_count >= self.max_rows:
+                self._flush_locked()
+    def _flush_loop(self):
+        while not self.stop_event.wait(self.flush_interval):
+            self.flush()
+    def _rotate_legacy(self, audit_file):
+        """Move an existing audit file without the current header aside (to *.legacy.csv, *.legacy.1.csv, ...)"""
+        self.checked.add(audit_file)
+        if not os.path.exists(audit_file) or os.path.getsize(audit_file) == 0:
+            return
+        with open(audit_file, newline="") as file:
+            first_row = next(csv.reader(file), None)
+        if first_row == self.HEADER:
+            return
+        root, ext = os.path.splitext(audit_file)
+        legacy_path, index = f"{root}.legacy{ext}", 0
+        while os.path.exists(legacy_path):
+            index += 1
+            legacy_path = f"{root}.legacy.{index}{ext}"
+        os.replace(audit_file, legacy_path)
+        logger.warning(f"Audit file {audit_file} has the old layout; moved to {legacy_path}")
+    def _flush_locked(self):
+        for audit_file, rows in self.pending.items():
+            if not rows:
+                continue
+            if audit_file not in self.checked:
+                self._rotate_legacy(audit_file)
+            new_file = not os.path.exists(audit_file) or os.path.getsize(audit_file) == 0
+            with open(audit_file, "a", newline="") as file:
+                writer = csv.writer(file)
+                if new_file:
+                    writer.writerow(self.HEADER)
+                writer.writerows(rows)
+        self.pending = {}
+        self.pending_count = 0
+    def flush(self):
+        with self.lock:
+            self._flush_locked()
+    def close(self):
+        self.stop_event.set()
+        self.flush()
+
+audit_sink = AuditSink()
+
+def get_patient_key_lock(key):
+    """Return the lock for a patient key so two workers never create the same patient"""
+    with patient_key_locks_lock:
+        return patient_key_locks.setdefault(key, threading.Lock())
+
+# Per-CSV progress journal (see run_journal.py); opened in process_csv unless --no-journal
+run_journal = None
+
+def journal_stage(doc_id, stage, result=None):
+    """Record a completed pipeline stage so a restarted run can resume after it"""
+    if run_journal is not None:
+        run_journal.record(doc_id, stage, result)
+
+def journaled(doc_id, stage):
+    """Result of a stage completed in an earlier run, or None"""
+    if run_journal is None:
+        return None
+    return run_journal.get(doc_id, stage)
+
+def journal_done(doc_id, agency, patient_data, order_data, patient_id, api_results):
+    """Mark a document finished, keeping what is needed to re-emit its output rows"""
+    journal_stage(doc_id, "done", {
+        "agency": agency,
+        "patient_data": patient_data,
+        "order_data": order_data,
+        "patient_id": patient_id,
+        "api_results": api_results,
+    })
+
+# Per-document stage timings (seconds, monotonic). Nested stages are inclusive, e.g.
+# get_or_create_patient includes check_if_patient_exists and get_pdf_text includes OCR.
+TIMED_STAGES = [
+    "get_pdf_text", "ocr_pages", "pre_extract", "prune_text", "extract_patient_data",
+    "extract_order_data", "extract_combined_data", "check_if_patient_exists", "get_or_create_patient",
+    "fetch_signed_date", "push_order",
+]
+stage_context = threading.local()
+run_timings = []  # one {"stages": {...}, "total": seconds} per processed document
+run_timings_lock = threading.Lock()
+
+def timed_stage(func):
+    """Add the wrapped call's wall time to the current document's stage timings"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        started = time.monotonic()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timings = getattr(stage_context, "timings", None)
+            if timings is not None:
+                timings[func.__name__] = timings.get(func.__name__, 0.0) + time.monotonic() - started
+    return wrapper
+
+def current_stage_timings():
+    """(stage timings, seconds since the document started) for the document on this thread"""
+    timings = getattr(stage_context, "timings", None) or {}
+    started = getattr(stage_context, "started", None)
+    return timings, (time.monotonic() - started) if started is not None else 0.0
+
+# Per-document prompt text size before/after prune_text, written to the API details CSV
+PROMPT_SIZE_COLUMNS = {
+    "chars_before": "Prompt_Chars_Before", "chars_after": "Prompt_Chars_After",
+    "tokens_before": "Prompt_Tokens_Est_Before", "tokens_after": "Prompt_Tokens_Est_After",
+}
+
+def stage_column(stage):
+    return f"Seconds_{stage}"
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+def summarize_run_timings(wall_seconds):
+    """p50/p95/max per stage over the documents that ran it, plus documents per minute"""
+    with run_timings_lock:
+        documents = list(run_timings)
+    summary = {
+        "documents": len(documents),
+        "wall_seconds": round(wall_seconds, 3),
+        "documents_per_minute": round(len(documents) / (wall_seconds / 60), 2) if wall_seconds > 0 else 0.0,
+        "stages": {},
+    }
+    for stage in TIMED_STAGES + ["total"]:
+        values = [d["total"] if stage == "total" else d["stages"][stage]
+                  for d in documents if stage == "total" or stage in d["stages"]]
+        if values:
+            summary["stages"][stage] = {
+                "documents": len(values),
+                "p50": round(percentile(values, 50), 3),
+                "p95": round(percentile(values, 95), 3),
+                "max": round(max(values), 3),
+                "sum": round(sum(values), 3),
+            }
+    with rule_stats_lock:
+        summary["rule_preextraction"] = dict(rule_stats)
+    summary["llm_scheduler"] = gemini_scheduler.stats()
+    sizes = [d["prompt_size"] for d in documents if d.get("prompt_size")]
+    if sizes:
+        totals = {key: sum(size[key] for size in sizes) for key in PROMPT_SIZE_COLUMNS}
+        totals["documents"] = len(sizes)
+        totals["reduction_pct"] = round(100 * (1 - totals["chars_after"] / totals["chars_before"]), 1) \
+            if totals["chars_before"] else 0.0
+        summary["prompt_size"] = totals
+    return summary
+
+def log_run_summary(summary):
+    logger.header("RUN LATENCY SUMMARY")
+    logger.info(f"Documents: {summary['documents']} in {summary['wall_seconds']:.1f}s "
+                f"({summary['documents_per_minute']:.2f} docs/min)")
+    logger.info(f"{'Stage':<26} {'Docs':>5} {'p50 s':>8} {'p95 s':>8} {'max s':>8} {'sum s':>9}")
+    for stage, stats in summary["stages"].items():
+        logger.info(f"{stage:<26} {stats['documents']:>5} {stats['p50']:>8.2f} {stats['p95']:>8.2f} "
+                    f"{stats['max']:>8.2f} {stats['sum']:>9.1f}")
+    sizes = summary.get("prompt_size")
+    if sizes:
+        logger.info(f"Prompt text: ~{sizes['tokens_before']} -> ~{sizes['tokens_after']} tokens over "
+                    f"{sizes['documents']} document(s) ({sizes['reduction_pct']:.1f}% smaller)")
+    rules = summary["rule_preextraction"]
+    if rules["documents"]:
+        logger.info(f"Rule pre-extraction: {rules['documents']} document(s), Gemini calls skipped "
+                    f"{rules['patient_calls_skipped']} patient / {rules['order_calls_skipped']} order, "
+                    f"{rules['partial_calls']} partial call(s)")
+    scheduler = summary["llm_scheduler"]
+    if scheduler["calls"]:
+        logger.info(f"Gemini scheduler: {scheduler['calls']} call(s), {scheduler['rate_limited']} rate limited, "
+                    f"{scheduler['retries']} retried, {scheduler['gave_up']} given up; concurrency limit "
+                    f"{scheduler['limit']:.1f} (lowest {scheduler['lowest_limit']:.1f}, max {scheduler['max_concurrency']}), "
+                    f"{scheduler['wait_seconds']:.1f}s queued")
+
+class BufferedRowWriter:
+    """Collects DictWriter rows for one document so they can be written in input order"""
+    def __init__(self):
+        self.rows = []
+    def writerow(self, row):
+        self.rows.append(dict(row))
+    def replay(self, writer):
+        for row in self.rows:
+            writer.writerow(row)
+
+# Bump when extract_text_from_pdf_bytes changes so cached text in the document store is not reused
+TEXT_EXTRACTOR_VERSION = "final_version-text-v3"
+
 def is_scanned_pdf(pdf_bytes):
     """Check if a PDF is scanned by analyzing its content"""
     try:
-        with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-            total_text = ""
-            pages_checked = min(3, len(pdf.pages))  # Check first 3 pages or all if fewer
-            
-            for i, page in enumerate(pdf.pages[:pages_checked]):
-                text = page.extract_text()
-                if text:
-                    total_text += text.strip()
-                    
-            # More sophisticated detection criteria
-            if not total_text:
-                return True  # No text at all - definitely scanned
-            
-            # If text is very short or repetitive, likely scanned or problematic extraction
-            if len(total_text.strip()) < 100:
-                return True
+        total_text = ""
+        # Check first 3 pages or all if fewer
+        for text in pdf_text.page_texts(pdf_bytes, max_pages=3):
+            if text:
+                total_text += text.strip()
                 
-            # Check for repetitive content (like signature blocks)
-            lines = [line.strip() for line in total_text.split('\n') if line.strip()]
-            if len(lines) > 0:
-                unique_lines = set(lines)
-                repetition_ratio = len(unique_lines) / len(lines)
-                # If more than 70% of lines are repetitive, likely a problematic extraction
-                if repetition_ratio < 0.3:
-                    return True
-                    
-            # Check for meaningful content indicators
-            meaningful_indicators = ['patient', 'name', 'date of birth', 'dob', 'address', 'diagnosis', 'medical', 'record']
-            has_meaningful_content = any(indicator in total_text.lower() for indicator in meaningful_indicators)
+        # More sophisticated detection criteria
+        if not total_text:
+            return True  # No text at all - definitely scanned
+        
+        # If text is very short or repetitive, likely scanned or problematic extraction
+        if len(total_text.strip()) < 100:
+            return True
             
-            if not has_meaningful_content and len(total_text.strip()) < 500:
+        # Check for repetitive content (like signature blocks)
+        lines = [line.strip() for line in total_text.split('\n') if line.strip()]
+        if len(lines) > 0:
+            unique_lines = set(lines)
+            repetition_ratio = len(unique_lines) / len(lines)
+            # If more than 70% of lines are repetitive, likely a problematic extraction
+            if repetition_ratio < 0.3:
                 return True
                 
+        # Check for meaningful content indicators
+        meaningful_indicators = ['patient', 'name', 'date of birth', 'dob', 'address', 'diagnosis', 'medical', 'record']
+        has_meaningful_content = any(indicator in total_text.lower() for indicator in meaningful_indicators)
+        
+        if not has_meaningful_content and len(total_text.strip()) < 500:
+            return True
+            
         return False
     except Exception as e:
         logger.warning(f"Error checking if PDF is scanned: {e}")
         return True  # Assume scanned if check fails
 
+# Tesseract settings tuned for speed on 200 DPI renders
+OCR_DPI = ocr_backends.DEFAULT_DPI
+OCR_CONFIG = ocr_backends.DEFAULT_CONFIG
+# "auto" = in-process tesserocr when installed, else pytesseract (see ocr_backends.py); set by --ocr-backend.
+# Kept as requested: an explicit "tesserocr" that cannot start fails instead of falling back
+OCR_BACKEND = "auto"
+
+def ocr_page(pdf_document, page_num):
+    """Render one page (under the PyMuPDF lock) and OCR it with this thread's OCR backend"""
+    with pdf_text.FITZ_LOCK:
+        pix = pdf_document[page_num].get_pixmap(matrix=fitz.Matrix(OCR_DPI/72, OCR_DPI/72))
+    backend = ocr_backends.get_backend(OCR_BACKEND, OCR_CONFIG)
+    return backend.raw_to_string(pix.samples, pix.width, pix.height, pix.n)
+
+# Run-wide OCR process pool (see ocr_farm.py); started in main() unless --ocr-workers 0
+ocr_farm = None
+
+@timed_stage
+def ocr_pages(pdf_document, page_numbers, doc_id=None):
+    """OCR the given pages in parallel; returns {page_num: cleaned text}"""
+    import multiprocessing
+    
+    page_numbers = list(page_numbers)
+    if not page_numbers:
+        return {}
+    
+    # Determine number of workers (max 4 to avoid overwhelming system)
+    max_workers = min(4, multiprocessing.cpu_count(), len(page_numbers))
+    if ocr_farm is not None:
+        raw_texts = ocr_farm.ocr_pages(pdf_document, page_numbers, dpi=OCR_DPI)
+        page_texts = [raw_texts[n] for n in page_numbers]
+    elif max_workers > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            page_texts = list(executor.map(lambda n: ocr_page(pdf_document, n), page_numbers))
+    else:
+        page_texts = [ocr_page(pdf_document, n) for n in page_numbers]
+    return {n: re.sub(r'\s+', ' ', text).strip() for n, text in zip(page_numbers, page_texts)}
+
 def extract_text_with_ocr(pdf_bytes, doc_id):
-    """Extract text from scanned PDF using OCR - Optimized for speed"""
+    """Extract text from scanned PDF using OCR - Optimized for speed.
+
+    Not on the pipeline path (extract_text_from_pdf_bytes OCRs only image-only pages);
+    kept for benchmark_text_extraction.py's every-page-OCR baseline."""
     try:
         logger.progress("Using OCR to extract text from scanned document", doc_id)
         
         # Open PDF with PyMuPDF
-        pdf_document = fitz.open(stream=pdf_bytes, filetype="pdf")
-        
-        # Process pages in parallel for speed
-        from concurrent.futures import ThreadPoolExecutor
-        import multiprocessing
-        
-        def process_page(page_num):
-            page = pdf_document[page_num]
-            
-            # Convert page to image with lower DPI for speed (200 instead of 300)
-            pix = page.get_pixmap(matrix=fitz.Matrix(200/72, 200/72))  # 200 DPI for speed
-            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-            
-            # Optimized Tesseract config for speed
-            custom_config = r'--oem 3 --psm 6 -c tessedit_char_whitelist=0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz:/-.,()[] '
-            
-            # Extract text using pytesseract with optimized settings
-            page_text = pytesseract.image_to_string(img, config=custom_config)
-            return page_text
-        
-        # Determine number of workers (max 4 to avoid overwhelming system)
-        max_workers = min(4, multiprocessing.cpu_count(), len(pdf_document))
-        
-        # Process pages in parallel
-        text_parts = []
-        if len(pdf_document) > 1 and max_workers > 1:
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                page_texts = list(executor.map(process_page, range(len(pdf_document))))
-                text_parts.extend(page_texts)
-        else:
-            # Single page or single threaded fallback
-            text_parts = [process_page(0)]
-        
-        pdf_document.close()
-        full_text = "\n".join(text_parts)
+        with pdf_text.FITZ_LOCK:
+            pdf_document = fitz.open(stream=pdf_bytes, filetype="pdf")
+            page_count = len(pdf_document)
+        try:
+            page_texts = ocr_pages(pdf_document, range(page_count), doc_id)
+        finally:
+            with pdf_text.FITZ_LOCK:
+                pdf_document.close()
         
-        # Clean up the text (simplified for speed)
-        cleaned_text = re.sub(r'\s+', ' ', full_text).strip()
+        cleaned_text = " ".join(page_texts[n] for n in sorted(page_texts)).strip()
         logger.data("OCR extracted text (truncated)", cleaned_text[:500], doc_id)
         return cleaned_text
         
@@ -237,52 +598,102 @@ def extract_text_with_ocr(pdf_bytes, doc_id):
         logger.error(f"Error in OCR text extraction: {e}", doc_id)
         raise
 
+# Page classification thresholds for the hybrid text-layer / OCR extraction
+MIN_PAGE_TEXT_CHARS = 50          # fewer characters than this in the text layer => image-only page
+SCANNED_PAGE_IMAGE_COVERAGE = 0.6 # page mostly covered by images...
+SCANNED_PAGE_MAX_CHARS = 300      # ...with only a fax header / stamp worth of text => OCR it
+REPETITIVE_PAGE_UNIQUE_RATIO = 0.3
+
+def classify_pdf_pages(pdf_document):
+    """Single pass over the PDF: returns [(text_layer, needs_ocr)] for each page"""
+    pages = []
+    for page in pdf_document:
+        text = page.get_text()
+        chars = len(text.strip())
+        page_area = abs(page.rect) or 1
+        image_area = sum(abs(fitz.Rect(info["bbox"]) & page.rect) for info in page.get_image_info())
+        coverage = min(image_area / page_area, 1.0)
+        
+        lines = [line.strip() for line in text.split('\n') if line.strip()]
+        repetitive = len(lines) >= 5 and len(set(lines)) / len(lines) < REPETITIVE_PAGE_UNIQUE_RATIO
+        
+        needs_ocr = (
+            chars < MIN_PAGE_TEXT_CHARS
+            or (coverage >= SCANNED_PAGE_IMAGE_COVERAGE and chars < SCANNED_PAGE_MAX_CHARS)
+            or repetitive
+        )
+        pages.append((text, needs_ocr))
+    return pages
+
+@timed_stage
 def get_pdf_text(doc_id):
     logger.progress("Step 1: Fetching and extracting PDF text", doc_id)
     try:
-        response = requests.get(f"{DOC_API_URL}{doc_id}", headers=HEADERS)
-        if response.status_code != 200:
-            logger.error(f"Failed to fetch document: {response.text}", doc_id)
+        store = document_store.get_store()
+        try:
+            document = store.fetch(doc_id, f"{DOC_API_URL}{doc_id}", HEADERS)
+        except document_store.DocumentFetchError as e:
+            logger.error(f"Failed to fetch document: {e.response_text or e}", doc_id)
             raise Exception("Failed to fetch document")
+        if document.from_cache:
+            logger.info("Using PDF from local document store", doc_id)
             
-        daId = response.json()["value"]["patientId"]["id"]
-        document_buffer = response.json()["value"]["documentBuffer"]
-        pdf_bytes = base64.b64decode(document_buffer)
-        
-        text = ""
+        daId = document.metadata["patientId"]["id"]
         
-        # Check if document is scanned
-        if is_scanned_pdf(pdf_bytes):
-            logger.info("Document appears to be scanned, using OCR", doc_id)
-            text = extract_text_with_ocr(pdf_bytes, doc_id)
+        edited = store.get_text(document.content_hash, TEXT_EXTRACTOR_VERSION)
+        if edited is not None:
+            logger.info("Using extracted text from local document store", doc_id)
         else:
-            logger.info("Document appears to be digital, using PDFPlumber", doc_id)
-            with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
-                text = "\n".join([page.extract_text() for page in pdf.pages if page.extract_text()])
-            
-            # Fallback: If digital extraction yielded poor results, try OCR
-            if not text or len(text.strip()) < 200 or is_text_repetitive(text):
-                logger.warning("Digital PDF extraction yielded insufficient text, falling back to OCR", doc_id)
-                try:
-                    text = extract_text_with_ocr(pdf_bytes, doc_id)
-                except Exception as ocr_error:
-                    logger.error(f"OCR fallback also failed: {ocr_error}", doc_id)
-                    # Continue with whatever text we have
-        
-        # Clean up the text
-        edited = re.sub(r'\b\d[A-Z][A-Z0-9]\d[A-Z][A-Z0-9]\d[A-Z]{2}(?:\d{2})?\b', '', text)
-        logger.data("Extracted PDF text (truncated)", edited[:500], doc_id)
-        
-        # Final check: if we still don't have meaningful text, log a warning
-        if not edited or len(edited.strip()) < 100:
-            logger.warning(f"Very little text extracted from PDF. May affect data extraction quality.", doc_id)
-            
+            edited = extract_text_from_pdf_bytes(document.pdf_bytes, doc_id)
+            store.put_text(document.content_hash, TEXT_EXTRACTOR_VERSION, edited)
         return [edited, daId]
         
     except Exception as e:
         logger.error(f"Error extracting PDF text: {e}", doc_id)
         raise
 
+def extract_text_from_pdf_bytes(pdf_bytes, doc_id=None):
+    """Extract and clean text from PDF bytes: text layer for digital pages, OCR only for image-only pages"""
+    # PyMuPDF is not thread-safe: open/classify/close hold pdf_text.FITZ_LOCK, OCR takes it per page render
+    with pdf_text.FITZ_LOCK:
+        pdf_document = fitz.open(stream=pdf_bytes, filetype="pdf")
+    try:
+        with pdf_text.FITZ_LOCK:
+            pages = classify_pdf_pages(pdf_document)
+        ocr_needed = [n for n, (_, needs_ocr) in enumerate(pages) if needs_ocr]
+        logger.info(f"Page classification: {len(pages) - len(ocr_needed)} text-layer page(s), "
+                    f"{len(ocr_needed)} image-only page(s) sent to OCR", doc_id)
+        
+        ocr_text = {}
+        if ocr_needed:
+            logger.progress(f"Using OCR on pages {[n + 1 for n in ocr_needed]}", doc_id)
+            try:
+                ocr_text = ocr_pages(pdf_document, ocr_needed, doc_id)
+            except Exception as ocr_error:
+                logger.error(f"OCR failed: {ocr_error}", doc_id)
+                # Continue with whatever the text layer has
+    finally:
+        with pdf_text.FITZ_LOCK:
+            pdf_document.close()
+    
+    parts = []
+    for n, (layer_text, needs_ocr) in enumerate(pages):
+        page_text = ocr_text.get(n) if needs_ocr and ocr_text.get(n) else layer_text
+        if page_text and page_text.strip():
+            parts.append(page_text.strip())
+    # Form feed between pages so text_pruner can tell the first page and cross-page repeats apart
+    text = "\f".join(parts)
+    
+    # Clean up the text
+    edited = re.sub(r'\b\d[A-Z][A-Z0-9]\d[A-Z][A-Z0-9]\d[A-Z]{2}(?:\d{2})?\b', '', text)
+    logger.data("Extracted PDF text (truncated)", edited[:500], doc_id)
+    
+    # Final check: if we still don't have meaningful text, log a warning
+    if not edited or len(edited.strip()) < 100:
+        logger.warning(f"Very little text extracted from PDF. May affect data extraction quality.", doc_id)
+        
+    return edited
+
 def is_text_repetitive(text):
     """Check if text is mostly repetitive (like signature blocks)"""
     if not text or len(text.strip()) < 50:
@@ -296,8 +707,9 @@ def is_text_repetitive(text):
     repetition_ratio = len(unique_lines) / len(lines)
     return repetition_ratio < 0.4  # If less than 40% of lines are unique, consider it repetitive
 
-def extract_patient_data(text, doc_id=None):
-    query = """
+GEMINI_MODEL = "gemini-1.5-flash"
+
+PATIENT_QUERY = """
 You are a medical data extraction expert. Extract the following fields from the provided medical document text. 
 
 IMPORTANT INSTRUCTIONS:
@@ -356,25 +768,8 @@ Common field variations to look for:
 
 Return only the JSON object with extracted data.
 """
-    try:
-        logger.progress("Step 2: Extracting patient data using Gemini", doc_id)
-        response = genai.GenerativeModel("gemini-1.5-flash").generate_content([text, query])
-        match = re.search(r"\{.*\}", response.text, re.DOTALL)
-        data = json.loads(match.group()) if match else {}
-        
-        # Log a warning if most fields are empty
-        filled_fields = sum(1 for v in data.values() if v and str(v).strip())
-        if filled_fields < 3:
-            logger.warning(f"Very few fields extracted ({filled_fields} filled). Text quality may be poor.", doc_id)
-        
-        logger.data("Extracted patient data", data, doc_id)
-        return data
-    except Exception as e:
-        logger.error(f"Error extracting patient data: {e}", doc_id)
-        return {}
 
-def extract_order_data(text, doc_id=None):
-    query = """
+ORDER_QUERY = """
 You are a medical data extraction expert. Extract the following fields from the provided medical document text. Return ONLY a valid JSON object, no extra text. If a field is missing, use an empty string or null. Do not infer values. Use the field names exactly as shown.
 
 {
@@ -412,20 +807,336 @@ Clarifications:
 - If a field is not found, leave it blank or null.
 - Return only the JSON object.
 """
+
+PATIENT_FIELDS = [
+    "patientFName", "patientLName", "dob", "patientSex", "medicalRecordNo", "billingProvider", "npi",
+    "physicianNPI", "nameOfAgency", "address", "city", "state", "zip", "email", "phoneNumber",
+    "serviceLine", "payorSource"
+]
+EPISODE_FIELDS = [
+    "startOfCare", "startOfEpisode", "endOfEpisode", "firstDiagnosis", "secondDiagnosis",
+    "thirdDiagnosis", "fourthDiagnosis", "fifthDiagnosis", "sixthDiagnosis"
+]
+ORDER_FIELDS = [
+    "orderNo", "orderDate", "startOfCare", "episodeStartDate", "episodeEndDate", "documentID", "mrn",
+    "patientName", "sentToPhysicianDate", "signedByPhysicianDate", "patientId", "companyId",
+    "pgCompanyId", "bit64Url", "documentName", "serviceLine", "payorSource", "patientSex",
+    "patientAddress", "patientCity", "patientState", "patientZip", "patientPhone"
+]
+ORDER_BOOLEAN_FIELDS = ["sentToPhysicianStatus", "signedByPhysicianStatus"]
+# Order fields set by process_document / push_order, never asked from Gemini in a partial call
+PIPELINE_ORDER_FIELDS = {
+    "documentID", "patientId", "companyId", "pgCompanyId", "bit64Url", "sentToPhysicianDate",
+    "sentToPhysicianStatus", "signedByPhysicianDate", "signedByPhysicianStatus",
+}
+
+def _string_properties(fields):
+    return {field: {"type": "STRING"} for field in fields}
+
+# Gemini structured-output schema for the single-call patient + order extraction
+COMBINED_RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "patient": {
+            "type": "OBJECT",
+            "properties": {
+                **_string_properties(PATIENT_FIELDS),
+                "episodeDiagnoses": {
+                    "type": "ARRAY",
+                    "items": {"type": "OBJECT", "properties": _string_properties(EPISODE_FIELDS)}
+                }
+            }
+        },
+        "order": {
+            "type": "OBJECT",
+            "properties": {
+                **_string_properties(ORDER_FIELDS),
+                **{field: {"type": "BOOLEAN"} for field in ORDER_BOOLEAN_FIELDS}
+            }
+        }
+    },
+    "required": ["patient", "order"]
+}
+
+COMBINED_QUERY = """
+You are a medical data extraction expert. Extract BOTH the patient record and the order record from the provided medical document text in a single JSON object with two keys: "patient" and "order".
+
+IMPORTANT INSTRUCTIONS:
+1. If a field is missing or unclear, use an empty string ("").
+2. Do NOT infer or guess values - only extract what is explicitly present.
+3. Look carefully for variations in field names (e.g., "DOB", "Date of Birth", "Birth Date").
+4. Dates must be in MM/DD/YYYY format.
+5. Values shared by both records (dates, sex, address, serviceLine, payorSource) must be identical in "patient" and "order".
+
+"patient" fields: patient demographics, agency, NPI, service line, payor source and an "episodeDiagnoses" list
+with startOfCare, startOfEpisode, endOfEpisode and up to six diagnoses (firstDiagnosis ... sixthDiagnosis).
+
+"order" fields: orderNo, orderDate, startOfCare, episodeStartDate, episodeEndDate, mrn, patientName, physician
+sent/signed dates and statuses, documentName, serviceLine, payorSource and the patient's sex, address, city,
+state, zip and phone.
+
+Common field variations to look for:
+- Patient Name, Name, Patient, First Name, Last Name
+- DOB, Date of Birth, Birth Date, Born
+- MRN, Medical Record Number, Record Number, Patient ID
+- Agency, Provider, Healthcare Provider, Organization
+- Start of Care, SOC, Care Start Date
+- Episode Start, Episode End, Episode Dates, Cert Period
+- Diagnosis, Dx, Primary Diagnosis, Secondary Diagnosis
+"""
+
+PATIENT_PROMPT_VERSION = llm_cache.prompt_version(PATIENT_QUERY)
+ORDER_PROMPT_VERSION = llm_cache.prompt_version(ORDER_QUERY)
+COMBINED_PROMPT_VERSION = llm_cache.prompt_version(COMBINED_QUERY, json.dumps(COMBINED_RESPONSE_SCHEMA, sort_keys=True))
+
+# On-disk cache of parsed Gemini results (see llm_cache.py); opened in main() unless --no-llm-cache
+extraction_cache = None
+
+def get_cached_extraction(text, kind, version, doc_id=None):
+    """Return a previously parsed Gemini result for this exact text/prompt/model, if cached"""
+    if extraction_cache is None:
+        return None
     try:
-        logger.progress("Step 3: Extracting order data using Gemini", doc_id)
-        response = genai.GenerativeModel("gemini-1.5-flash").generate_content([text, query])
+        data = extraction_cache.get(text, kind, version, GEMINI_MODEL)
+    except Exception as e:
+        logger.warning(f"LLM cache lookup failed: {e}", doc_id)
+        return None
+    if data is not None:
+        logger.info(f"Using cached Gemini {kind} extraction (prompt {version})", doc_id)
+    return data
+
+def cache_extraction(text, kind, version, data, doc_id=None):
+    if extraction_cache is None or not data:
+        return
+    try:
+        extraction_cache.put(text, kind, version, GEMINI_MODEL, data, doc_id)
+    except Exception as e:
+        logger.warning(f"LLM cache write failed: {e}", doc_id)
+
+# Token/latency accounting per Gemini call type, read by benchmark_extraction.py
+llm_usage = {}
+llm_usage_lock = threading.Lock()
+
+def record_llm_usage(stage, response, elapsed):
+    """Accumulate call count, latency and token usage for one Gemini response"""
+    usage = getattr(response, "usage_metadata", None)
+    prompt_tokens = getattr(usage, "prompt_token_count", 0) or 0
+    output_tokens = getattr(usage, "candidates_token_count", 0) or 0
+    with llm_usage_lock:
+        stats = llm_usage.setdefault(stage, {"calls": 0, "seconds": 0.0, "prompt_tokens": 0, "output_tokens": 0})
+        stats["calls"] += 1
+        stats["seconds"] += elapsed
+        stats["prompt_tokens"] += prompt_tokens
+        stats["output_tokens"] += output_tokens
+
+# Rate limits and adaptive concurrency for every Gemini call (see llm_scheduler.py); rebuilt in main()
+# from --llm-rpm / --llm-tpm / --llm-max-concurrency
+gemini_scheduler = llm_scheduler.LLMScheduler()
+# Output allowance added to the prompt estimate taken from the tokens/minute bucket
+LLM_OUTPUT_TOKENS_ESTIMATE = 1000
+
+def generate_content(stage, model, text, query):
+    """One Gemini call through gemini_scheduler; raises llm_scheduler.LLMRateLimitError when
+    the call is still rate limited after the scheduler's retries"""
+    def send():
+        started = time.monotonic()
+        response = model.generate_content([text, query])
+        record_llm_usage(stage, response, time.monotonic() - started)
+        return response
+    est_tokens = text_pruner.estimate_tokens(text) + text_pruner.estimate_tokens(query) + LLM_OUTPUT_TOKENS_ESTIMATE
+    return gemini_scheduler.call(send, est_tokens)
+
+PARTIAL_QUERY = """
+You are a medical data extraction expert. Extract ONLY the following fields from the provided medical document text:
+{fields}
+
+Return ONLY a valid JSON object with exactly these keys, no extra text. If a field is missing or unclear, use an
+empty string (""). Do not infer values - only extract what is explicitly present. Dates must be in MM/DD/YYYY format.
+"""
+
+# Rule-based pre-extraction before Gemini (see rule_extractor.py); disabled with --no-rules
+RULE_PREEXTRACTION = True
+rule_stats = {"documents": 0, "patient_calls_skipped": 0, "order_calls_skipped": 0, "partial_calls": 0}
+rule_stats_lock = threading.Lock()
+
+def count_rule_stat(name):
+    with rule_stats_lock:
+        rule_stats[name] += 1
+
+@timed_stage
+def pre_extract(text, doc_id=None):
+    """Run the compiled rule set over the text; None when rule pre-extraction is disabled"""
+    if not RULE_PREEXTRACTION:
+        return None
+    rules = rule_extractor.extract(text)
+    count_rule_stat("documents")
+    logger.info(f"Rule pre-extraction: {len(rules.accepted())} field(s) accepted; missing patient "
+                f"{rules.missing('patient') or 'none'}, order {rules.missing('order') or 'none'}", doc_id)
+    logger.data("Rule pre-extraction confidence", rules.confidence, doc_id)
+    return rules
+
+# Relevance-window pruning of the text sent to Gemini (see text_pruner.py); --no-prune / --prompt-token-budget
+PRUNE_TEXT = True
+PROMPT_TOKEN_BUDGET = text_pruner.DEFAULT_TOKEN_BUDGET
+
+@timed_stage
+def prune_text(text, doc_id=None):
+    """Text for the Gemini prompts: first page plus label windows, within PROMPT_TOKEN_BUDGET"""
+    if PRUNE_TEXT:
+        pruned, stats = text_pruner.prune(text, PROMPT_TOKEN_BUDGET)
+    else:
+        pruned, stats = text, text_pruner.size_stats(text, text)
+    if getattr(stage_context, "timings", None) is not None:
+        stage_context.prompt_size = stats
+    logger.info(f"Prompt text {stats['chars_before']} -> {stats['chars_after']} chars "
+                f"(~{stats['tokens_before']} -> ~{stats['tokens_after']} tokens)", doc_id,
+                stage="prune_text", **stats)
+    return pruned
+
+def unfilled_fields(kind, rules):
+    """Fields of the patient/order output schema the rules did not fill, without the pipeline-owned order fields"""
+    filled = rules.record(kind)
+    if kind == "patient":
+        schema = PATIENT_FIELDS + EPISODE_FIELDS
+    else:
+        schema = [field for field in ORDER_FIELDS + ORDER_BOOLEAN_FIELDS if field not in PIPELINE_ORDER_FIELDS]
+    return [field for field in schema if not filled.get(field)]
+
+def extract_missing_fields(text, kind, rules, doc_id=None):
+    """Ask Gemini only for the fields of a patient/order record the rules did not fill, then overlay the rule values"""
+    fields = unfilled_fields(kind, rules)
+    query = PARTIAL_QUERY.format(fields="\n".join(f"- {field}" for field in fields))
+    version = llm_cache.prompt_version(query)
+    count_rule_stat("partial_calls")
+    logger.progress(f"Asking Gemini for {len(fields)} {kind} field(s) the rules could not fill", doc_id)
+    data = get_cached_extraction(text, f"{kind}_partial", version, doc_id)
+    if data is None:
+        response = generate_content(f"{kind}_partial", genai.GenerativeModel(GEMINI_MODEL), text, query)
         match = re.search(r"\{.*\}", response.text, re.DOTALL)
         data = json.loads(match.group()) if match else {}
+        cache_extraction(text, f"{kind}_partial", version, data, doc_id)
+    if kind == "patient":
+        episode = {field: data.pop(field) for field in EPISODE_FIELDS if field in data}
+        if episode or not data.get("episodeDiagnoses"):
+            data["episodeDiagnoses"] = [episode]
+    return rules.apply(kind, data)
+
+def extract_with_rules(text, kind, rules, doc_id=None):
+    """Rule-only record when every required field was found, else a partial Gemini call for the unfilled fields;
+    None = use the full prompt"""
+    if rules is None or not rules.record(kind):
+        return None
+    if not rules.missing(kind):
+        count_rule_stat(f"{kind}_calls_skipped")
+        logger.success(f"All required {kind} fields found by rules, skipping Gemini", doc_id)
+        return rules.apply(kind, {})
+    return extract_missing_fields(text, kind, rules, doc_id)
+
+@timed_stage
+def extract_patient_data(text, doc_id=None, rules=None):
+    query = PATIENT_QUERY
+    try:
+        logger.progress("Step 2: Extracting patient data using Gemini", doc_id)
+        data = extract_with_rules(text, "patient", rules, doc_id)
+        if data is None:
+            data = get_cached_extraction(text, "patient", PATIENT_PROMPT_VERSION, doc_id)
+        if data is None:
+            response = generate_content("patient", genai.GenerativeModel(GEMINI_MODEL), text, query)
+            match = re.search(r"\{.*\}", response.text, re.DOTALL)
+            data = json.loads(match.group()) if match else {}
+            cache_extraction(text, "patient", PATIENT_PROMPT_VERSION, data, doc_id)
+        
+        # Log a warning if most fields are empty
+        filled_fields = sum(1 for v in data.values() if v and str(v).strip())
+        if filled_fields < 3:
+            logger.warning(f"Very few fields extracted ({filled_fields} filled). Text quality may be poor.", doc_id)
+        
+        logger.data("Extracted patient data", data, doc_id)
+        return data
+    except llm_scheduler.LLMRateLimitError as e:
+        logger.error(f"Gemini rate limited while extracting patient data: {e}", doc_id)
+        raise
+    except Exception as e:
+        logger.error(f"Error extracting patient data: {e}", doc_id)
+        return {}
+
+@timed_stage
+def extract_order_data(text, doc_id=None, rules=None):
+    query = ORDER_QUERY
+    try:
+        logger.progress("Step 3: Extracting order data using Gemini", doc_id)
+        data = extract_with_rules(text, "order", rules, doc_id)
+        if data is None:
+            data = get_cached_extraction(text, "order", ORDER_PROMPT_VERSION, doc_id)
+        if data is None:
+            response = generate_content("order", genai.GenerativeModel(GEMINI_MODEL), text, query)
+            match = re.search(r"\{.*\}", response.text, re.DOTALL)
+            data = json.loads(match.group()) if match else {}
+            cache_extraction(text, "order", ORDER_PROMPT_VERSION, data, doc_id)
         logger.data("Extracted order data", data, doc_id)
         return data
+    except llm_scheduler.LLMRateLimitError as e:
+        logger.error(f"Gemini rate limited while extracting order data: {e}", doc_id)
+        raise
     except Exception as e:
         logger.error(f"Error extracting order data: {e}", doc_id)
         return {}
 
+@timed_stage
+def extract_combined_data(text, doc_id=None, rules=None):
+    """Extract patient and order data with one schema-constrained Gemini call.
+
+    Returns (patient_data, order_data). If the combined call fails, falls back to
+    extract_patient_data and returns None for order_data so the caller runs extract_order_data;
+    a rate-limit error (llm_scheduler.LLMRateLimitError) is raised instead of falling back.
+    When the rules found every required patient and order field the call is skipped;
+    otherwise accepted rule values are overlaid on the Gemini result.
+    """
+    try:
+        if rules is not None and not rules.missing("patient") and not rules.missing("order"):
+            count_rule_stat("patient_calls_skipped")
+            count_rule_stat("order_calls_skipped")
+            logger.success("All required patient and order fields found by rules, skipping Gemini", doc_id)
+            return rules.apply("patient", {}), rules.apply("order", {})
+        logger.progress("Step 2: Extracting patient + order data using one Gemini call", doc_id)
+        data = get_cached_extraction(text, "combined", COMBINED_PROMPT_VERSION, doc_id)
+        if data is None:
+            model = genai.GenerativeModel(
+                GEMINI_MODEL,
+                generation_config={
+                    "response_mime_type": "application/json",
+                    "response_schema": COMBINED_RESPONSE_SCHEMA,
+                },
+            )
+            response = generate_content("combined", model, text, COMBINED_QUERY)
+            data = json.loads(response.text)
+            if data.get("patient"):
+                cache_extraction(text, "combined", COMBINED_PROMPT_VERSION, data, doc_id)
+        patient_data = data.get("patient") or {}
+        order_data = data.get("order") or {}
+        if not patient_data:
+            raise ValueError("Combined response did not contain patient data")
+        if rules is not None:
+            patient_data, order_data = rules.apply("patient", patient_data), rules.apply("order", order_data)
+
+        filled_fields = sum(1 for v in patient_data.values() if v and str(v).strip())
+        if filled_fields < 3:
+            logger.warning(f"Very few fields extracted ({filled_fields} filled). Text quality may be poor.", doc_id)
+
+        logger.data("Extracted patient data", patient_data, doc_id)
+        logger.data("Extracted order data", order_data, doc_id)
+        return patient_data, order_data
+    except llm_scheduler.LLMRateLimitError as e:
+        logger.error(f"Gemini rate limited during combined extraction: {e}", doc_id)
+        raise
+    except Exception as e:
+        logger.warning(f"Combined extraction failed ({e}), falling back to separate patient/order calls", doc_id)
+        return extract_patient_data(text, doc_id, rules), None
+
+@timed_stage
 def fetch_signed_date(doc_id):
     try:
-        response = requests.get(f"{DOC_STATUS_URL}{doc_id}", headers=HEADERS)
+        response = http_client.get(f"{DOC_STATUS_URL}{doc_id}", headers=HEADERS)
         if response.status_code == 200:
             value = response.json().get("value", {})
             if value.get("documentStatus") == "Signed":
@@ -441,8 +1152,11 @@ def fetch_signed_date(doc_id):
 
 def get_patient_details_from_api(patient_id):
     try:
-        url = f"https://dawavorderpatient-hqe2apddbje9gte0.eastus-01.azurewebsites.net/api/Patient/get-patient/{patient_id}"
-        response = requests.get(url, headers=HEADERS)
+        cached = patient_roster.get(patient_id)
+        if cached and cached.get("agencyInfo"):
+            return cached
+        url = PATIENT_DETAILS_URL.format(patient_id=patient_id)
+        response = http_client.get(url, headers=HEADERS)
         if response.status_code == 200:
             return response.json()
         else:
@@ -452,72 +1166,62 @@ def get_patient_details_from_api(patient_id):
         logger.warning(f"Error fetching patient details: {e}")
         return {}
 
-def check_if_patient_exists(fname, lname, dob, doc_id=None):
+@timed_stage
+def check_if_patient_exists(fname, lname, dob, doc_id=None, mrn=None):
     try:
-        url = f"https://dawavorderpatient-hqe2apddbje9gte0.eastus-01.azurewebsites.net/api/Patient/company/pg/{PG_ID}"
-        response = requests.get(url, headers=HEADERS)
-        if response.status_code != 200:
+        if not patient_roster.ensure_loaded():
             logger.warning("Failed to fetch patient list.", doc_id)
             return None
-        patients = response.json()
-        dob = dob.strip()
-        fname = fname.strip().upper()
-        lname = lname.strip().upper()
-        for p in patients:
-            info = p.get("agencyInfo", {})
-            if not info:
-                continue
-            existing_fname = (info.get("patientFName") or "").strip().upper()
-            existing_lname = (info.get("patientLName") or "").strip().upper()
-            existing_dob = (info.get("dob") or "").strip()
-            if existing_fname == fname and existing_lname == lname and existing_dob == dob:
-                patient_id = p.get("id") or p.get("patientId")
-                logger.success(f"Patient exists: {fname} {lname}, DOB: {dob}, ID: {patient_id}", doc_id)
-                return patient_id
-        return None
+        patient_id = patient_roster.find(fname, lname, dob)
+        if patient_id:
+            logger.success(f"Patient exists: {fname.strip().upper()} {lname.strip().upper()}, DOB: {dob.strip()}, ID: {patient_id}", doc_id)
+        elif mrn and patient_roster.find_by_mrn(mrn):
+            logger.warning(f"MRN {mrn} already belongs to patient ID {patient_roster.find_by_mrn(mrn)} with a different name/DOB", doc_id)
+        return patient_id
     except Exception as e:
         logger.error(f"Error checking if patient exists: {e}", doc_id)
         return None
 
+@timed_stage
 def get_or_create_patient(patient_data, daId, agency, doc_id=None):
     try:
         dob = patient_data.get("dob", "").strip()
         fname = patient_data.get("patientFName", "").strip().upper()
         lname = patient_data.get("patientLName", "").strip().upper()
         key = f"{fname}_{lname}_{dob}"
-        if key in created_patients:
-            logger.success(f"Patient already created earlier in this run: {key}", doc_id)
-            return created_patients[key]
-        existing_id = check_if_patient_exists(fname, lname, dob, doc_id)
-        if existing_id:
-            logger.success(f"Patient exists on platform: {key}, ID: {existing_id}", doc_id)
-            created_patients[key] = existing_id
-            with open("hawthorn_internalmedicine.json", "w") as f:
-                json.dump(created_patients, f, indent=2)
-            return existing_id
-        # Add required fields
-        patient_data["daBackofficeID"] = str(daId)
-        patient_data["pgCompanyId"] = PG_ID
-        patient_data["companyId"] = company_map.get(agency.strip().lower())
-        patient_data["physicianGroup"] = PG_NAME
-        patient_data["physicianGroupNPI"] = PG_NPI
-        logger.info(f"Patient JSON for creating patient: {patient_data}", doc_id)
-        resp = requests.post(PATIENT_CREATE_URL, headers={"Content-Type": "application/json"}, json=patient_data)
-        logger.info(f"Patient creation status code: {resp.status_code}", doc_id)
-        logger.info(f"Patient creation response: {resp.text}", doc_id)
-        if resp.status_code == 201:
-            new_id = resp.json().get("id") or resp.text
-            created_patients[key] = new_id
-            with open("hawthorn_internalmedicine.json", "w") as f:
-                json.dump(created_patients, f, indent=2)
-            return new_id
-        else:
-            logger.error(f"Failed to create patient: {resp.text}", doc_id)
-        return None
+        with get_patient_key_lock(key):
+            known_id = created_patients.get(key)
+            if known_id:
+                logger.success(f"Patient already resolved in an earlier document: {key}", doc_id)
+                return known_id
+            existing_id = check_if_patient_exists(fname, lname, dob, doc_id, patient_data.get("medicalRecordNo"))
+            if existing_id:
+                logger.success(f"Patient exists on platform: {key}, ID: {existing_id}", doc_id)
+                created_patients.put(key, existing_id)
+                return existing_id
+            # Add required fields
+            patient_data["daBackofficeID"] = str(daId)
+            patient_data["pgCompanyId"] = PG_ID
+            patient_data["companyId"] = company_map.get(agency.strip().lower())
+            patient_data["physicianGroup"] = PG_NAME
+            patient_data["physicianGroupNPI"] = PG_NPI
+            logger.debug(f"Patient JSON for creating patient: {patient_data}", doc_id)
+            resp = http_client.post(PATIENT_CREATE_URL, headers={"Content-Type": "application/json"}, json=patient_data)
+            logger.info(f"Patient creation status code: {resp.status_code}", doc_id)
+            logger.info(f"Patient creation response: {resp.text}", doc_id)
+            if resp.status_code == 201:
+                new_id = resp.json().get("id") or resp.text
+                created_patients.put(key, new_id)
+                patient_roster.add(new_id, patient_data)
+                return new_id
+            else:
+                logger.error(f"Failed to create patient: {resp.text}", doc_id)
+            return None
     except Exception as e:
         logger.error(f"Error in get_or_create_patient: {e}", doc_id)
         return None
 
+@timed_stage
 def push_order(order_data, doc_id, patient_id, agency, received, doc_signed_date):
     try:
         order_data["companyId"] = company_map.get(agency.lower())
@@ -526,9 +1230,13 @@ def push_order(order_data, doc_id, patient_id, agency, received, doc_signed_date
         order_data["documentID"] = doc_id
         order_data["sentToPhysicianDate"] = received
         order_data["signedByPhysicianDate"] = doc_signed_date
+        # Rule-only and partial extractions never ask Gemini for these
+        order_data.setdefault("sentToPhysicianStatus", False)
+        order_data.setdefault("signedByPhysicianStatus", False)
+        order_data.setdefault("bit64Url", "")
         if order_data.get("orderNo") is None:
             order_data["orderNo"] = doc_id + "1"
-        resp = requests.post(ORDER_PUSH_URL, headers={"Content-Type": "application/json"}, json=order_data)
+        resp = http_client.post(ORDER_PUSH_URL, headers={"Content-Type": "application/json"}, json=order_data)
         logger.info(f"Order push status code: {resp.status_code}", doc_id)
         logger.info(f"Order push response: {resp.text}", doc_id)
         
@@ -553,7 +1261,7 @@ def process_dates_for_patient(patient_data, doc_id):
     try:
         # Capture and log raw episodeDiagnoses BEFORE any modification for Gemini audit
         raw_episode = patient_data.get("episodeDiagnoses")
-        logger.info(f"Raw EpisodeDiagnoses from Gemini: {raw_episode}", doc_id)
+        logger.debug(f"Raw EpisodeDiagnoses from Gemini: {raw_episode}", doc_id)
 
         # Ensure episodeDiagnoses key exists and has at least one dict
         if not patient_data.get("episodeDiagnoses"):
@@ -598,9 +1306,7 @@ def process_dates_for_patient(patient_data, doc_id):
 
         # Validate that all three episode dates are present; if not, audit and skip
         if not (soc_dt and soe_dt and eoe_dt):
-            with open(AUDIT_PATIENTS_FILE, "a", newline="") as file:
-                writer = csv.writer(file)
-                writer.writerow([doc_id, "Missing one or more episode dates (SOC / SOE / EOE) after autofill"])
+            audit_sink.record(AUDIT_PATIENTS_FILE, doc_id, "MISSING_EPISODE_DATES", "Missing one or more episode dates (SOC / SOE / EOE) after autofill")
             logger.warning("Missing required episode dates after autofill; patient will be skipped", doc_id)
             return None
 
@@ -687,6 +1393,7 @@ def write_to_csv(patient_data, order_data, doc_id, agency, csv_writer):
 def save_api_push_details(doc_id, patient_data, order_data, patient_id, api_results, csv_writer):
     """Save API push details to tracking CSV"""
     try:
+        timings, total = current_stage_timings()
         api_row = {
             'Document_ID': doc_id,
             'Timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
@@ -730,6 +1437,12 @@ def save_api_push_details(doc_id, patient_data, order_data, patient_id, api_resu
             'Error_Message': api_results.get('error_message', ''),
             'Remarks': f"Patient Created: {api_results.get('patient_created', False)}, Order Pushed: {api_results.get('order_pushed', False)}"
         }
+        for stage in TIMED_STAGES:
+            api_row[stage_column(stage)] = f"{timings[stage]:.3f}" if stage in timings else ''
+        api_row['Seconds_Total'] = f"{total:.3f}"
+        prompt_size = getattr(stage_context, "prompt_size", None) or {}
+        for key, column in PROMPT_SIZE_COLUMNS.items():
+            api_row[column] = prompt_size.get(key, '')
         
         csv_writer.writerow(api_row)
         logger.success(f"API details saved for Doc ID: {doc_id}")
@@ -828,8 +1541,270 @@ def merge_patient_order_data(patient_data, order_data):
     
     return merged
 
-def process_csv(csv_path, max_rows=4):
-    """Main CSV processing function - extracts data, pushes to API, and saves to output CSV"""
+def parse_csv_date(date_str):
+    """Parse date from CSV format and convert to MM/DD/YYYY"""
+    if not date_str or date_str.strip() == "":
+        return ""
+
+    try:
+        # Handle various date formats that might be in CSV
+        date_str = date_str.strip()
+
+        # Try MM/DD/YYYY format first
+        if "/" in date_str:
+            parts = date_str.split("/")
+            if len(parts) == 3:
+                month, day, year = parts
+                # Ensure 4-digit year
+                if len(year) == 2:
+                    year = "20" + year if int(year) < 50 else "19" + year
+                return f"{month.zfill(2)}/{day.zfill(2)}/{year}"
+
+        # Try parsing with datetime for other formats
+        for fmt in ["%m/%d/%Y", "%m-%d-%Y", "%Y-%m-%d", "%m/%d/%y", "%m-%d-%y"]:
+            try:
+                dt = datetime.strptime(date_str, fmt)
+                return dt.strftime("%m/%d/%Y")
+            except ValueError:
+                continue
+
+        return date_str  # Return as-is if can't parse
+    except Exception:
+        return ""
+
+def process_document(row, csv_writer, api_writer):
+    """Run one input row through text extraction, Gemini, patient creation and order push"""
+    doc_id = row["ID"]
+    agency = row["Facility"].strip()
+    received = row["Received On"].strip()
+
+    # Extract episode dates from CSV
+    csv_soc = parse_csv_date(row.get("SOC", ""))
+    csv_cert_period = parse_csv_date(row.get("Cert_Period", ""))
+    csv_cert_to = parse_csv_date(row.get("Cert_To", ""))
+
+    logger.info(f"Processing Document ID: {doc_id} for Agency: {agency} date : {received}", doc_id)
+    logger.info(f"CSV Episode dates - SOC: {csv_soc}, Cert Period: {csv_cert_period}, Cert To: {csv_cert_to}", doc_id)
+
+    # Initialize API results tracking
+    api_results = {
+        'patient_created': False,
+        'order_pushed': False,
+        'status': 'FAILED',
+        'error_message': ''
+    }
+    patient_id = None
+
+    done = journaled(doc_id, "done")
+    if done is not None:
+        logger.success("Already completed in a previous run (run journal), skipping", doc_id)
+        write_to_csv(done["patient_data"], done["order_data"], doc_id, agency, csv_writer)
+        save_api_push_details(doc_id, done["patient_data"], done["order_data"], done["patient_id"],
+                              done["api_results"], api_writer)
+        return
+
+    text = None
+    rules = None
+    llm_text = None
+    extracted = journaled(doc_id, "extract")
+    if extracted is not None:
+        logger.info("Resuming from run journal: reusing extracted patient data", doc_id)
+        patient_data, order_data, da_id = extracted["patient_data"], extracted["order_data"], extracted["da_id"]
+    else:
+        try:
+            text, da_id = get_pdf_text(doc_id)
+            if not text.strip():
+                raise ValueError("Empty text extracted from PDF")
+        except Exception as e:
+            logger.error(f"Failed to extract text for Doc ID {doc_id}: {str(e)}", doc_id)
+            api_results['error_message'] = f"Could not extract text from PDF: {str(e)}"
+            audit_sink.record(AUDIT_PATIENTS_FILE, doc_id, "TEXT_EXTRACTION_FAILED", "Could not extract text from PDF")
+            # Save API details for failed extraction
+            save_api_push_details(doc_id, {}, {}, None, api_results, api_writer)
+            return
+
+        rules = pre_extract(text, doc_id)
+        llm_text = prune_text(text, doc_id)
+        order_data = None
+        try:
+            if EXTRACTION_MODE == "combined":
+                patient_data, order_data = extract_combined_data(llm_text, doc_id, rules)
+            else:
+                patient_data = extract_patient_data(llm_text, doc_id, rules)
+        except llm_scheduler.LLMRateLimitError as e:
+            api_results['error_message'] = f"Gemini rate limited: {e}"
+            audit_sink.record(AUDIT_PATIENTS_FILE, doc_id, "LLM_RATE_LIMITED",
+                              "Gemini rate limited during patient extraction; retried on the next run")
+            save_api_push_details(doc_id, {}, {}, None, api_results, api_writer)
+            return
+        if patient_data:
+            journal_stage(doc_id, "extract", {"patient_data": patient_data, "order_data": order_data, "da_id": da_id})
+    logger.debug(f"Response from gemini for patient: {patient_data}", doc_id)
+    patient_data = process_dates_for_patient(patient_data, doc_id)
+    logger.debug(f"Patient data after setting dates : {patient_data}", doc_id)
+
+    if not patient_data:
+        logger.error(f"Skipping patient creation for Doc ID {doc_id} due to insufficient date info.", doc_id)
+        api_results['error_message'] = "Insufficient patient date information"
+        save_api_push_details(doc_id, {}, {}, None, api_results, api_writer)
+        return
+
+    created = journaled(doc_id, "patient")
+    if created is not None:
+        patient_id, patient_data = created["patient_id"], created["patient_data"]
+        logger.info(f"Resuming from run journal: patient already resolved ({patient_id})", doc_id)
+    else:
+        patient_id = get_or_create_patient(patient_data, da_id, agency, doc_id)
+        logger.info(f"Patient Created : {patient_id}", doc_id)
+        if patient_id:
+            journal_stage(doc_id, "patient", {"patient_id": patient_id, "patient_data": patient_data})
+
+    if patient_id:
+        api_results['patient_created'] = True
+        api_results['status'] = 'SUCCESS'
+
+    if order_data is None:
+        order_data = journaled(doc_id, "order_extract")
+    if order_data is None:
+        if text is None:
+            try:
+                text = get_pdf_text(doc_id)[0]
+            except Exception as e:
+                logger.error(f"Failed to extract text for Doc ID {doc_id}: {str(e)}", doc_id)
+                api_results['error_message'] = f"Could not extract text from PDF: {str(e)}"
+                save_api_push_details(doc_id, patient_data, {}, patient_id, api_results, api_writer)
+                return
+            rules = pre_extract(text, doc_id)
+            llm_text = prune_text(text, doc_id)
+        try:
+            order_data = extract_order_data(llm_text, doc_id, rules)
+        except llm_scheduler.LLMRateLimitError as e:
+            api_results['error_message'] = f"Gemini rate limited: {e}"
+            audit_sink.record(AUDIT_ORDERS_FILE, doc_id, "LLM_RATE_LIMITED",
+                              "Gemini rate limited during order extraction; retried on the next run")
+            save_api_push_details(doc_id, patient_data, {}, patient_id, api_results, api_writer)
+            return
+        if order_data:
+            journal_stage(doc_id, "order_extract", order_data)
+    order_data["companyId"] = company_map.get(agency.lower())
+    order_data["pgCompanyId"] = PG_ID
+
+    # Fill in missing episode dates from CSV data
+    if not order_data.get("episodeStartDate") and csv_soc:
+        order_data["episodeStartDate"] = csv_soc
+        logger.info(f"Using CSV SOC date as episodeStartDate: {csv_soc}", doc_id)
+
+    if not order_data.get("startOfCare") and csv_soc:
+        order_data["startOfCare"] = csv_soc
+        logger.info(f"Using CSV SOC date as startOfCare: {csv_soc}", doc_id)
+
+    if not order_data.get("episodeEndDate") and csv_cert_to:
+        order_data["episodeEndDate"] = csv_cert_to
+        logger.info(f"Using CSV Cert_To date as episodeEndDate: {csv_cert_to}", doc_id)
+
+    # Additional fallback: Use episode dates from patient_data if both CSV and order_data are missing them
+    if patient_data and patient_data.get("episodeDiagnoses") and len(patient_data["episodeDiagnoses"]) > 0:
+        patient_episode = patient_data["episodeDiagnoses"][0]
+
+        if not order_data.get("episodeStartDate") and patient_episode.get("startOfEpisode"):
+            order_data["episodeStartDate"] = patient_episode["startOfEpisode"]
+            logger.info(f"Using patient startOfEpisode as episodeStartDate: {patient_episode['startOfEpisode']}", doc_id)
+
+        if not order_data.get("startOfCare") and patient_episode.get("startOfCare"):
+            order_data["startOfCare"] = patient_episode["startOfCare"]
+            logger.info(f"Using patient startOfCare as order startOfCare: {patient_episode['startOfCare']}", doc_id)
+
+        if not order_data.get("episodeEndDate") and patient_episode.get("endOfEpisode"):
+            order_data["episodeEndDate"] = patient_episode["endOfEpisode"]
+            logger.info(f"Using patient endOfEpisode as episodeEndDate: {patient_episode['endOfEpisode']}", doc_id)
+
+    if not order_data["companyId"]:
+        audit_sink.record(AUDIT_ORDERS_FILE, doc_id, "MISSING_COMPANY_ID", "Missing companyId")
+        logger.error(f"Skipping order push for Doc ID {doc_id} due to missing companyID", doc_id)
+        api_results['error_message'] = "Agency not found in company mapping"
+        # Not journaled as done: once the company mapping is fixed the next run retries the push,
+        # reusing the journaled extraction and patient
+        # Still write to CSV even if order push fails
+        write_to_csv(patient_data, order_data, doc_id, agency, csv_writer)
+        save_api_push_details(doc_id, patient_data, order_data, patient_id, api_results, api_writer)
+        return
+
+    order_data = process_dates_for_order(order_data, patient_id, doc_id)
+
+    if not order_data.get("orderDate"):
+        order_data["orderDate"] = received
+    elif not order_data.get("episodeStartDate"):
+        audit_sink.record(AUDIT_ORDERS_FILE, doc_id, "MISSING_EPISODE_START", "Missing episodeStartDate")
+        logger.error(f"Skipping order push for Doc ID {doc_id} due to missing episodeStartDate", doc_id)
+        api_results['error_message'] = "Missing episodeStartDate"
+        journal_done(doc_id, agency, patient_data, order_data, patient_id, api_results)
+        write_to_csv(patient_data, order_data, doc_id, agency, csv_writer)
+        save_api_push_details(doc_id, patient_data, order_data, patient_id, api_results, api_writer)
+        return
+    elif not order_data.get("episodeEndDate"):
+        audit_sink.record(AUDIT_ORDERS_FILE, doc_id, "MISSING_EPISODE_END", "Missing episodeEndDate")
+        logger.error(f"Skipping order push for Doc ID {doc_id} due to missing episodeEndDate", doc_id)
+        api_results['error_message'] = "Missing episodeEndDate"
+        journal_done(doc_id, agency, patient_data, order_data, patient_id, api_results)
+        write_to_csv(patient_data, order_data, doc_id, agency, csv_writer)
+        save_api_push_details(doc_id, patient_data, order_data, patient_id, api_results, api_writer)
+        return
+    elif not order_data.get("startOfCare"):
+        audit_sink.record(AUDIT_ORDERS_FILE, doc_id, "MISSING_SOC", "Missing startOfCare")
+        logger.error(f"Skipping order push for Doc ID {doc_id} due to missing startOfCare", doc_id)
+        api_results['error_message'] = "Missing startOfCare"
+        journal_done(doc_id, agency, patient_data, order_data, patient_id, api_results)
+        write_to_csv(patient_data, order_data, doc_id, agency, csv_writer)
+        save_api_push_details(doc_id, patient_data, order_data, patient_id, api_results, api_writer)
+        return
+
+    pushed = journaled(doc_id, "order_push")
+    if pushed is not None:
+        logger.info("Resuming from run journal: order already pushed", doc_id)
+        order_data = pushed
+        result = True
+    else:
+        doc_signed_date = fetch_signed_date(doc_id)
+        result = push_order(order_data, doc_id, patient_id, agency, received, doc_signed_date)
+        if result:
+            journal_stage(doc_id, "order_push", order_data)
+
+    if result:
+        logger.success(f"Order Push Response: Success", doc_id)
+        api_results['order_pushed'] = True
+        api_results['status'] = 'SUCCESS'
+        journal_done(doc_id, agency, patient_data, order_data, patient_id, api_results)
+    else:
+        logger.error(f"Order Push Response: Failed", doc_id)
+        api_results['error_message'] = "Order push failed"
+
+    # Write to CSV regardless of API success/failure
+    write_to_csv(patient_data, order_data, doc_id, agency, csv_writer)
+    save_api_push_details(doc_id, patient_data, order_data, patient_id, api_results, api_writer)
+
+def process_document_timed(row, csv_writer, api_writer):
+    """process_document with per-stage timers; records the document's timings for the run summary"""
+    stage_context.timings = {}
+    stage_context.prompt_size = None
+    stage_context.started = started = time.monotonic()
+    try:
+        process_document(row, csv_writer, api_writer)
+    finally:
+        elapsed = time.monotonic() - started
+        timings, prompt_size = stage_context.timings, stage_context.prompt_size
+        stage_context.timings = stage_context.started = stage_context.prompt_size = None
+        with run_timings_lock:
+            run_timings.append({"doc_id": row["ID"], "stages": timings, "total": elapsed, "prompt_size": prompt_size})
+        logger.info(f"Document finished in {elapsed:.2f}s", row["ID"], stage="document", duration=round(elapsed, 3),
+                    stages={stage: round(seconds, 3) for stage, seconds in timings.items()})
+
+def process_csv(csv_path, max_rows=4, workers=1, journal=True, fresh=False):
+    """Main CSV processing function - extracts data, pushes to API, and saves to output CSV
+
+    With journal=True, progress is recorded per document in a run journal for csv_path and
+    a restarted run skips finished documents; fresh=True discards the earlier progress.
+    """
+    global run_journal
     
     # Output CSV files
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -863,38 +1838,8 @@ def process_csv(csv_path, max_rows=4):
         'Episode_End_Date', 'Sent_To_Physician_Date', 'Signed_By_Physician_Date', 'Company_ID', 'PG_Company_ID',
         'SOC_Episode', 'Start_Episode', 'End_Episode', 'Diagnosis_1', 'Diagnosis_2', 'Diagnosis_3',
         'Diagnosis_4', 'Diagnosis_5', 'Diagnosis_6', 'API_Status', 'Error_Message', 'Remarks'
-    ]
-
-    def parse_csv_date(date_str):
-        """Parse date from CSV format and convert to MM/DD/YYYY"""
-        if not date_str or date_str.strip() == "":
-            return ""
-        
-        try:
-            # Handle various date formats that might be in CSV
-            date_str = date_str.strip()
-            
-            # Try MM/DD/YYYY format first
-            if "/" in date_str:
-                parts = date_str.split("/")
-                if len(parts) == 3:
-                    month, day, year = parts
-                    # Ensure 4-digit year
-                    if len(year) == 2:
-                        year = "20" + year if int(year) < 50 else "19" + year
-                    return f"{month.zfill(2)}/{day.zfill(2)}/{year}"
-            
-            # Try parsing with datetime for other formats
-            for fmt in ["%m/%d/%Y", "%m-%d-%Y", "%Y-%m-%d", "%m/%d/%y", "%m-%d-%y"]:
-                try:
-                    dt = datetime.strptime(date_str, fmt)
-                    return dt.strftime("%m/%d/%Y")
-                except ValueError:
-                    continue
-                    
-            return date_str  # Return as-is if can't parse
-        except Exception:
-            return ""
+    ] + [stage_column(stage) for stage in TIMED_STAGES] + ['Seconds_Total'] + list(PROMPT_SIZE_COLUMNS.values())
+    summary_filename = f"api_outputs/run_summary_{timestamp}.json"
 
     try:
         with open(output_filename, 'w', newline='', encoding='utf-8') as output_file, \
@@ -911,185 +1856,148 @@ def process_csv(csv_path, max_rows=4):
             logger.success(f"Created API details CSV file: {api_details_filename}")
             
             reader = csv.DictReader(input_file)
-            i = 0
-            
+            rows = []
             for row in reader:
-                if i >= max_rows:
+                if len(rows) >= max_rows:
                     break
-                i += 1
-                
-                doc_id = row["ID"]
-                agency = row["Facility"].strip()
-                received = row["Received On"].strip()
-                
-                # Extract episode dates from CSV
-                csv_soc = parse_csv_date(row.get("SOC", ""))
-                csv_cert_period = parse_csv_date(row.get("Cert_Period", ""))
-                csv_cert_to = parse_csv_date(row.get("Cert_To", ""))
-                
-                logger.info(f"Processing Document ID: {doc_id} for Agency: {agency} date : {received}", doc_id)
-                logger.info(f"CSV Episode dates - SOC: {csv_soc}, Cert Period: {csv_cert_period}, Cert To: {csv_cert_to}", doc_id)
-                
-                # Initialize API results tracking
-                api_results = {
-                    'patient_created': False,
-                    'order_pushed': False,
-                    'status': 'FAILED',
-                    'error_message': ''
-                }
-                patient_id = None
-                
-                try:
-                    res = get_pdf_text(doc_id)
-                    text = res[0]
-                    if not text.strip():
-                        raise ValueError("Empty text extracted from PDF")
-                except Exception as e:
-                    logger.error(f"Failed to extract text for Doc ID {doc_id}: {str(e)}", doc_id)
-                    api_results['error_message'] = f"Could not extract text from PDF: {str(e)}"
-                    with open(AUDIT_PATIENTS_FILE, "a", newline="") as file:
-                        writer = csv.writer(file)
-                        writer.writerow([doc_id, "Could not extract text from PDF"])
-                    # Save API details for failed extraction
-                    save_api_push_details(doc_id, {}, {}, None, api_results, api_writer)
-                    continue
-                
-                patient_data = extract_patient_data(text, doc_id)
-                logger.info(f"Response from gemini for patient: {patient_data}", doc_id)
-                patient_data = process_dates_for_patient(patient_data, doc_id)
-                logger.info(f"Patient data after setting dates : {patient_data}", doc_id)
-                
-                if not patient_data:
-                    logger.error(f"Skipping patient creation for Doc ID {doc_id} due to insufficient date info.", doc_id)
-                    api_results['error_message'] = "Insufficient patient date information"
-                    save_api_push_details(doc_id, {}, {}, None, api_results, api_writer)
-                    continue
-                
-                patient_id = get_or_create_patient(patient_data, res[1], agency, doc_id)
-                logger.info(f"Patient Created : {patient_id}", doc_id)
-                
-                if patient_id:
-                    api_results['patient_created'] = True
-                    api_results['status'] = 'SUCCESS'
-                
-                order_data = extract_order_data(text, doc_id)
-                order_data["companyId"] = company_map.get(agency.lower())
-                order_data["pgCompanyId"] = PG_ID
-                
-                # Fill in missing episode dates from CSV data
-                if not order_data.get("episodeStartDate") and csv_soc:
-                    order_data["episodeStartDate"] = csv_soc
-                    logger.info(f"Using CSV SOC date as episodeStartDate: {csv_soc}", doc_id)
-                
-                if not order_data.get("startOfCare") and csv_soc:
-                    order_data["startOfCare"] = csv_soc
-                    logger.info(f"Using CSV SOC date as startOfCare: {csv_soc}", doc_id)
-                
-                if not order_data.get("episodeEndDate") and csv_cert_to:
-                    order_data["episodeEndDate"] = csv_cert_to
-                    logger.info(f"Using CSV Cert_To date as episodeEndDate: {csv_cert_to}", doc_id)
-                
-                # Additional fallback: Use episode dates from patient_data if both CSV and order_data are missing them
-                if patient_data and patient_data.get("episodeDiagnoses") and len(patient_data["episodeDiagnoses"]) > 0:
-                    patient_episode = patient_data["episodeDiagnoses"][0]
-                    
-                    if not order_data.get("episodeStartDate") and patient_episode.get("startOfEpisode"):
-                        order_data["episodeStartDate"] = patient_episode["startOfEpisode"]
-                        logger.info(f"Using patient startOfEpisode as episodeStartDate: {patient_episode['startOfEpisode']}", doc_id)
-                    
-                    if not order_data.get("startOfCare") and patient_episode.get("startOfCare"):
-                        order_data["startOfCare"] = patient_episode["startOfCare"]
-                        logger.info(f"Using patient startOfCare as order startOfCare: {patient_episode['startOfCare']}", doc_id)
-                    
-                    if not order_data.get("episodeEndDate") and patient_episode.get("endOfEpisode"):
-                        order_data["episodeEndDate"] = patient_episode["endOfEpisode"]
-                        logger.info(f"Using patient endOfEpisode as episodeEndDate: {patient_episode['endOfEpisode']}", doc_id)
-                
-                if not order_data["companyId"]:
-                    with open(AUDIT_ORDERS_FILE, "a", newline="") as file:
-                        writer = csv.writer(file)
-                        writer.writerow([doc_id, "Missing companyId"])
-                    logger.error(f"Skipping order push for Doc ID {doc_id} due to missing companyID", doc_id)
-                    api_results['error_message'] = "Agency not found in company mapping"
-                    # Still write to CSV even if order push fails
-                    write_to_csv(patient_data, order_data, doc_id, agency, csv_writer)
-                    save_api_push_details(doc_id, patient_data, order_data, patient_id, api_results, api_writer)
-                    continue
-                
-                order_data = process_dates_for_order(order_data, patient_id, doc_id)
-                
-                if not order_data.get("orderDate"):
-                    order_data["orderDate"] = received
-                elif not order_data.get("episodeStartDate"):
-                    with open(AUDIT_ORDERS_FILE, "a", newline="") as file:
-                        writer = csv.writer(file)
-                        writer.writerow([doc_id, "Missing episodeStartDate"])
-                    logger.error(f"Skipping order push for Doc ID {doc_id} due to missing episodeStartDate", doc_id)
-                    api_results['error_message'] = "Missing episodeStartDate"
-                    write_to_csv(patient_data, order_data, doc_id, agency, csv_writer)
-                    save_api_push_details(doc_id, patient_data, order_data, patient_id, api_results, api_writer)
-                    continue
-                elif not order_data.get("episodeEndDate"):
-                    with open(AUDIT_ORDERS_FILE, "a", newline="") as file:
-                        writer = csv.writer(file)
-                        writer.writerow([doc_id, "Missing episodeEndDate"])
-                    logger.error(f"Skipping order push for Doc ID {doc_id} due to missing episodeEndDate", doc_id)
-                    api_results['error_message'] = "Missing episodeEndDate"
-                    write_to_csv(patient_data, order_data, doc_id, agency, csv_writer)
-                    save_api_push_details(doc_id, patient_data, order_data, patient_id, api_results, api_writer)
-                    continue
-                elif not order_data.get("startOfCare"):
-                    with open(AUDIT_ORDERS_FILE, "a", newline="") as file:
-                        writer = csv.writer(file)
-                        writer.writerow([doc_id, "Missing startOfCare"])
-                    logger.error(f"Skipping order push for Doc ID {doc_id} due to missing startOfCare", doc_id)
-                    api_results['error_message'] = "Missing startOfCare"
-                    write_to_csv(patient_data, order_data, doc_id, agency, csv_writer)
-                    save_api_push_details(doc_id, patient_data, order_data, patient_id, api_results, api_writer)
-                    continue
-                
-                doc_signed_date = fetch_signed_date(doc_id)
-                result = push_order(order_data, doc_id, patient_id, agency, received, doc_signed_date)
-                
-                if result:
-                    logger.success(f"Order Push Response: Success", doc_id)
-                    api_results['order_pushed'] = True
-                    api_results['status'] = 'SUCCESS'
-                else:
-                    logger.error(f"Order Push Response: Failed", doc_id)
-                    api_results['error_message'] = "Order push failed"
-                
-                # Write to CSV regardless of API success/failure
-                write_to_csv(patient_data, order_data, doc_id, agency, csv_writer)
-                save_api_push_details(doc_id, patient_data, order_data, patient_id, api_results, api_writer)
-                
+                rows.append(row)
+
+            if journal:
+                run_journal = RunJournal(csv_path)
+                if fresh:
+                    run_journal.reset()
+                previous = run_journal.summary()
+                logger.info(f"Run journal: {run_journal.path} ({previous['done']} documents done, "
+                            f"{previous['partial']} partially processed in earlier runs)")
+
+            with run_timings_lock:
+                run_timings.clear()
+            run_started = time.monotonic()
+            if workers <= 1:
+                for row in rows:
+                    process_document_timed(row, csv_writer, api_writer)
+            else:
+                logger.info(f"Processing {len(rows)} documents with {workers} concurrent workers")
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    futures = []
+                    for row in rows:
+                        buffers = (BufferedRowWriter(), BufferedRowWriter())
+                        futures.append((executor.submit(process_document_timed, row, *buffers), buffers))
+                    # Replay each document's rows in input order so the output files match a serial run
+                    for future, (csv_buffer, api_buffer) in futures:
+                        try:
+                            future.result()
+                        except Exception as e:
+                            logger.error(f"Unhandled error in worker: {e}")
+                        csv_buffer.replay(csv_writer)
+                        api_buffer.replay(api_writer)
+
+            summary = summarize_run_timings(time.monotonic() - run_started)
+            log_run_summary(summary)
+            with open(summary_filename, "w", encoding="utf-8") as f:
+                json.dump(summary, f, indent=2)
+
         logger.success(f"Processing completed. Output files:")
         logger.success(f"- Patient data CSV: {output_filename}")
         logger.success(f"- API tracking CSV: {api_details_filename}")
+        logger.success(f"- Run latency summary: {summary_filename}")
                 
     except Exception as e:
         logger.error(f"Critical error in CSV processing: {e}")
+    finally:
+        if run_journal is not None:
+            run_journal.close()
+            run_journal = None
 
 def main():
     """Main execution function"""
+    parser = argparse.ArgumentParser(description="CSV Data Extraction & API Push Tool")
+    parser.add_argument("--csv", default="primacare.csv", help="Input CSV exported from the DA inbox")
+    parser.add_argument("--max-rows", type=int, default=280, help="Maximum number of rows to process")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of documents processed concurrently (1 = sequential)")
+    parser.add_argument("--extraction", choices=["separate", "combined"], default="separate",
+                        help="Gemini extraction mode: two calls per document or one structured call")
+    parser.add_argument("--no-prune", action="store_true",
+                        help="Send the full document text to Gemini instead of the first page plus label windows")
+    parser.add_argument("--prompt-token-budget", type=int, default=text_pruner.DEFAULT_TOKEN_BUDGET,
+                        help="Approximate token budget for the pruned document text sent to Gemini")
+    parser.add_argument("--no-rules", action="store_true",
+                        help="Send every document to Gemini instead of filling labelled fields with the rule pre-extractor")
+    parser.add_argument("--llm-rpm", type=float, default=llm_scheduler.DEFAULT_RPM,
+                        help="Gemini requests per minute across all workers (0 = unlimited)")
+    parser.add_argument("--llm-tpm", type=float, default=llm_scheduler.DEFAULT_TPM,
+                        help="Estimated Gemini tokens per minute across all workers (0 = unlimited)")
+    parser.add_argument("--llm-max-concurrency", type=int, default=llm_scheduler.DEFAULT_MAX_CONCURRENCY,
+                        help="Upper bound for the adaptive number of concurrent Gemini calls")
+    parser.add_argument("--no-llm-cache", action="store_true",
+                        help="Always call Gemini instead of reusing cached extraction results")
+    parser.add_argument("--ocr-workers", type=int, default=os.cpu_count() or 1,
+                        help="OCR worker processes shared by all documents (0 = OCR in threads per document)")
+    parser.add_argument("--ocr-backend", choices=["auto", "tesserocr", "pytesseract"], default="auto",
+                        help="OCR engine: in-process tesserocr, pytesseract subprocesses, or auto-detect")
+    parser.add_argument("--no-journal", action="store_true",
+                        help="Do not record or resume per-document progress for this CSV")
+    parser.add_argument("--fresh", action="store_true",
+                        help="Ignore progress journaled by earlier runs of this CSV and process every row")
+    parser.add_argument("--log-level", choices=sorted(Logger.LEVELS, key=Logger.LEVELS.get), default=None,
+                        help="Minimum log level (default LOG_LEVEL env or DEBUG); INFO hides the extracted-data dumps")
+    parser.add_argument("--log-json", action="store_true",
+                        help="Also write structured JSON Lines logs (doc_id, stage, duration) next to the text log")
+    args = parser.parse_args()
+
+    if args.log_level:
+        logger.set_level(args.log_level)
+    if args.log_json:
+        logger.enable_json_lines()
+
+    global EXTRACTION_MODE, RULE_PREEXTRACTION, PRUNE_TEXT, PROMPT_TOKEN_BUDGET, extraction_cache, ocr_farm, OCR_BACKEND
+    global gemini_scheduler
+    EXTRACTION_MODE = args.extraction
+    RULE_PREEXTRACTION = not args.no_rules
+    PRUNE_TEXT = not args.no_prune
+    PROMPT_TOKEN_BUDGET = args.prompt_token_budget
+    OCR_BACKEND = args.ocr_backend
+    gemini_scheduler = llm_scheduler.LLMScheduler(args.llm_rpm, args.llm_tpm, args.llm_max_concurrency)
+    if not args.no_llm_cache:
+        extraction_cache = llm_cache.LLMCache()
+    if args.ocr_workers > 0:
+        ocr_farm = OCRFarm(args.ocr_workers, OCR_CONFIG, backend=OCR_BACKEND)
     
     logger.header("FINAL VERSION PROCESSOR")
     logger.info("CSV Data Extraction & API Push Tool")
     logger.info("")
     logger.info("Features:")
-    logger.info("- 2 Robust text extraction methods (PDFPlumber + Tesseract OCR)")
+    logger.info("- Per-page hybrid text extraction (PyMuPDF text layer + Tesseract OCR for image-only pages)")
     logger.info("- AI-powered patient and order data extraction")
     logger.info("- Enhanced error handling and logging")
     logger.info("- Full API integration (patient creation + order pushing)")
     logger.info("- CSV output with comprehensive patient data")
     logger.info("- Detailed API tracking with remarks for every document")
     logger.info("- Complete audit trail of all processing attempts")
+    logger.info(f"- Concurrent document workers: {args.workers}")
+    logger.info(f"- Gemini extraction mode: {args.extraction}")
+    logger.info(f"- Rule pre-extraction: {'enabled' if RULE_PREEXTRACTION else 'disabled'}")
+    logger.info(f"- Prompt text pruning: {f'~{PROMPT_TOKEN_BUDGET} tokens' if PRUNE_TEXT else 'disabled'}")
+    logger.info(f"- Gemini scheduler: {args.llm_rpm:g} req/min, {args.llm_tpm:g} tokens/min, "
+                f"up to {args.llm_max_concurrency} concurrent call(s)")
+    logger.info(f"- LLM result cache: {'disabled' if extraction_cache is None else llm_cache.DEFAULT_CACHE_PATH}")
+    logger.info(f"- OCR worker processes: {args.ocr_workers if ocr_farm is not None else 'disabled (per-document threads)'}")
+    logger.info(f"- OCR backend: {ocr_backends.resolve_backend_name(OCR_BACKEND)} (requested {OCR_BACKEND})")
+    logger.info(f"- Run journal: {'disabled' if args.no_journal else 'resume' if not args.fresh else 'fresh start'}")
     logger.info("")
     
     try:
         # Process the CSV file
-        process_csv("primacare.csv", max_rows=280)
+        process_csv(args.csv, max_rows=args.max_rows, workers=args.workers,
+                    journal=not args.no_journal, fresh=args.fresh)
     finally:
+        if ocr_farm is not None:
+            ocr_farm.shutdown()
+        if extraction_cache is not None:
+            extraction_cache.close()
+        created_patients.close()
+        audit_sink.close()
         # Ensure logger is properly closed
         logger.close()
 
@@ -1,4 +1,4 @@
-import requests
+import http_client
 import json
 import ReadConfig as rc
 import CommonUtil as cu
@@ -27,7 +27,7 @@ def get_order_info(reportFolderName):
                     endpoint = f"/api/Order/GetOrdersByDocNo/{doc_id}"
                     api_endpoint = api_url + endpoint
                     order_data = {}
-                    response = requests.get(api_endpoint, headers=headers)
+                    response = http_client.get(api_endpoint, headers=headers)
 
                     if response.status_code == 200:
                         data = response.json()
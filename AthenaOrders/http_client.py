@@ -0,0 +1,241 @@
+"""
+Shared HTTP client for the DA / WAV / config APIs.
+
+One requests.Session (keep-alive connection pool) per host, default timeouts,
+retries with jittered exponential backoff on 429 / 5xx / connection errors
+(honouring Retry-After), and a per-host token bucket so callers no longer need
+their own time.sleep() throttles.
+
+Non-idempotent requests (POST/PATCH) are only retried when the server refused
+them outright (429, connect failures), never on 5xx, so a patient or order is
+not created twice. Streamed bodies (file-like `data`, e.g. MultipartEncoder)
+are never retried.
+
+This file is shared by the bot folders (copied like CommonUtil.py / ReadConfig.py);
+keep the copies identical.
+
+Usage (drop-in for requests.get / post / put / delete):
+    import http_client
+    response = http_client.get(url, headers=headers)
+    response = http_client.post(url, headers=headers, json=payload, timeout=300)
+
+Settings (environment):
+    HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT   seconds (default 10 / 60)
+    HTTP_MAX_RETRIES                          default 4
+    HTTP_BACKOFF_BASE, HTTP_BACKOFF_MAX       seconds (default 0.5 / 30)
+    HTTP_RATE_PER_HOST                        requests/second per host, 0 = unlimited (default 5)
+    HTTP_HOST_RATES                           per-host overrides, "host=rate,host2=rate"
+"""
+import email.utils
+import logging
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger("http_client")
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+DEFAULT_TIMEOUT = (float(os.getenv("HTTP_CONNECT_TIMEOUT", "10")), float(os.getenv("HTTP_READ_TIMEOUT", "60")))
+DEFAULT_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "4"))
+DEFAULT_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", "0.5"))
+DEFAULT_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", "30"))
+DEFAULT_RATE_PER_HOST = float(os.getenv("HTTP_RATE_PER_HOST", "5"))
+DEFAULT_POOL_SIZE = 16
+
+
+def _parse_host_rates(value):
+    rates = {}
+    for item in (value or "").split(","):
+        host, _, rate = item.partition("=")
+        if host.strip() and rate.strip():
+            rates[host.strip().lower()] = float(rate)
+    return rates
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucket:
+    """Blocking token bucket: `rate` tokens per second, bursts of up to `capacity`"""
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` are available (at most `capacity` are ever waited for) and take them"""
+        if self.rate <= 0:
+            return
+        tokens = min(tokens, self.capacity)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class HttpClient:
+    def __init__(self, timeout=DEFAULT_TIMEOUT, max_retries=DEFAULT_MAX_RETRIES,
+                 backoff_base=DEFAULT_BACKOFF_BASE, backoff_max=DEFAULT_BACKOFF_MAX,
+                 rate_per_host=DEFAULT_RATE_PER_HOST, host_rates=None, pool_size=DEFAULT_POOL_SIZE):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_per_host = rate_per_host
+        self.host_rates = dict(_parse_host_rates(os.getenv("HTTP_HOST_RATES")), **(host_rates or {}))
+        self.pool_size = pool_size
+        self.lock = threading.Lock()
+        self.sessions = {}
+        self.buckets = {}
+
+    def _host(self, url):
+        return (urlsplit(url).hostname or "").lower()
+
+    def session(self, host):
+        with self.lock:
+            session = self.sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self.sessions[host] = session
+            return session
+
+    def bucket(self, host):
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                bucket = TokenBucket(self.host_rates.get(host, self.rate_per_host))
+                self.buckets[host] = bucket
+            return bucket
+
+    def set_rate(self, host, rate, capacity=None):
+        """Override the requests/second limit for one host (0 = unlimited)"""
+        with self.lock:
+            self.host_rates[host.lower()] = rate
+            self.buckets[host.lower()] = TokenBucket(rate, capacity)
+
+    def _backoff(self, attempt, response=None):
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                return min(retry_after, self.backoff_max)
+        # Full jitter: uniform over [0, min(max, base * 2^attempt)]
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def request(self, method, url, retry=True, **kwargs):
+        """Send a request through the host's pool; returns the final requests.Response"""
+        method = method.upper()
+        kwargs.setdefault("timeout", self.timeout)
+        host = self._host(url)
+        session = self.session(host)
+        bucket = self.bucket(host)
+        idempotent = method in IDEMPOTENT_METHODS
+        if hasattr(kwargs.get("data"), "read"):
+            retry = False  # a consumed stream cannot be sent again
+        max_retries = self.max_retries if retry else 0
+
+        attempt = 0
+        while True:
+            bucket.acquire()
+            try:
+                response = session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                # Only connect-phase failures are known not to have reached the server
+                safe = idempotent or isinstance(e, requests.exceptions.ConnectTimeout)
+                if attempt >= max_retries or not safe:
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning("%s %s failed (%s); retry %d/%d in %.1fs", method, url, e, attempt + 1, max_retries, delay)
+            else:
+                status = response.status_code
+                retryable = status == 429 or (status in RETRY_STATUSES and idempotent)
+                if not retryable or attempt >= max_retries:
+                    return response
+                delay = self._backoff(attempt, response)
+                logger.warning("%s %s returned %d; retry %d/%d in %.1fs", method, url, status, attempt + 1, max_retries, delay)
+                response.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request("PUT", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+    def close(self):
+        with self.lock:
+            for session in self.sessions.values():
+                session.close()
+            self.sessions = {}
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_client():
+    """Process-wide HttpClient configured from the environment"""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = HttpClient()
+        return _default_client
+
+
+def request(method, url, **kwargs):
+    return get_client().request(method, url, **kwargs)
+
+
+def get(url, **kwargs):
+    return get_client().get(url, **kwargs)
+
+
+def post(url, **kwargs):
+    return get_client().post(url, **kwargs)
+
+
+def put(url, **kwargs):
+    return get_client().put(url, **kwargs)
+
+
+def delete(url, **kwargs):
+    return get_client().delete(url, **kwargs)
@@ -0,0 +1,246 @@
+"""
+Persistent content-addressed cache for Gemini extraction results.
+
+Entries are keyed by sha256(document text) + kind + prompt version + model name and
+hold the parsed JSON returned by final_version's extract_* functions, so re-runs
+and partial retries don't pay for LLM calls on documents that were already seen.
+The database is size-capped; least recently used entries are evicted first.
+
+CLI:
+    python llm_cache.py stats
+    python llm_cache.py list [--doc-id 9391210] [--limit 50]
+    python llm_cache.py show <text_hash>
+    python llm_cache.py invalidate [--doc-id ID | --text-hash HASH | --kind patient | --prompt-version V | --all]
+    python llm_cache.py evict --max-mb 100
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite")
+DEFAULT_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "200"))
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def prompt_version(*parts):
+    """Short, stable version id for a prompt (and schema); changes whenever the prompt text changes"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+    return digest.hexdigest()[:12]
+
+
+class LLMCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=int(DEFAULT_MAX_MB * 1024 * 1024)):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_results (
+                text_hash TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                model TEXT NOT NULL,
+                doc_id TEXT,
+                result TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (text_hash, kind, prompt_version, model)
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_results_access ON llm_results (last_access)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_results_doc ON llm_results (doc_id)")
+        self.conn.commit()
+
+    def get(self, text, kind, version, model):
+        """Return the cached parsed JSON for this text/prompt/model, or None"""
+        key = (text_hash(text), kind, version, model)
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT result FROM llm_results WHERE text_hash=? AND kind=? AND prompt_version=? AND model=?",
+                key,
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute(
+                "UPDATE llm_results SET last_access=?, hits=hits+1 "
+                "WHERE text_hash=? AND kind=? AND prompt_version=? AND model=?",
+                (time.time(), *key),
+            )
+            self.conn.commit()
+        return json.loads(row[0])
+
+    def put(self, text, kind, version, model, result, doc_id=None):
+        payload = json.dumps(result)
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO llm_results "
+                "(text_hash, kind, prompt_version, model, doc_id, result, size, created_at, last_access, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0)",
+                (text_hash(text), kind, version, model, doc_id, payload, len(payload), now, now),
+            )
+            self._evict_locked(self.max_bytes)
+            self.conn.commit()
+
+    def evict(self, max_bytes=None):
+        """Drop least recently used entries until the cached payloads fit in max_bytes; returns rows removed"""
+        with self.lock:
+            removed = self._evict_locked(self.max_bytes if max_bytes is None else max_bytes)
+            self.conn.commit()
+        return removed
+
+    def _evict_locked(self, max_bytes):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_results").fetchone()[0]
+        if total <= max_bytes:
+            return 0
+        removed = 0
+        rows = self.conn.execute(
+            "SELECT rowid, size FROM llm_results ORDER BY last_access ASC"
+        ).fetchall()
+        doomed = []
+        for rowid, size in rows:
+            if total <= max_bytes:
+                break
+            doomed.append((rowid,))
+            total -= size
+            removed += 1
+        self.conn.executemany("DELETE FROM llm_results WHERE rowid=?", doomed)
+        return removed
+
+    def invalidate(self, doc_id=None, text_hash_prefix=None, kind=None, version=None, everything=False):
+        """Delete matching entries; returns the number of rows removed"""
+        clauses, params = [], []
+        if doc_id:
+            clauses.append("doc_id=?")
+            params.append(doc_id)
+        if text_hash_prefix:
+            clauses.append("text_hash LIKE ?")
+            params.append(text_hash_prefix + "%")
+        if kind:
+            clauses.append("kind=?")
+            params.append(kind)
+        if version:
+            clauses.append("prompt_version=?")
+            params.append(version)
+        if not clauses and not everything:
+            raise ValueError("Refusing to invalidate without a filter; pass everything=True to clear the cache")
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        with self.lock:
+            cursor = self.conn.execute("DELETE FROM llm_results" + where, params)
+            self.conn.commit()
+        return cursor.rowcount
+
+    def entries(self, doc_id=None, text_hash_prefix=None, limit=50):
+        query = ("SELECT text_hash, kind, prompt_version, model, doc_id, size, created_at, last_access, hits "
+                 "FROM llm_results")
+        clauses, params = [], []
+        if doc_id:
+            clauses.append("doc_id=?")
+            params.append(doc_id)
+        if text_hash_prefix:
+            clauses.append("text_hash LIKE ?")
+            params.append(text_hash_prefix + "%")
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY last_access DESC LIMIT ?"
+        params.append(limit)
+        with self.lock:
+            return self.conn.execute(query, params).fetchall()
+
+    def results(self, text_hash_prefix):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT kind, prompt_version, model, doc_id, result FROM llm_results WHERE text_hash LIKE ?",
+                (text_hash_prefix + "%",),
+            ).fetchall()
+
+    def stats(self):
+        with self.lock:
+            count, total, hits = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(hits), 0) FROM llm_results"
+            ).fetchone()
+            by_kind = self.conn.execute(
+                "SELECT kind, prompt_version, model, COUNT(*) FROM llm_results "
+                "GROUP BY kind, prompt_version, model ORDER BY kind"
+            ).fetchall()
+        return {"entries": count, "bytes": total, "hits": hits, "max_bytes": self.max_bytes, "by_kind": by_kind}
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def _format_time(ts):
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or invalidate the Gemini extraction cache")
+    parser.add_argument("--path", default=DEFAULT_CACHE_PATH, help="Cache database path")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("stats", help="Show entry counts and size")
+
+    list_parser = sub.add_parser("list", help="List cached entries, most recently used first")
+    list_parser.add_argument("--doc-id")
+    list_parser.add_argument("--text-hash")
+    list_parser.add_argument("--limit", type=int, default=50)
+
+    show_parser = sub.add_parser("show", help="Print the cached JSON for a text hash (prefix)")
+    show_parser.add_argument("text_hash")
+
+    inv_parser = sub.add_parser("invalidate", help="Delete cached entries")
+    inv_parser.add_argument("--doc-id")
+    inv_parser.add_argument("--text-hash")
+    inv_parser.add_argument("--kind", choices=["patient", "order", "combined", "patient_partial", "order_partial"])
+    inv_parser.add_argument("--prompt-version")
+    inv_parser.add_argument("--all", action="store_true", help="Clear the whole cache")
+
+    evict_parser = sub.add_parser("evict", help="Evict least recently used entries down to a size")
+    evict_parser.add_argument("--max-mb", type=float, default=DEFAULT_MAX_MB)
+
+    args = parser.parse_args()
+    cache = LLMCache(args.path)
+    try:
+        if args.command == "stats":
+            stats = cache.stats()
+            print(f"Cache: {args.path}")
+            print(f"Entries: {stats['entries']}  Size: {stats['bytes'] / 1024:.1f} KB "
+                  f"(cap {stats['max_bytes'] / 1024 / 1024:.0f} MB)  Hits: {stats['hits']}")
+            for kind, version, model, count in stats["by_kind"]:
+                print(f"  {kind:<15} prompt={version} model={model}: {count}")
+        elif args.command == "list":
+            for row in cache.entries(args.doc_id, args.text_hash, args.limit):
+                text_hash_, kind, version, model, doc_id, size, created, accessed, hits = row
+                print(f"{text_hash_[:16]}  {kind:<15} {version} {model:<18} doc={doc_id or '-':<10} "
+                      f"{size:>6}B hits={hits:<3} created={_format_time(created)} used={_format_time(accessed)}")
+        elif args.command == "show":
+            for kind, version, model, doc_id, result in cache.results(args.text_hash):
+                print(f"--- {kind} prompt={version} model={model} doc={doc_id}")
+                print(json.dumps(json.loads(result), indent=2))
+        elif args.command == "invalidate":
+            removed = cache.invalidate(args.doc_id, args.text_hash, args.kind, args.prompt_version, args.all)
+            print(f"Removed {removed} entries")
+        elif args.command == "evict":
+            removed = cache.evict(int(args.max_mb * 1024 * 1024))
+            print(f"Evicted {removed} entries")
+    except ValueError as e:
+        print(e)
+    finally:
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Client-side scheduling of Gemini calls: rate limits plus adaptive concurrency.
+
+With several document workers the extraction calls used to go out as fast as the
+threads produced them; a 429 / ResourceExhausted then surfaced as an exception that
+extract_patient_data / extract_order_data turned into an empty record. Every call
+now goes through LLMScheduler.call(), which
+- takes one request from a requests/minute bucket and the estimated prompt + output
+  tokens from a tokens/minute bucket (http_client.TokenBucket),
+- runs at most `limit` calls at once, where `limit` adapts AIMD-style: halved on a
+  rate-limit error (once per congestion event, not once per failed call), and grown
+  by about one slot per `limit` successful calls while latency stays near the
+  fastest observed (and trimmed when latency climbs well above it),
+- retries rate-limited calls with jittered exponential backoff and raises
+  LLMRateLimitError once the retries are used up, so the caller can record the
+  document as rate limited and leave it for the next run.
+
+Other exceptions pass through unchanged and do not change the limit.
+
+Settings (environment; final_version.py flags override them):
+    GEMINI_RPM               requests per minute, 0 = unlimited (default 300)
+    GEMINI_TPM               estimated tokens per minute, 0 = unlimited (default 1000000)
+    GEMINI_MAX_CONCURRENCY   upper bound for the adaptive limit (default 8)
+    GEMINI_MAX_RETRIES       retries of a rate-limited call (default 5)
+"""
+import os
+import random
+import re
+import threading
+import time
+
+from http_client import TokenBucket
+
+try:
+    from google.api_core import exceptions as google_exceptions
+except ImportError:
+    google_exceptions = None
+
+DEFAULT_RPM = float(os.getenv("GEMINI_RPM", "300"))
+DEFAULT_TPM = float(os.getenv("GEMINI_TPM", "1000000"))
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+DEFAULT_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "5"))
+
+BURST_SECONDS = 10          # bucket capacity: this many seconds' worth of the per-minute quota
+DECREASE_FACTOR = 0.5       # limit multiplier on a rate-limit error
+LATENCY_DECREASE_FACTOR = 0.9
+LATENCY_GROW_RATIO = 2.0    # grow only while the latency EWMA is within this multiple of the fastest EWMA
+LATENCY_SHRINK_RATIO = 4.0  # trim the limit once it is beyond this multiple
+LATENCY_ALPHA = 0.2
+BACKOFF_BASE = 2.0
+BACKOFF_MAX = 60.0
+
+# Last resort for errors without a status code or known type: a standalone 429 next to a rate-limit
+# word, or the ResourceExhausted status name / message; a bare "429" in an ID, token count or byte
+# offset does not match
+RATE_LIMIT_MESSAGE_RE = re.compile(
+    r"\b429\b.{0,40}\b(?:rate|quota|too many requests)|\b(?:rate|quota|too many requests)\b.{0,40}\b429\b"
+    r"|\bRESOURCE_EXHAUSTED\b|\bresource has been exhausted\b",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+class LLMRateLimitError(Exception):
+    """A Gemini call was still rate limited after the scheduler's retries"""
+
+
+def is_rate_limit_error(error):
+    """True for 429 / ResourceExhausted errors from the gRPC or REST transport"""
+    if google_exceptions is not None and isinstance(
+            error, (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests)):
+        return True
+    response = getattr(error, "response", None)
+    for code in (getattr(error, "code", None), getattr(error, "status_code", None),
+                 getattr(response, "status_code", None)):
+        if isinstance(code, int):  # an HTTP status decides either way (HTTPStatus is an int)
+            return code == 429
+    return bool(RATE_LIMIT_MESSAGE_RE.search(str(error)))
+
+
+class LLMScheduler:
+    def __init__(self, rpm=DEFAULT_RPM, tpm=DEFAULT_TPM, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 min_concurrency=1, initial_concurrency=None, max_retries=DEFAULT_MAX_RETRIES):
+        self.requests = TokenBucket(rpm / 60, max(1.0, rpm / 60 * BURST_SECONDS))
+        self.tokens = TokenBucket(tpm / 60, max(1.0, tpm / 60 * BURST_SECONDS))
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.limit = float(min(self.max_concurrency, initial_concurrency or self.max_concurrency))
+        self.max_retries = max_retries
+        self.condition = threading.Condition()
+        self.in_flight = 0
+        self.last_decrease = 0.0
+        self.latency = None       # EWMA of successful call latency, seconds
+        self.best_latency = None  # lowest EWMA seen
+        self.counters = {"calls": 0, "succeeded": 0, "rate_limited": 0, "retries": 0, "gave_up": 0,
+                         "decreases": 0, "wait_seconds": 0.0}
+        self.lowest_limit = self.limit
+
+    def _enter(self):
+        """Wait for a concurrency slot; returns the time the call started"""
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight += 1
+            return time.monotonic()
+
+    def _leave(self):
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    def _decrease(self, started, factor):
+        """Multiplicative decrease, at most once per congestion event: calls that started before
+        the last decrease saw the old limit and do not count again"""
+        with self.condition:
+            if started < self.last_decrease:
+                return
+            self.limit = max(self.min_concurrency, self.limit * factor)
+            self.lowest_limit = min(self.lowest_limit, self.limit)
+            self.last_decrease = time.monotonic()
+            self.counters["decreases"] += 1
+
+    def _on_success(self, started, elapsed):
+        with self.condition:
+            self.counters["succeeded"] += 1
+            self.latency = elapsed if self.latency is None else \
+                LATENCY_ALPHA * elapsed + (1 - LATENCY_ALPHA) * self.latency
+            self.best_latency = self.latency if self.best_latency is None else min(self.best_latency, self.latency)
+            ratio = self.latency / self.best_latency if self.best_latency > 0 else 1.0
+            if ratio <= LATENCY_GROW_RATIO:
+                # Additive increase: about one slot per `limit` successful calls
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+                self.condition.notify_all()
+                return
+        if ratio > LATENCY_SHRINK_RATIO:
+            self._decrease(started, LATENCY_DECREASE_FACTOR)
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+    def call(self, fn, est_tokens=0):
+        """Run fn() under the rate limits and the adaptive concurrency limit; returns its result.
+
+        est_tokens is the estimated prompt + output size taken from the tokens/minute bucket.
+        Raises LLMRateLimitError when fn() is still rate limited after max_retries retries.
+        """
+        with self.condition:
+            self.counters["calls"] += 1
+        attempt = 0
+        while True:
+            queued = time.monotonic()
+            self.requests.acquire()
+            self.tokens.acquire(est_tokens)
+            started = self._enter()
+            with self.condition:
+                self.counters["wait_seconds"] += started - queued
+            try:
+                result = fn()
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    raise
+                self._decrease(started, DECREASE_FACTOR)
+                with self.condition:
+                    self.counters["rate_limited"] += 1
+                    if attempt >= self.max_retries:
+                        self.counters["gave_up"] += 1
+                        raise LLMRateLimitError(f"Gemini rate limit after {attempt + 1} attempt(s): {e}") from e
+                    self.counters["retries"] += 1
+                delay = self._backoff(attempt)
+            else:
+                self._on_success(started, time.monotonic() - started)
+                return result
+            finally:
+                self._leave()
+            time.sleep(delay)
+            attempt += 1
+
+    def stats(self):
+        with self.condition:
+            stats = dict(self.counters)
+            stats.update({
+                "wait_seconds": round(stats["wait_seconds"], 3),
+                "limit": round(self.limit, 2),
+                "lowest_limit": round(self.lowest_limit, 2),
+                "max_concurrency": self.max_concurrency,
+                "latency_ewma": round(self.latency, 3) if self.latency is not None else None,
+            })
+            return stats
@@ -0,0 +1,143 @@
+"""
+Pluggable OCR engines for page images.
+
+- "tesserocr": in-process libtesseract bindings. The language model is loaded
+  once per thread / worker process and reused for every page; raw pixmap bytes
+  can be passed straight in without building a PIL image or writing a temp file.
+- "pytesseract": spawns the tesseract CLI per page (previous behaviour, fallback).
+- "auto": tesserocr when it is installed, otherwise pytesseract.
+
+Every backend takes the same tesseract-style config string
+(e.g. "--oem 3 --psm 6 -c tessedit_char_whitelist=...").
+"""
+import logging
+import shlex
+import threading
+
+DEFAULT_DPI = 200
+DEFAULT_CONFIG = r'--oem 3 --psm 6 -c tessedit_char_whitelist=0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz:/-.,()[] '
+DEFAULT_LANG = "eng"
+
+logger = logging.getLogger("ocr_backends")
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+
+def parse_tesseract_config(config):
+    """Split a tesseract CLI config string into (oem, psm, {variable: value})"""
+    oem, psm, variables = None, None, {}
+    # The whitelist contains a trailing space, so split "-c name=value" by hand before shlex
+    tokens = config.split(" -c ")
+    head, assignments = tokens[0], tokens[1:]
+    if head.strip().startswith("-c "):
+        assignments.insert(0, head.strip()[3:])
+        head = ""
+    parts = shlex.split(head)
+    for flag, value in zip(parts, parts[1:]):
+        if flag == "--oem":
+            oem = int(value)
+        elif flag == "--psm":
+            psm = int(value)
+    for assignment in assignments:
+        name, _, value = assignment.partition("=")
+        variables[name.strip()] = value
+    return oem, psm, variables
+
+
+class OCRBackend:
+    name = "base"
+
+    def image_to_string(self, img):
+        raise NotImplementedError
+
+    def raw_to_string(self, data, width, height, channels):
+        """OCR raw interleaved 8-bit pixels (e.g. fitz pixmap samples)"""
+        from PIL import Image
+        mode = {1: "L", 3: "RGB", 4: "RGBA"}[channels]
+        return self.image_to_string(Image.frombytes(mode, (width, height), bytes(data)))
+
+    def close(self):
+        pass
+
+
+class PytesseractBackend(OCRBackend):
+    name = "pytesseract"
+
+    def __init__(self, config=DEFAULT_CONFIG, lang=DEFAULT_LANG):
+        import pytesseract
+        self.pytesseract = pytesseract
+        self.config = config
+        self.lang = lang
+
+    def image_to_string(self, img):
+        return self.pytesseract.image_to_string(img, lang=self.lang, config=self.config)
+
+
+class TesserocrBackend(OCRBackend):
+    name = "tesserocr"
+
+    def __init__(self, config=DEFAULT_CONFIG, lang=DEFAULT_LANG):
+        if tesserocr is None:
+            raise ImportError("tesserocr is not installed")
+        oem, psm, variables = parse_tesseract_config(config)
+        kwargs = {"lang": lang}
+        if oem is not None:
+            kwargs["oem"] = tesserocr.OEM(oem)
+        if psm is not None:
+            kwargs["psm"] = tesserocr.PSM(psm)
+        self.api = tesserocr.PyTessBaseAPI(**kwargs)
+        for name, value in variables.items():
+            self.api.SetVariable(name, value)
+
+    def image_to_string(self, img):
+        self.api.SetImage(img)
+        return self.api.GetUTF8Text()
+
+    def raw_to_string(self, data, width, height, channels):
+        self.api.SetImageBytes(bytes(data), width, height, channels, width * channels)
+        return self.api.GetUTF8Text()
+
+    def close(self):
+        self.api.End()
+
+
+BACKENDS = {"tesserocr": TesserocrBackend, "pytesseract": PytesseractBackend}
+
+
+def resolve_backend_name(name="auto"):
+    if name == "auto":
+        return "tesserocr" if tesserocr is not None else "pytesseract"
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown OCR backend: {name}")
+    return name
+
+
+def create_backend(name="auto", config=DEFAULT_CONFIG, lang=DEFAULT_LANG):
+    """Instantiate a backend. With "auto", a tesserocr that cannot start falls back to pytesseract
+    (logged); an explicitly requested tesserocr raises instead"""
+    resolved = resolve_backend_name(name)
+    if resolved == "tesserocr":
+        try:
+            return TesserocrBackend(config, lang)
+        except Exception as e:
+            if name == "tesserocr":
+                raise
+            logger.warning("OCR backend tesserocr failed to start (%s); falling back to pytesseract", e)
+    return PytesseractBackend(config, lang)
+
+
+_local = threading.local()
+
+
+def get_backend(name="auto", config=DEFAULT_CONFIG, lang=DEFAULT_LANG):
+    """Backend owned by the calling thread; libtesseract handles must not be shared between threads"""
+    key = (name, config, lang)
+    backends = getattr(_local, "backends", None)
+    if backends is None:
+        backends = _local.backends = {}
+    if key not in backends:
+        backends[key] = create_backend(name, config, lang)
+    return backends[key]
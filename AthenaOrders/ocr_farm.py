@@ -0,0 +1,113 @@
+"""
+Persistent, process-based OCR worker pool shared by every document in a run.
+
+Pages are rendered in the calling thread (under pdf_text.FITZ_LOCK, as PyMuPDF
+is not thread-safe) and handed to the worker processes
+through multiprocessing.shared_memory (only the segment name and geometry are
+pickled), so Tesseract runs on every core and is scheduled page by page across
+all in-flight documents. In-flight pages are bounded to keep rendered pixmaps
+from piling up faster than they are OCR'd. Each worker creates its OCR backend
+(see ocr_backends.py) once at start-up, so with tesserocr the language model is
+loaded once per process rather than once per page.
+
+Workers only run the functions of this module, but they are not isolated from
+the parent: with the default "fork" start method on Linux they inherit its
+memory, final_version.py and all of its loaded state included; with "spawn" /
+"forkserver" the parent's main script is re-imported in every worker as
+__mp_main__, so its module-level code runs there. The pool is started when the
+farm is created (final_version.main(), before any document thread); with "fork"
+that starts every worker, so none is forked while a document thread holds a lock
+such as FITZ_LOCK.
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+
+import fitz
+
+import ocr_backends
+from pdf_text import FITZ_LOCK
+
+_backend = None
+
+
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+def _init_worker(backend_name, config):
+    global _backend
+    _backend = ocr_backends.create_backend(backend_name, config)
+
+
+def _ocr_shared_page(shm_name, size, width, height, channels):
+    """Worker entry point: OCR one rendered page held in shared memory"""
+    shm = _attach(shm_name)
+    try:
+        data = bytes(shm.buf[:size])
+    finally:
+        shm.close()
+    return _backend.raw_to_string(data, width, height, channels)
+
+
+class OCRFarm:
+    def __init__(self, workers=None, config=ocr_backends.DEFAULT_CONFIG, max_in_flight=None, backend="auto"):
+        self.workers = workers or os.cpu_count() or 1
+        self.config = config
+        self.backend = ocr_backends.resolve_backend_name(backend)
+        # Workers get the name as requested so "auto" keeps its pytesseract fallback and an explicit name does not
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker, initargs=(backend, config)
+        )
+        # Pages rendered but not yet OCR'd, across all documents
+        self.slots = threading.BoundedSemaphore(max_in_flight or self.workers * 2)
+        # Start the worker processes now rather than on the first page submitted from a document thread
+        self.executor.submit(os.getpid).result()
+
+    def _submit(self, pix):
+        samples = getattr(pix, "samples_mv", None) or pix.samples
+        size = len(samples)
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        try:
+            shm.buf[:size] = samples
+            future = self.executor.submit(
+                _ocr_shared_page, shm.name, size, pix.width, pix.height, pix.n
+            )
+        except Exception:
+            shm.close()
+            shm.unlink()
+            raise
+
+        def release(_):
+            shm.close()
+            shm.unlink()
+            self.slots.release()
+
+        future.add_done_callback(release)
+        return future
+
+    def ocr_pages(self, pdf_document, page_numbers, dpi=ocr_backends.DEFAULT_DPI):
+        """OCR the given pages of an open fitz document; returns {page_num: raw text}"""
+        matrix = fitz.Matrix(dpi / 72, dpi / 72)
+        futures = {}
+        try:
+            for page_num in page_numbers:
+                self.slots.acquire()
+                try:
+                    with FITZ_LOCK:
+                        pix = pdf_document[page_num].get_pixmap(matrix=matrix)
+                    futures[page_num] = self._submit(pix)
+                except Exception:
+                    self.slots.release()
+                    raise
+        finally:
+            # Always wait for submitted pages so their shared memory is released
+            wait(futures.values())
+        return {page_num: future.result() for page_num, future in futures.items()}
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
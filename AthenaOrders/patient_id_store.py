@@ -0,0 +1,122 @@
+"""
+Durable FNAME_LNAME_DOB -> patientId map for final_version.py.
+
+Replaces rewriting hawthorn_internalmedicine.json on every resolved patient:
+each mapping is a single-row SQLite upsert committed in WAL mode, so a crash
+can lose at most the write in progress and never corrupts earlier entries.
+The database is safe to share between worker threads and between concurrent
+processes. An existing JSON map is imported the first time the store is opened.
+
+CLI:
+    python patient_id_store.py stats
+    python patient_id_store.py get FNAME_LNAME_DOB
+    python patient_id_store.py import hawthorn_internalmedicine.json
+    python patient_id_store.py export hawthorn_internalmedicine.json
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_STORE_PATH = os.getenv("PATIENT_ID_STORE_PATH", "patient_ids.sqlite")
+
+
+class PatientIdStore:
+    def __init__(self, path=DEFAULT_STORE_PATH, legacy_json=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS patient_ids (
+                key TEXT PRIMARY KEY,
+                patient_id TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+        if legacy_json and len(self) == 0:
+            self.import_json(legacy_json)
+
+    def get(self, key, default=None):
+        with self.lock:
+            row = self.conn.execute("SELECT patient_id FROM patient_ids WHERE key=?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def put(self, key, patient_id):
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO patient_ids (key, patient_id, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET patient_id=excluded.patient_id, updated_at=excluded.updated_at",
+                (key, str(patient_id), time.time()),
+            )
+            self.conn.commit()
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM patient_ids").fetchone()[0]
+
+    def import_json(self, path):
+        """Load a {key: patientId} JSON map (the old hawthorn_internalmedicine.json); returns rows imported"""
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return 0
+        with open(path) as f:
+            mapping = json.load(f)
+        now = time.time()
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO patient_ids (key, patient_id, updated_at) VALUES (?, ?, ?)",
+                [(key, str(patient_id), now) for key, patient_id in mapping.items()],
+            )
+            self.conn.commit()
+        return len(mapping)
+
+    def export_json(self, path):
+        with self.lock:
+            mapping = dict(self.conn.execute("SELECT key, patient_id FROM patient_ids ORDER BY key").fetchall())
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(mapping, f, indent=2)
+        os.replace(tmp_path, path)
+        return len(mapping)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect the FNAME_LNAME_DOB -> patientId store")
+    parser.add_argument("--path", default=DEFAULT_STORE_PATH, help="Store database path")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="Show the number of stored patients")
+    get_parser = sub.add_parser("get", help="Look up one key")
+    get_parser.add_argument("key")
+    import_parser = sub.add_parser("import", help="Merge a JSON map into the store (existing keys win)")
+    import_parser.add_argument("json_path")
+    export_parser = sub.add_parser("export", help="Write the store out as a JSON map")
+    export_parser.add_argument("json_path")
+    args = parser.parse_args()
+
+    store = PatientIdStore(args.path)
+    try:
+        if args.command == "stats":
+            print(f"Store: {args.path}  Patients: {len(store)}")
+        elif args.command == "get":
+            print(store.get(args.key, "not found"))
+        elif args.command == "import":
+            print(f"Read {store.import_json(args.json_path)} entries from {args.json_path}")
+        elif args.command == "export":
+            print(f"Wrote {store.export_json(args.json_path)} entries to {args.json_path}")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+In-memory index of the physician group's patient roster.
+
+The WAV `/api/Patient/company/pg/{pg_id}` list is downloaded once per run (and
+refreshed only when stale) instead of once per document. Patients are indexed by
+a normalized (first name, last name, DOB) tuple, by MRN and by patient ID, and
+the index is updated in place when the run creates a patient.
+"""
+import threading
+import time
+from datetime import datetime
+
+import http_client
+
+DOB_FORMATS = ["%m/%d/%Y", "%m/%d/%y", "%Y-%m-%d", "%m-%d-%Y", "%Y-%m-%dT%H:%M:%S"]
+
+
+def normalize_dob(dob):
+    """Return DOB as MM/DD/YYYY when parseable, otherwise the stripped input"""
+    dob = (dob or "").strip()
+    for fmt in DOB_FORMATS:
+        try:
+            return datetime.strptime(dob, fmt).strftime("%m/%d/%Y")
+        except ValueError:
+            continue
+    return dob
+
+
+def patient_key(fname, lname, dob):
+    return ((fname or "").strip().upper(), (lname or "").strip().upper(), normalize_dob(dob))
+
+
+class PatientRoster:
+    def __init__(self, list_url, headers, max_age=900, timeout=60):
+        self.list_url = list_url
+        self.headers = headers
+        self.max_age = max_age
+        self.timeout = timeout
+        self.lock = threading.RLock()
+        self.loaded_at = None
+        self.by_key = {}
+        self.by_mrn = {}
+        self.by_id = {}
+
+    def _index(self, record):
+        info = record.get("agencyInfo") or {}
+        patient_id = record.get("id") or record.get("patientId")
+        if not info or not patient_id:
+            return
+        self.by_id[str(patient_id)] = record
+        key = patient_key(info.get("patientFName"), info.get("patientLName"), info.get("dob"))
+        self.by_key.setdefault(key, patient_id)
+        mrn = (info.get("medicalRecordNo") or "").strip().upper()
+        if mrn:
+            self.by_mrn.setdefault(mrn, patient_id)
+
+    def load(self):
+        """Download the full roster and rebuild the indexes; returns False if the download failed"""
+        with self.lock:
+            response = http_client.get(self.list_url, headers=self.headers, timeout=self.timeout)
+            if response.status_code != 200:
+                return False
+            self.by_key, self.by_mrn, self.by_id = {}, {}, {}
+            for record in response.json():
+                self._index(record)
+            self.loaded_at = time.monotonic()
+            return True
+
+    def ensure_loaded(self, refresh_if_stale=False):
+        with self.lock:
+            stale = self.loaded_at is not None and time.monotonic() - self.loaded_at > self.max_age
+            if self.loaded_at is None or (refresh_if_stale and stale):
+                return self.load()
+            return True
+
+    def find(self, fname, lname, dob):
+        """Patient ID for a name + DOB, reloading a stale roster once before giving up"""
+        key = patient_key(fname, lname, dob)
+        with self.lock:
+            if not self.ensure_loaded():
+                return None
+            if key not in self.by_key:
+                self.ensure_loaded(refresh_if_stale=True)
+            return self.by_key.get(key)
+
+    def find_by_mrn(self, mrn):
+        with self.lock:
+            if not self.ensure_loaded():
+                return None
+            return self.by_mrn.get((mrn or "").strip().upper())
+
+    def get(self, patient_id):
+        """Cached roster record (with agencyInfo) for a patient ID, or None"""
+        with self.lock:
+            if not self.ensure_loaded():
+                return None
+            return self.by_id.get(str(patient_id))
+
+    def add(self, patient_id, patient_data):
+        """Index a patient created during this run without re-downloading the roster"""
+        info = dict(patient_data)
+        episodes = info.get("episodeDiagnoses") or [{}]
+        for field in ("startOfCare", "startOfEpisode", "endOfEpisode"):
+            if not info.get(field) and episodes and episodes[0]:
+                info[field] = episodes[0].get(field, "")
+        with self.lock:
+            self._index({"id": patient_id, "agencyInfo": info})
+
+    def __len__(self):
+        return len(self.by_id)
@@ -0,0 +1,116 @@
+"""
+Plain-text extraction from digital PDFs, shared by final_version.py and the Athena bots
+(ExtractDataPDF, SignedOrderExtraction, GetEfaxDetails, SplitPDF).
+
+PyMuPDF's page.get_text() is the default: it is one to two orders of magnitude
+faster than pdfplumber's extract_text(). Words are sorted into reading order
+(top-to-bottom, left-to-right) so label/value regexes written against pdfplumber
+output keep matching. pdfplumber is used instead
+- for the whole document when layout=True (column-preserving layout text), and
+- for any page where PyMuPDF fails or its text looks garbled (unmapped glyphs).
+
+Sources can be a file path, PDF bytes or a file-like object.
+
+PyMuPDF is not thread-safe, so every fitz call (here, in final_version.py and in
+ocr_farm.py) runs under FITZ_LOCK; callers that work on fitz documents themselves
+take it too. Rendered pixmaps and extracted text are plain data and can be used
+without the lock.
+"""
+import io
+import threading
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+try:
+    import pdfplumber
+except ImportError:
+    pdfplumber = None
+
+# A page whose text is more than this share of U+FFFD / control characters gets re-extracted by pdfplumber
+MAX_GARBLED_RATIO = 0.05
+
+# One lock for all PyMuPDF work in the process (reentrant so helpers can nest)
+FITZ_LOCK = threading.RLock()
+
+
+def _is_garbled(text):
+    stripped = "".join(text.split())
+    if not stripped:
+        return False
+    bad = sum(1 for ch in stripped if ch == "\ufffd" or ord(ch) < 32)
+    return bad / len(stripped) > MAX_GARBLED_RATIO
+
+
+def _read_bytes(source):
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    if hasattr(source, "read"):
+        return source.read()
+    with open(source, "rb") as f:
+        return f.read()
+
+
+class _Plumber:
+    """pdfplumber document opened on first use, for per-page fallbacks"""
+    def __init__(self, pdf_bytes):
+        self.pdf_bytes = pdf_bytes
+        self.pdf = None
+
+    def page_text(self, page_num, layout=False):
+        if pdfplumber is None:
+            raise ImportError("pdfplumber is not installed")
+        if self.pdf is None:
+            self.pdf = pdfplumber.open(io.BytesIO(self.pdf_bytes))
+        return self.pdf.pages[page_num].extract_text(layout=layout) or ""
+
+    def close(self):
+        if self.pdf is not None:
+            self.pdf.close()
+
+
+def page_texts(source, layout=False, max_pages=None):
+    """Text of each page (up to max_pages) as a list of strings; "" for pages without a text layer"""
+    pdf_bytes = _read_bytes(source)
+    plumber = _Plumber(pdf_bytes)
+    try:
+        if layout or fitz is None:
+            if pdfplumber is None:
+                raise ImportError("Neither PyMuPDF nor pdfplumber is installed")
+            with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+                pages = pdf.pages if max_pages is None else pdf.pages[:max_pages]
+                return [page.extract_text(layout=layout) or "" for page in pages]
+
+        texts = []
+        with FITZ_LOCK, fitz.open(stream=pdf_bytes, filetype="pdf") as pdf_document:
+            page_count = len(pdf_document) if max_pages is None else min(max_pages, len(pdf_document))
+            for page_num in range(page_count):
+                try:
+                    texts.append(pdf_document[page_num].get_text("text", sort=True))
+                except Exception:
+                    texts.append(None)
+        # pdfplumber fallbacks outside the lock
+        for page_num, text in enumerate(texts):
+            if text is None or (_is_garbled(text) and pdfplumber is not None):
+                text = plumber.page_text(page_num)
+            texts[page_num] = text.strip("\n")
+        return texts
+    finally:
+        plumber.close()
+
+
+def extract_text(source, layout=False, max_pages=None, separator="\n"):
+    """Text of the whole document (or its first max_pages pages), pages joined by separator"""
+    return separator.join(text for text in page_texts(source, layout, max_pages) if text)
+
+
+def page_links(source, page_num=0):
+    """URIs of the link annotations on one page"""
+    pdf_bytes = _read_bytes(source)
+    if fitz is not None:
+        with FITZ_LOCK, fitz.open(stream=pdf_bytes, filetype="pdf") as pdf_document:
+            return [link["uri"] for link in pdf_document[page_num].get_links() if link.get("uri")]
+    with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+        return [annot["uri"] for annot in pdf.pages[page_num].annots if annot.get("uri")]
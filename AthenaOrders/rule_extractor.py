@@ -0,0 +1,187 @@
+"""
+Deterministic pre-extraction of the labelled fields in DA documents, run before Gemini.
+
+Most 485 Certs/Recerts and orders come from a handful of EHR templates with fixed
+labels (DOB:, MRN:, Start of Care, "mm/dd/yyyy - mm/dd/yyyy" cert periods). The
+compiled rule set below pulls those fields and scores each one:
+
+- every rule has a base confidence (explicit label > bare pattern),
+- a field whose rule matches conflicting values in the same document is penalised,
+- a value that fails validation (impossible date, DOB in the future, cert period
+  longer than CERT_PERIOD_MAX_DAYS) is dropped.
+
+Fields scoring at least ACCEPT_CONFIDENCE are accepted. final_version.py skips the
+Gemini call for a record when all of its REQUIRED_FIELDS are accepted, and
+otherwise asks Gemini only for the fields the rules could not fill.
+"""
+import re
+from datetime import datetime, timedelta
+
+ACCEPT_CONFIDENCE = 0.8
+CONFLICT_PENALTY = 0.5
+CERT_PERIOD_MAX_DAYS = 120
+
+# Fields the pipeline cannot do without: the patient key (name + DOB), the MRN used for the
+# roster lookup and the episode dates required for patient creation and the order push
+REQUIRED_FIELDS = {
+    "patient": ["patientFName", "patientLName", "dob", "medicalRecordNo", "startOfCare", "startOfEpisode",
+                "endOfEpisode"],
+    "order": ["mrn", "patientName", "startOfCare", "episodeStartDate", "episodeEndDate"],
+}
+
+EPISODE_FIELDS = ["startOfCare", "startOfEpisode", "endOfEpisode", "firstDiagnosis"]
+ORDER_ONLY_FIELDS = {"orderNo", "orderDate"}
+
+# Order fields filled from the shared rule fields
+ORDER_FIELD_SOURCES = {
+    "orderNo": "orderNo",
+    "orderDate": "orderDate",
+    "startOfCare": "startOfCare",
+    "episodeStartDate": "startOfEpisode",
+    "episodeEndDate": "endOfEpisode",
+    "mrn": "medicalRecordNo",
+    "patientSex": "patientSex",
+}
+
+DATE = r"(\d{1,2}[/-]\d{1,2}[/-](?:\d{4}|\d{2}))(?!\d)"
+RANGE_SEP = r"\s*(?:-|–|to\s*:?|thru|through)\s*"
+NAME_PART = r"[A-Z][A-Za-z'\-]+"
+
+
+class Rule:
+    """One compiled pattern; `fields` names the value of each capture group"""
+    def __init__(self, fields, pattern, confidence, flags=re.IGNORECASE):
+        self.fields = fields
+        self.regex = re.compile(pattern, flags)
+        self.confidence = confidence
+
+
+RULES = [
+    # Patient name: "Patient Name: DOE, JANE M" / "Patient's Name and Address: Doe, Jane" / "Patient Name: Jane Doe"
+    Rule(("patientLName", "patientFName"),
+         rf"Patient(?:'s)?\s*Name(?:\s*and\s*Address)?[ \t]*[:\-]?[ \t]*({NAME_PART}),[ \t]*({NAME_PART})", 0.9,
+         flags=0),
+    Rule(("patientFName", "patientLName"),
+         rf"Patient(?:'s)?\s*Name[ \t]*:[ \t]*({NAME_PART})[ \t]+(?:[A-Z]\.?[ \t]+)?({NAME_PART})\b", 0.85, flags=0),
+    Rule(("patientLName", "patientFName"), rf"\bPatient[ \t]*:[ \t]*({NAME_PART}),[ \t]*({NAME_PART})", 0.8,
+         flags=0),
+    Rule(("dob",), rf"\b(?:DOB|D\.O\.B\.?|Date\s*of\s*Birth|Birth\s*Date)\s*[:#]?\s*{DATE}", 0.95),
+    Rule(("medicalRecordNo",),
+         r"\b(?:MRN?|Medical\s*Record\s*(?:No\.?|Number|#))\s*#?\s*:?\s*#?\s*((?=[A-Z0-9\-]*\d)[A-Z0-9][A-Z0-9\-]{2,})\b",
+         0.9, flags=0),
+    Rule(("patientSex",), r"\b(?:Sex|Gender)\s*[:\-]?\s*(Male|Female|M|F)\b", 0.9),
+    Rule(("startOfCare",), rf"\b(?:Start\s*of\s*Care|SOC)(?:\s*Date)?\s*[:\-]?\s*{DATE}", 0.95),
+    # Cert period: "Certification Period: From 01/02/2025 To 03/02/2025", "Episode: 01/02/2025 - 03/02/2025"
+    Rule(("startOfEpisode", "endOfEpisode"),
+         rf"\b(?:Certification\s*Period|Cert\.?\s*Period|Episode(?:\s*Period)?)\s*:?\s*(?:From\s*:?\s*)?{DATE}{RANGE_SEP}{DATE}",
+         0.95),
+    Rule(("startOfEpisode",), rf"\bEpisode\s*Start\s*Date\s*:?\s*{DATE}", 0.95),
+    Rule(("endOfEpisode",), rf"\bEpisode\s*End\s*Date\s*:?\s*{DATE}", 0.95),
+    # Bare range, as matched by ExtractDataPDF.extract_pdf; ambiguous when the document has several
+    Rule(("startOfEpisode", "endOfEpisode"), rf"{DATE}\s*-\s*{DATE}", 0.8),
+    Rule(("firstDiagnosis",),
+         r"\b(?:Principal|Primary)\s*Diagnosis\b[^A-Z]{0,80}?\b([A-TV-Z]\d{2}(?:\.\d{1,4}[A-Z]?|[0-9A-Z]{0,4}))\b",
+         0.85, flags=0),
+    Rule(("physicianNPI",), r"\bNPI\s*(?:#|No\.?|Number)?\s*:?\s*#?\s*(\d{10})\b", 0.85),
+    Rule(("orderNo",), r"\bOrder\s*(?:#|No\.?|Number)\s*:?\s*#?\s*(\d+)\b", 0.9),
+    Rule(("orderDate",), rf"\bOrder\s*Date\s*:?\s*{DATE}", 0.9),
+]
+
+DATE_FIELDS = {"dob", "startOfCare", "startOfEpisode", "endOfEpisode", "orderDate"}
+
+
+def normalize_date(value):
+    """MM/DD/YYYY for a m/d/yy(yy) date with / or - separators; None if it is not a real date"""
+    parts = re.split(r"[/-]", value)
+    if len(parts) != 3:
+        return None
+    month, day, year = parts
+    if len(year) == 2:
+        year = ("20" if int(year) <= datetime.now().year % 100 + 1 else "19") + year
+    try:
+        return datetime(int(year), int(month), int(day)).strftime("%m/%d/%Y")
+    except ValueError:
+        return None
+
+
+def _normalize(field, value):
+    value = value.strip()
+    if field in DATE_FIELDS:
+        return normalize_date(value)
+    if field == "patientSex":
+        return "Male" if value[0].upper() == "M" else "Female"
+    if field in ("patientFName", "patientLName"):
+        return value.title() if value.isupper() else value
+    return value
+
+
+def _valid(fields):
+    """Cross-field checks on one match"""
+    dob = fields.get("dob")
+    if dob and datetime.strptime(dob, "%m/%d/%Y") > datetime.now():
+        return False
+    start, end = fields.get("startOfEpisode"), fields.get("endOfEpisode")
+    if start and end:
+        span = datetime.strptime(end, "%m/%d/%Y") - datetime.strptime(start, "%m/%d/%Y")
+        if not timedelta(0) < span <= timedelta(days=CERT_PERIOD_MAX_DAYS):
+            return False
+    return True
+
+
+class RuleExtraction:
+    """Values and confidences found by the rules for one document"""
+    def __init__(self, values, confidence):
+        self.values = values          # field -> value
+        self.confidence = confidence  # field -> 0..1
+
+    def accepted(self, min_confidence=ACCEPT_CONFIDENCE):
+        return {field: value for field, value in self.values.items()
+                if self.confidence.get(field, 0.0) >= min_confidence}
+
+    def record(self, kind):
+        """Accepted values as a flat patient or order record"""
+        accepted = self.accepted()
+        if kind == "patient":
+            return {field: value for field, value in accepted.items() if field not in ORDER_ONLY_FIELDS}
+        record = {field: accepted[source] for field, source in ORDER_FIELD_SOURCES.items() if source in accepted}
+        if "patientFName" in accepted and "patientLName" in accepted:
+            record["patientName"] = f"{accepted['patientFName']} {accepted['patientLName']}"
+        return record
+
+    def missing(self, kind):
+        """Required fields of the record the rules could not fill with enough confidence"""
+        record = self.record(kind)
+        return [field for field in REQUIRED_FIELDS[kind] if not record.get(field)]
+
+    def apply(self, kind, data):
+        """Overlay accepted rule values on a (Gemini) record in final_version's shape; rule values win"""
+        data = dict(data or {})
+        for field, value in self.record(kind).items():
+            if kind == "patient" and field in EPISODE_FIELDS:
+                episodes = list(data.get("episodeDiagnoses") or [{}])
+                episodes[0] = dict(episodes[0] or {}, **{field: value})
+                data["episodeDiagnoses"] = episodes
+            else:
+                data[field] = value
+        return data
+
+
+def extract(text):
+    """Run every rule over the document text; returns a RuleExtraction"""
+    values, confidence = {}, {}
+    for rule in RULES:
+        if all(confidence.get(field, 0.0) >= rule.confidence for field in rule.fields):
+            continue
+        candidates = []
+        for match in rule.regex.finditer(text):
+            fields = {field: _normalize(field, match.group(i + 1)) for i, field in enumerate(rule.fields)}
+            if all(fields.values()) and _valid(fields):
+                candidates.append(tuple(fields[field] for field in rule.fields))
+        if not candidates:
+            continue
+        score = rule.confidence if len(set(candidates)) == 1 else rule.confidence * CONFLICT_PENALTY
+        for field, value in zip(rule.fields, candidates[0]):
+            if score > confidence.get(field, 0.0):
+                values[field] = value
+                confidence[field] = score
+    return RuleExtraction(values, confidence)
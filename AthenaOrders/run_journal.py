@@ -0,0 +1,101 @@
+"""
+Append-only journal of per-document progress for final_version.process_csv.
+
+One JSONL file per input CSV (journals/<csv name>_<path hash>.jsonl). Every
+completed stage of a document is appended as {"doc_id", "stage", "result", "ts"}
+and flushed to disk immediately, so a run that dies part-way can be restarted:
+documents with a "done" record are skipped and the others resume after their
+last completed stage (e.g. order push after a successful patient create).
+
+A {"event": "reset"} line discards everything recorded before it (--fresh).
+A torn last line from a crash is ignored on load.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+DEFAULT_JOURNAL_DIR = os.getenv("RUN_JOURNAL_DIR", "journals")
+
+
+def journal_path(csv_path, directory=DEFAULT_JOURNAL_DIR):
+    """Journal file for an input CSV, keyed by the CSV's name and absolute path"""
+    csv_abspath = os.path.abspath(csv_path)
+    stem = os.path.splitext(os.path.basename(csv_abspath))[0]
+    digest = hashlib.sha256(csv_abspath.encode("utf-8")).hexdigest()[:8]
+    return os.path.join(directory, f"{stem}_{digest}.jsonl")
+
+
+class RunJournal:
+    def __init__(self, csv_path, directory=DEFAULT_JOURNAL_DIR):
+        self.csv_path = os.path.abspath(csv_path)
+        self.path = journal_path(csv_path, directory)
+        self.lock = threading.Lock()
+        self.stages = {}  # doc_id -> {stage: result}
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+        self.file = open(self.path, "a", encoding="utf-8")
+        if self.file.tell() > 0 and not self._ends_with_newline():
+            self.file.write("\n")  # terminate a torn line so the next record starts cleanly
+            self.file.flush()
+
+    def _ends_with_newline(self):
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("event") == "reset":
+                    self.stages = {}
+                elif "doc_id" in record and "stage" in record:
+                    self.stages.setdefault(str(record["doc_id"]), {})[record["stage"]] = record.get("result")
+
+    def _append(self, record):
+        line = json.dumps(record) + "\n"
+        with self.lock:
+            self.file.write(line)
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def record(self, doc_id, stage, result=None):
+        """Mark a stage of a document as completed, with the result needed to resume after it"""
+        doc_id = str(doc_id)
+        self._append({"doc_id": doc_id, "stage": stage, "result": result, "ts": time.time()})
+        with self.lock:
+            self.stages.setdefault(doc_id, {})[stage] = result
+
+    def get(self, doc_id, stage):
+        """Result recorded for a completed stage, or None"""
+        with self.lock:
+            return self.stages.get(str(doc_id), {}).get(stage)
+
+    def has(self, doc_id, stage):
+        with self.lock:
+            return stage in self.stages.get(str(doc_id), {})
+
+    def is_done(self, doc_id):
+        return self.has(doc_id, "done")
+
+    def reset(self):
+        """Forget all progress for this CSV (the history stays in the file)"""
+        self._append({"event": "reset", "csv": self.csv_path, "ts": time.time()})
+        with self.lock:
+            self.stages = {}
+
+    def summary(self):
+        with self.lock:
+            done = sum(1 for stages in self.stages.values() if "done" in stages)
+            return {"documents": len(self.stages), "done": done, "partial": len(self.stages) - done}
+
+    def close(self):
+        with self.lock:
+            self.file.close()
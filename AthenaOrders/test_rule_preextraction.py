@@ -0,0 +1,71 @@
+"""
+Rule pre-extraction in final_version: Gemini is skipped when the rules find every
+required field, and partial calls only ask for fields Gemini has to read from the text.
+
+Run from the AthenaOrders folder:  python -m pytest test_rule_preextraction.py
+"""
+import importlib
+
+import pytest
+
+pytest.importorskip("google.generativeai")
+pytest.importorskip("fitz")
+
+LABELLED_485 = """HOME HEALTH CERTIFICATION AND PLAN OF CARE
+Patient Name: DOE, JANE   DOB: 01/02/1950   MRN: MR12345
+Start of Care: 03/04/2024   Certification Period: 03/04/2024 - 05/02/2024
+Order #: 5512  Order Date: 03/05/2024
+"""
+
+
+@pytest.fixture
+def final_version(tmp_path, monkeypatch):
+    # final_version reads output.json and creates its logs / stores in the working directory on import
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "output.json").write_text("{}")
+    module = importlib.import_module("final_version")
+    monkeypatch.setattr(module, "extraction_cache", None)
+    monkeypatch.setattr(module, "RULE_PREEXTRACTION", True)
+    return module
+
+
+def test_gemini_skipped_when_rules_find_required_fields(final_version, monkeypatch):
+    calls = []
+    monkeypatch.setattr(final_version, "generate_content", lambda *args: calls.append(args))
+    rules = final_version.pre_extract(LABELLED_485)
+    assert not rules.missing("patient") and not rules.missing("order")
+    before = dict(final_version.rule_stats)
+
+    patient = final_version.extract_patient_data(LABELLED_485, "T1", rules)
+    order = final_version.extract_order_data(LABELLED_485, "T1", rules)
+
+    assert calls == []
+    assert final_version.rule_stats["patient_calls_skipped"] == before["patient_calls_skipped"] + 1
+    assert final_version.rule_stats["order_calls_skipped"] == before["order_calls_skipped"] + 1
+    assert patient["dob"] == "01/02/1950"
+    assert order["mrn"] == "MR12345"
+
+
+def test_partial_call_skips_pipeline_owned_fields(final_version, monkeypatch):
+    queries = []
+
+    class Response:
+        text = '{"mrn": "MR777"}'
+
+    def generate_content(stage, model, text, query):
+        queries.append((stage, query))
+        return Response()
+
+    monkeypatch.setattr(final_version, "generate_content", generate_content)
+    text = LABELLED_485.replace("MRN: MR12345", "")
+    rules = final_version.pre_extract(text)
+    assert "mrn" in rules.missing("order")
+
+    order = final_version.extract_order_data(text, "T2", rules)
+
+    [(stage, query)] = queries
+    assert stage == "order_partial"
+    assert "- mrn" in query and "- patientAddress" in query
+    for field in final_version.PIPELINE_ORDER_FIELDS:
+        assert f"- {field}\n" not in query + "\n"
+    assert order["mrn"] == "MR777"
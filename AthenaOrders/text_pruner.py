@@ -0,0 +1,110 @@
+"""
+Relevance-window pruning of document text before it is sent to Gemini.
+
+485s and orders carry long medication lists, plan-of-care narrative and the same
+signature block / fax header on every page, none of which the extraction prompts
+need. prune() keeps
+- the first page (demographics and the episode header live there),
+- windows of WINDOW_BEFORE / WINDOW_AFTER lines around every demographic, episode,
+  diagnosis and order label on later pages,
+up to a token budget, and drops lines already seen on an earlier page. Text that
+fits the budget once repeats are gone is passed through otherwise unchanged.
+
+Pages are separated by form feeds (final_version.extract_text_from_pdf_bytes);
+OCR'd pages arrive as a single line and are cut into MAX_SEGMENT_CHARS pieces.
+"""
+import re
+
+DEFAULT_TOKEN_BUDGET = 2500
+CHARS_PER_TOKEN = 4             # rough estimate for English clinical text
+WINDOW_BEFORE = 1
+WINDOW_AFTER = 3
+MAX_SEGMENT_CHARS = 300
+MIN_REPEATED_CHARS = 6          # shorter lines ("Page", "Yes") are never treated as repeats
+FIRST_PAGE_FALLBACK_CHARS = 3000  # text without page breaks: treat this much as the first page
+
+LABEL_RE = re.compile(
+    r"\b(?:patient|name|d\.?o\.?b|date\s*of\s*birth|birth|sex|gender|mrn?\b|medical\s*record|record\s*(?:no|#)"
+    r"|address|phone|city|zip|agency|provider|npi|physician|start\s*of\s*care|soc\b|certification|cert\.?\s*period"
+    r"|episode|diagnos[ie]s|icd|dx\b|payor|payer|insurance|medicare|medicaid|order\s*(?:#|no|number|date)"
+    r"|service\s*line|signed|signature\s*date)"
+    r"|\b[A-TV-Z]\d{2}\.\d"                               # ICD-10 code
+    r"|\d{1,2}/\d{1,2}/\d{2,4}\s*(?:-|to)\s*\d{1,2}/\d{1,2}/\d{2,4}",  # date range (cert period)
+    re.IGNORECASE,
+)
+
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def size_stats(before, after):
+    return {
+        "chars_before": len(before),
+        "chars_after": len(after),
+        "tokens_before": estimate_tokens(before),
+        "tokens_after": estimate_tokens(after),
+    }
+
+
+def _segments(page):
+    """Non-empty lines of a page, long lines cut at whitespace into MAX_SEGMENT_CHARS pieces"""
+    segments = []
+    for line in page.split("\n"):
+        line = line.strip()
+        while len(line) > MAX_SEGMENT_CHARS:
+            cut = line.rfind(" ", 0, MAX_SEGMENT_CHARS)
+            cut = cut if cut > 0 else MAX_SEGMENT_CHARS
+            segments.append(line[:cut])
+            line = line[cut:].strip()
+        if line:
+            segments.append(line)
+    return segments
+
+
+def _split_pages(text):
+    if "\f" in text:
+        return text.split("\f")
+    cut = text.find("\n", FIRST_PAGE_FALLBACK_CHARS)
+    return [text] if cut < 0 else [text[:cut], text[cut:]]
+
+
+def prune(text, token_budget=DEFAULT_TOKEN_BUDGET):
+    """Returns (pruned text, stats) where stats has the chars/estimated tokens before and after
+    and the number of repeated lines dropped"""
+    segments = []  # (page number, text)
+    seen = set()
+    repeated = 0
+    for page_num, page in enumerate(_split_pages(text)):
+        for segment in _segments(page):
+            key = " ".join(segment.lower().split())
+            if page_num > 0 and len(key) >= MIN_REPEATED_CHARS and key in seen:
+                repeated += 1
+                continue
+            seen.add(key)
+            segments.append((page_num, segment))
+
+    if sum(len(segment) + 1 for _, segment in segments) <= token_budget * CHARS_PER_TOKEN:
+        wanted = range(len(segments))  # fits as is; only the repeats go
+    else:
+        # First page in full, then label windows in document order
+        wanted = [i for i, (page_num, _) in enumerate(segments) if page_num == 0]
+        first_page = set(wanted)
+        for i, (_, segment) in enumerate(segments):
+            if i not in first_page and LABEL_RE.search(segment):
+                wanted.extend(range(max(0, i - WINDOW_BEFORE), min(len(segments), i + WINDOW_AFTER + 1)))
+
+    keep, budget = set(), token_budget * CHARS_PER_TOKEN
+    for i in wanted:
+        if i in keep:
+            continue
+        cost = len(segments[i][1]) + 1
+        if cost > budget:
+            break
+        keep.add(i)
+        budget -= cost
+
+    pruned = "\n".join(segment for i, (_, segment) in enumerate(segments) if i in keep)
+    stats = size_stats(text, pruned)
+    stats["repeated_lines_dropped"] = repeated
+    return pruned, stats
@@ -7,13 +7,18 @@ def read_config():
     try:
         with open(config_path, 'r') as file:
             config_data = json.load(file)
-            return config_data['configuration']
+            config = config_data['configuration']
     except FileNotFoundError:
         raise Exception(f"Configuration file not found at {config_path}")
     except json.JSONDecodeError:
         raise Exception("Invalid JSON format in configuration file")
     except KeyError:
         raise Exception("Missing 'configuration' key in config file")
+    # Environment variables of the same name win, e.g. DA_API_BASE_URL pointed at mock_services.py
+    for key in config:
+        if os.getenv(key):
+            config[key] = os.getenv(key)
+    return config
 
 def get_da_credentials():
     """Get DA login credentials"""
@@ -27,9 +32,12 @@ def get_da_credentials():
 def get_da_api_credentials():
     """Get DA API credentials"""
     config = read_config()
+    base_url = config['DA_API_BASE_URL'].rstrip('/')
     return {
         'token_url': config['DA_API_TOKEN_URL'],
-        'base_url': config['DA_API_BASE_URL'],
+        'base_url': base_url,
+        'document_url': config.get('DA_API_DOCUMENT_URL') or f"{base_url}/document",
+        'patient_url': config.get('DA_API_PATIENT_URL') or f"{base_url}/patient",
         'username': config['DA_API_TOKEN_USERNAME'],
         'password': config['DA_API_TOKEN_PASSWORD'],
         'clinician_id': config['DA_API_TOKEN_CLINICIAN_ID'],
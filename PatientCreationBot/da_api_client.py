@@ -1,9 +1,9 @@
-import requests
+import http_client
 import json
-import base64
 import os
 from datetime import datetime
 import config_reader
+import document_store
 
 class DAAPIClient:
     def __init__(self):
@@ -19,7 +19,7 @@ class DAAPIClient:
             'password': self.api_config['password']
         }
         
-        response = requests.post(self.api_config['token_url'], headers=headers, data=data)
+        response = http_client.post(self.api_config['token_url'], headers=headers, data=data)
         
         if response.status_code == 200:
             json_response = response.json()
@@ -39,7 +39,7 @@ class DAAPIClient:
             'Authorization': f'Bearer {self.access_token}'
         }
         
-        response = requests.get(url, headers=headers)
+        response = http_client.get(url, headers=headers)
         
         if response.status_code == 200:
             return response.json()
@@ -69,23 +69,23 @@ class DAAPIClient:
             "recordsPerPage": 10
         }
         
-        response = requests.get(url, headers=headers, json=data)
+        try:
+            # Always download: the status metadata of a stored copy may be out of date
+            document = document_store.get_store().fetch(doc_id, url, headers, body=data, refresh=True)
+        except document_store.DocumentFetchError as e:
+            raise Exception(f"Failed to download document: {e.status_code} - {e.response_text}")
         
-        if response.status_code == 200:
-            response_json = response.json()
-            document_buffer = response_json['value']['documentBuffer']
-            document_data_bytes = base64.b64decode(document_buffer)
-            
-            if download_folder:
-                os.makedirs(download_folder, exist_ok=True)
-                file_path = os.path.join(download_folder, f"{doc_id}.pdf")
-                with open(file_path, "wb") as f:
-                    f.write(document_data_bytes)
-                return file_path, response_json
-            else:
-                return document_data_bytes, response_json
+        response_json = {'value': document.metadata}
+        document_data_bytes = document.pdf_bytes
+        
+        if download_folder:
+            os.makedirs(download_folder, exist_ok=True)
+            file_path = os.path.join(download_folder, f"{doc_id}.pdf")
+            with open(file_path, "wb") as f:
+                f.write(document_data_bytes)
+            return file_path, response_json
         else:
-            raise Exception(f"Failed to download document: {response.status_code} - {response.text}")
+            return document_data_bytes, response_json
     
     def get_patient_by_id(self, patient_id):
         """Get patient details by patient ID"""
@@ -98,7 +98,7 @@ class DAAPIClient:
             'Authorization': f'Bearer {self.access_token}'
         }
         
-        response = requests.get(url, headers=headers)
+        response = http_client.get(url, headers=headers)
         
         if response.status_code == 200:
             return response.json()
@@ -115,7 +115,7 @@ class DAAPIClient:
             'Authorization': f'Bearer {self.access_token}'
         }
         
-        response = requests.post(self.api_config['patient_url'], headers=headers, data=json.dumps(patient_data))
+        response = http_client.post(self.api_config['patient_url'], headers=headers, data=json.dumps(patient_data))
         
         if response.status_code == 200:
             return response.json()
@@ -0,0 +1,67 @@
+"""
+Raw Azure Document Intelligence results kept on disk per PDF, so field extraction and
+mapping can be re-run without paying for (and waiting on) a new analysis.
+
+The serialized AnalyzeResult (documents, key_value_pairs, tables, content, ...) is
+stored next to the PDF in the local document store (document_store.put_text), keyed
+by the sha256 of the PDF plus the model id (and the page range, for analyses limited
+to some pages), so a changed PDF or a different model is never served a stale result
+and the store's size cap / LRU eviction also applies.
+
+Used by enhanced_medical_extractor.py and ai_extract_fields.py (normal runs read and
+write it; --remap-only runs read it without touching DA or Azure).
+
+This file is shared by the bot folders (copied like document_store.py);
+keep the copies identical.
+"""
+import hashlib
+import io
+import json
+
+from azure.ai.documentintelligence.models import AnalyzeResult
+
+import document_store
+
+try:
+    from PyPDF2 import PdfReader
+except ImportError:
+    PdfReader = None
+
+EXTRACTOR_PREFIX = "azure-analyze"
+
+
+def content_hash(pdf_bytes):
+    """sha256 of the PDF, the same key document_store uses"""
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+
+def _extractor(model_id, pages=None):
+    return f"{EXTRACTOR_PREFIX}-{model_id}" + (f"-p{pages}" if pages else "")
+
+
+def load(pdf_hash, model_id, pages=None):
+    """Cached AnalyzeResult for this PDF, model and page range (None = all pages), or None"""
+    text = document_store.get_store().get_text(pdf_hash, _extractor(model_id, pages))
+    if text is None:
+        return None
+    return AnalyzeResult(json.loads(text))
+
+
+def save(pdf_hash, model_id, result, pages=None):
+    document_store.get_store().put_text(pdf_hash, _extractor(model_id, pages), json.dumps(result.as_dict()))
+
+
+def stored_pdf(doc_id):
+    """PDF bytes of a document already in the local store (no DA call), or None"""
+    document = document_store.get_store().get(doc_id)
+    return document.pdf_bytes if document is not None else None
+
+
+def page_count(pdf_bytes):
+    """Number of pages in the PDF, or None when PyPDF2 is missing or cannot read it"""
+    if PdfReader is None:
+        return None
+    try:
+        return len(PdfReader(io.BytesIO(pdf_bytes)).pages)
+    except Exception:
+        return None
@@ -0,0 +1,135 @@
+"""
+Microbenchmark of the regex fallback of enhanced_medical_extractor.extract_medical_fields:
+the single-pass PATTERN_SCANNER (scan_patterns) against the previous implementation
+(lowercase the text, then re.findall per pattern, field group by field group).
+
+Runs on the Azure `result.content` text of the bundled sample PDFs, read from the
+analyses stored by analysis_cache.py. PDFs without a stored analysis are skipped,
+or analyzed first with --analyze (billed Azure calls, stored for later runs).
+
+Usage (from the repository root, like enhanced_medical_extractor.py):
+    python Patient_Order_Bot/benchmark_pattern_scan.py --repeat 50
+    python Patient_Order_Bot/benchmark_pattern_scan.py --analyze --max-docs 20 --show-diffs
+"""
+import argparse
+import glob
+import os
+import re
+import time
+
+import enhanced_medical_extractor as eme
+import analysis_cache
+
+DEFAULT_CORPORA = ["azure_training_samples_bulk", "azure_training_samples"]
+
+
+def legacy_extract_with_patterns(content):
+    """extract_with_patterns before the single-pass scanner, kept as the baseline"""
+    content_lower = content.lower()
+    date = r"([0-9]{1,2}[\/\-][0-9]{1,2}[\/\-][0-9]{2,4})"
+    pattern_groups = {
+        'patient_name': [r"patient\s*name[:\s]*([^\n\r]+)", r"name[:\s]*([^\n\r]+)", r"patient[:\s]*([^\n\r]+)",
+                         r"client\s*name[:\s]*([^\n\r]+)"],
+        'dob': [r"(?:dob|date\s*of\s*birth|birth\s*date|born)[:\s]*" + date, r"d\.o\.b[:\s]*" + date],
+        'start_of_care': [r"(?:start\s*of\s*care|soc|care\s*start)[:\s]*" + date,
+                          r"(?:admission\s*date|admit\s*date)[:\s]*" + date],
+        'episode_start': [r"(?:episode\s*start|cert\s*period\s*from|episode\s*from)[:\s]*" + date,
+                          r"(?:from\s*date|period\s*from)[:\s]*" + date],
+        'episode_end': [r"(?:episode\s*end|cert\s*period\s*to|episode\s*to)[:\s]*" + date,
+                        r"(?:to\s*date|period\s*to)[:\s]*" + date],
+        'mrn': [r"(?:mrn|medical\s*record|patient\s*id|record\s*number|chart\s*#)[:\s]*([^\s\n]+)",
+                r"(?:mr\s*#|patient\s*#)[:\s]*([^\s\n]+)"],
+        'icd_codes': [r"(?:icd[:\s]*(?:10|9)?[:\s]*)?([A-Z][0-9]{2}\.?[0-9A-Z]*)",
+                      r"(?:diagnosis\s*code|dx\s*code)[:\s]*([A-Z][0-9]{2}\.?[0-9A-Z]*)",
+                      r"(?:primary\s*diagnosis|secondary\s*diagnosis)[:\s]*([A-Z][0-9]{2}\.?[0-9A-Z]*)"],
+    }
+    patterns = {}
+    for field, pattern_list in pattern_groups.items():
+        for pattern in pattern_list:
+            matches = re.findall(pattern, content_lower, re.IGNORECASE)
+            if matches:
+                patterns[field] = ', '.join(matches) if field == 'icd_codes' else matches[0].strip()
+                break
+    return patterns
+
+
+def load_contents(pdf_paths, analyze):
+    """(doc_id, result.content) for every PDF with a stored (or, with analyze, new) Azure analysis"""
+    extractor = eme.MedicalDocumentExtractor() if analyze else None
+    contents, skipped = [], 0
+    for path in pdf_paths:
+        with open(path, "rb") as f:
+            pdf_bytes = f.read()
+        pdf_hash = analysis_cache.content_hash(pdf_bytes)
+        result = None
+        for model_id in dict.fromkeys([eme.AZURE_MODEL, eme.FALLBACK_MODEL]):
+            result = analysis_cache.load(pdf_hash, model_id)
+            if result is not None:
+                break
+        if result is None and extractor is not None:
+            result = extractor.analyze_pages(pdf_bytes, pdf_hash)
+        if result is None or not result.content:
+            skipped += 1
+            continue
+        contents.append((os.path.splitext(os.path.basename(path))[0], result.content))
+    return contents, skipped
+
+
+def time_method(method, contents, repeat):
+    """Best-of-repeat seconds for one pass over all contents"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _, content in contents:
+            method(content)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the regex fallback scanner of enhanced_medical_extractor")
+    parser.add_argument("--corpus", nargs="+", default=DEFAULT_CORPORA, help="Directories of sample PDFs")
+    parser.add_argument("--max-docs", type=int, default=0, help="Only use the first N PDFs (0 = all)")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed passes per method (best is reported)")
+    parser.add_argument("--analyze", action="store_true",
+                        help="Analyze PDFs without a stored analysis with Azure (billed) instead of skipping them")
+    parser.add_argument("--show-diffs", action="store_true", help="Print the fields where the two methods differ")
+    args = parser.parse_args()
+
+    pdf_paths = []
+    for corpus in args.corpus:
+        pdf_paths.extend(sorted(glob.glob(os.path.join(corpus, "*.pdf"))))
+    if args.max_docs > 0:
+        pdf_paths = pdf_paths[:args.max_docs]
+    contents, skipped = load_contents(pdf_paths, args.analyze)
+    if not contents:
+        print(f"No stored Azure analyses for the {len(pdf_paths)} PDFs in {', '.join(args.corpus)}; "
+              f"run with --analyze or run enhanced_medical_extractor.py on them first")
+        return
+    chars = sum(len(content) for _, content in contents)
+    print(f"{len(contents)} documents ({chars:,} chars of result.content), {skipped} skipped without an analysis")
+
+    methods = [("legacy findall", legacy_extract_with_patterns), ("single-pass scanner", eme.scan_patterns)]
+    timings = {name: time_method(method, contents, args.repeat) for name, method in methods}
+    print(f"\n{'Method':<20} {'Pass s':>9} {'Per doc ms':>11} {'MB/s':>8}")
+    for name, seconds in timings.items():
+        print(f"{name:<20} {seconds:>9.4f} {seconds / len(contents) * 1000:>11.3f} {chars / seconds / 1e6:>8.1f}")
+    legacy, scanner = timings["legacy findall"], timings["single-pass scanner"]
+    print(f"Speedup: {legacy / scanner:.2f}x")
+
+    differing = {}
+    for doc_id, content in contents:
+        old, new = legacy_extract_with_patterns(content), eme.scan_patterns(content)
+        for field in eme.OUTPUT_FIELDS:
+            # The legacy values are lowercased; compare case-insensitively except for the ICD codes
+            old_value, new_value = old.get(field, ""), new.get(field, "")
+            if (old_value != new_value) if field == "icd_codes" else (old_value.lower() != new_value.lower()):
+                differing[field] = differing.get(field, 0) + 1
+                if args.show_diffs:
+                    print(f"  {doc_id} {field}: {old_value!r} -> {new_value!r}")
+    print(f"Documents with a different value per field: {differing or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
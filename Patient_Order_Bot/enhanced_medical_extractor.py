@@ -3,20 +3,44 @@
 Enhanced Medical Document Extractor for PGs and HHAs
 Handles: Patient Orders, POC, Face-to-face, Lab Reports, 485 Certificates
 Extracts: Patient Name, DOB, Start of Care, Episode Dates, ICD Codes
+
+Azure analysis is a long-running server-side operation, so with --max-in-flight N
+up to N documents are fetched and analyzed at once (one poller each). Analyze
+submissions and polls share the resource's transactions-per-second limit
+(--tps, AZURE_FORM_TPS): submissions go through a token bucket at half the TPS,
+and the polling interval is stretched so N pollers use at most the other half.
+Output rows are written in input order either way.
+
+Every analysis is stored per PDF (analysis_cache.py) and reused for the same PDF and
+model; --remap-only re-runs extract_medical_fields / map_to_target_fields on the
+stored analyses without calling DA or Azure, for trying out mapping changes.
+
+Azure bills per analyzed page, and on 485s and orders the demographic and episode
+fields are almost always on the first pages. With --leading-pages N
+(AZURE_LEADING_PAGES) only pages 1-N are analyzed first; the remaining pages are
+analyzed only when REQUIRED_FIELDS are still empty after mapping, and fill just
+the fields the leading pages left empty.
+
+Usage:
+    python enhanced_medical_extractor.py [input.csv] [--max-in-flight 8] [--tps 15] [--leading-pages 2]
+    python enhanced_medical_extractor.py [input.csv] --remap-only
 """
+import argparse
 import csv
 import io
 import os
 import sys
-import base64
-import time
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Dict, List, Optional
 
-import requests
 from dotenv import load_dotenv
 
+import document_store
+from http_client import TokenBucket
+
 try:
     from azure.ai.documentintelligence import DocumentIntelligenceClient
     from azure.core.credentials import AzureKeyCredential
@@ -25,6 +49,8 @@ except ImportError:
     print("Install it with: pip install azure-ai-documentintelligence==1.0.2")
     sys.exit(1)
 
+import analysis_cache
+
 # Load configuration
 load_dotenv()
 
@@ -34,20 +60,119 @@ DA_GETFILE_URL = os.getenv("DA_GETFILE_URL", "https://api.doctoralliance.com/doc
 AZURE_ENDPOINT = os.getenv("AZURE_FORM_ENDPOINT", "")
 AZURE_KEY = os.getenv("AZURE_FORM_KEY", "")
 AZURE_MODEL = os.getenv("AZURE_FORM_MODEL", "prebuilt-layout")
+FALLBACK_MODEL = "prebuilt-layout"
+
+AZURE_TPS = float(os.getenv("AZURE_FORM_TPS", "15"))  # transactions/second of the resource (S0 default)
+AZURE_MAX_IN_FLIGHT = int(os.getenv("AZURE_MAX_IN_FLIGHT", "1"))
+MIN_POLLING_INTERVAL = 1.0  # seconds; the SDK default
+AZURE_LEADING_PAGES = int(os.getenv("AZURE_LEADING_PAGES", "0"))  # 0 = analyze every page at once
 
-INPUT_CSV = sys.argv[1] if len(sys.argv) > 1 else "AthenaOrders/Inbox/Inbox_Extracted_Data.csv"
+INPUT_CSV = "AthenaOrders/Inbox/Inbox_Extracted_Data.csv"
 TIMESTAMP = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
 OUTPUT_CSV = f"csv_outputs/Medical_Extracted_{TIMESTAMP}.csv"
 
 # Create output directory
 os.makedirs(os.path.dirname(OUTPUT_CSV), exist_ok=True)
 
+OUTPUT_FIELDS = ["patient_name", "dob", "start_of_care", "episode_start", "episode_end", "mrn", "icd_codes"]
+# Fields that make the remaining pages worth analyzing when the leading pages did not fill them
+REQUIRED_FIELDS = ["dob", "start_of_care", "episode_start", "episode_end", "mrn"]
+
+# Regex fallback of extract_medical_fields: (field, priority, labels, value). For each field the
+# lowest-priority pattern that matches wins, first match in the document; icd_codes collects every
+# code. All patterns are scanned in one pass (PATTERN_SCANNER): an alternative consumes only its
+# label and reads the value in a lookahead, so a value spanning other labels ("Patient: DOE, JANE
+# DOB: ...") does not hide them. Specific labels come before the generic "name" / "patient" ones
+# that start at the same position. Labels and codes must start a word, and the scanner only tries
+# the alternatives at word starts whose first letter begins some label (or is an uppercase letter).
+DATE_VALUE = r"[0-9]{1,2}[\/\-][0-9]{1,2}[\/\-][0-9]{2,4}"
+LINE_VALUE = r"[^\n\r]+"
+TOKEN_VALUE = r"[^\s\n]+"
+PATTERNS = [
+    ("patient_name", 0, (r"patient\s*name",), LINE_VALUE),
+    ("patient_name", 3, (r"client\s*name",), LINE_VALUE),
+    ("dob", 0, (r"dob", r"date\s*of\s*birth", r"birth\s*date", r"born"), DATE_VALUE),
+    ("dob", 1, (r"d\.o\.b",), DATE_VALUE),
+    ("start_of_care", 0, (r"start\s*of\s*care", r"soc", r"care\s*start"), DATE_VALUE),
+    ("start_of_care", 1, (r"admission\s*date", r"admit\s*date"), DATE_VALUE),
+    ("episode_start", 0, (r"episode\s*start", r"cert\s*period\s*from", r"episode\s*from"), DATE_VALUE),
+    ("episode_start", 1, (r"from\s*date", r"period\s*from"), DATE_VALUE),
+    ("episode_end", 0, (r"episode\s*end", r"cert\s*period\s*to", r"episode\s*to"), DATE_VALUE),
+    ("episode_end", 1, (r"to\s*date", r"period\s*to"), DATE_VALUE),
+    ("mrn", 0, (r"mrn", r"medical\s*record(?:\s*(?:number|no\.?|#))?", r"patient\s*id", r"record\s*number",
+                r"chart\s*#"), TOKEN_VALUE),
+    ("mrn", 1, (r"mr\s*#", r"patient\s*#"), TOKEN_VALUE),
+    ("patient_name", 1, (r"name",), LINE_VALUE),
+    ("patient_name", 2, (r"patient",), LINE_VALUE),
+]
+# ICD-10 codes are matched case-sensitively on the original text (a labelled code is also a bare code)
+ICD_CODE = r"(?-i:[A-Z][0-9]{2}(?:\.?[0-9A-Z]{1,4})?)\b"
+
+
+def _compile_scanner():
+    alternatives, index, initials = [], {}, set()
+    for number, (field, priority, labels, value) in enumerate(PATTERNS):
+        alternatives.append(rf"(?P<p{number}>(?:{'|'.join(labels)})[:\s]*(?=({value})))")
+        index[f"p{number}"] = (field, priority)
+        initials.update(label[0] for label in labels)
+    alternatives.append(rf"(?P<icd>{ICD_CODE})")
+    index["icd"] = ("icd_codes", 0)
+    first = rf"(?=[{''.join(sorted(initials))}]|(?-i:[A-Z]))"
+    regex = re.compile(rf"\b{first}(?:{'|'.join(alternatives)})", re.IGNORECASE)
+    # The value is the group right after the alternative's own group
+    return regex, {name: (field, priority, regex.groupindex[name] + (name != "icd"))
+                   for name, (field, priority) in index.items()}
+
+
+PATTERN_SCANNER, PATTERN_GROUPS = _compile_scanner()
+
+
+def scan_patterns(content: str) -> Dict[str, str]:
+    """One pass of PATTERN_SCANNER over the text; returns {field: value} for the fields found"""
+    found = {}  # field -> (priority, value)
+    codes = []
+    for match in PATTERN_SCANNER.finditer(content):
+        field, priority, group = PATTERN_GROUPS[match.lastgroup]
+        if field == "icd_codes":
+            codes.append(match.group(group))
+        elif field not in found or priority < found[field][0]:
+            found[field] = (priority, match.group(group).strip())
+    if codes:
+        found["icd_codes"] = (0, ", ".join(dict.fromkeys(codes)))
+    return {field: found[field][1] for field in OUTPUT_FIELDS if field in found}
+
 class MedicalDocumentExtractor:
-    def __init__(self):
-        self.client = DocumentIntelligenceClient(AZURE_ENDPOINT, AzureKeyCredential(AZURE_KEY))
+    def __init__(self, max_in_flight: int = AZURE_MAX_IN_FLIGHT, tps: float = AZURE_TPS,
+                 leading_pages: int = AZURE_LEADING_PAGES):
+        self._client = None  # created on first analysis, so --remap-only runs need no Azure settings
+        self.client_lock = threading.Lock()
+        self.max_in_flight = max(1, max_in_flight)
+        self.leading_pages = max(0, leading_pages)
+        # Half the TPS for analyze submissions, half for the pollers' status requests
+        self.submit_bucket = TokenBucket(tps / 2 if tps > 0 else 0)
+        self.polling_interval = max(MIN_POLLING_INTERVAL, 2 * self.max_in_flight / tps) if tps > 0 \
+            else MIN_POLLING_INTERVAL
+    
+    @property
+    def client(self):
+        with self.client_lock:
+            if self._client is None:
+                self._client = DocumentIntelligenceClient(AZURE_ENDPOINT, AzureKeyCredential(AZURE_KEY))
+            return self._client
+
+    def begin_analyze(self, model_id: str, pdf_bytes: bytes, pages: Optional[str] = None):
+        """Submit one analysis (of all pages, or a range like "1-2") within the TPS budget; returns the poller"""
+        self.submit_bucket.acquire()
+        return self.client.begin_analyze_document(
+            model_id,
+            body=pdf_bytes,
+            content_type="application/pdf",
+            pages=pages,
+            polling_interval=self.polling_interval
+        )
         
     def fetch_pdf_bytes(self, doc_id: str, token: str) -> bytes:
-        """Fetch PDF from DA API"""
+        """Fetch PDF from DA API (served from the local document store when already downloaded)"""
         print(f"\n{'='*60}")
         print(f"📥 FETCHING PDF FROM DA API")
         print(f"{'='*60}")
@@ -59,84 +184,127 @@ class MedicalDocumentExtractor:
         print(f"🌐 API URL: {url}")
         print(f"🔑 Auth token: {token[:20]}...{token[-10:] if len(token) > 30 else token}")
         
-        print(f"⏳ Making first API request...")
-        response = requests.get(url, headers=headers, timeout=60)
-        print(f"📊 Response status: {response.status_code}")
-        
-        if response.status_code != 200:
-            print(f"❌ API request failed with status {response.status_code}")
-            print(f"📄 Response: {response.text[:200]}...")
-            raise RuntimeError(f"API request failed: {response.status_code}")
-        
-        payload = response.json().get("value", {})
-        buffer_b64 = payload.get("documentBuffer")
-        
-        # Retry with JSON body if no buffer
-        if not buffer_b64:
-            print(f"⚠️  No documentBuffer in response, trying with JSON body...")
-            request_body = {
-                "onlyUnfiled": True,
-                "careProviderId": {"id": 0, "externalId": ""},
-                "dateFrom": None, "dateTo": None,
-                "page": 1, "recordsPerPage": 10
-            }
-            print(f"📤 Sending JSON body: {request_body}")
-            response = requests.get(url, headers=headers, json=request_body, timeout=60)
-            print(f"📊 Second attempt status: {response.status_code}")
-            
-            if response.status_code != 200:
-                print(f"❌ Second API request failed with status {response.status_code}")
-                raise RuntimeError(f"Second API request failed: {response.status_code}")
-                
-            payload = response.json().get("value", {})
-            buffer_b64 = payload.get("documentBuffer")
+        # Retry with JSON body if the first response has no buffer
+        request_body = {
+            "onlyUnfiled": True,
+            "careProviderId": {"id": 0, "externalId": ""},
+            "dateFrom": None, "dateTo": None,
+            "page": 1, "recordsPerPage": 10
+        }
         
-        if not buffer_b64:
-            print(f"❌ No documentBuffer found in either response")
-            print(f"📄 Response payload keys: {list(payload.keys())}")
-            raise RuntimeError("documentBuffer missing in response")
-            
-        pdf_bytes = base64.b64decode(buffer_b64)
+        try:
+            document = document_store.get_store().fetch(doc_id, url, headers, retry_body=request_body)
+        except document_store.DocumentFetchError as e:
+            print(f"❌ {e}")
+            if e.response_text:
+                print(f"📄 Response: {e.response_text[:200]}...")
+            raise
+        
+        pdf_bytes = document.pdf_bytes
+        if document.from_cache:
+            print(f"💾 PDF served from local document store")
         print(f"✅ PDF retrieved successfully!")
         print(f"📄 PDF size: {len(pdf_bytes):,} bytes")
-        print(f"🔍 Base64 buffer length: {len(buffer_b64):,} characters")
         
         return pdf_bytes
     
-    def analyze_document(self, pdf_bytes: bytes) -> Dict[str, str]:
-        """Analyze document using Azure Document Intelligence"""
-        print(f"\n{'='*60}")
-        print(f"🔍 ANALYZING DOCUMENT WITH AZURE AI")
-        print(f"{'='*60}")
-        print(f"📄 Document size: {len(pdf_bytes):,} bytes")
-        print(f"🤖 Using model: {AZURE_MODEL}")
-        print(f"🌐 Azure endpoint: {AZURE_ENDPOINT}")
+    def cached_analysis(self, pdf_hash: str, pages: Optional[str] = None):
+        """Stored AnalyzeResult of this PDF (and page range) from AZURE_MODEL or the fallback model, or None"""
+        for model_id in dict.fromkeys([AZURE_MODEL, FALLBACK_MODEL]):
+            result = analysis_cache.load(pdf_hash, model_id, pages)
+            if result is not None:
+                print(f"💾 Reusing stored '{model_id}' analysis of this PDF (pages {pages or 'all'})")
+                return result
+        return None
+    
+    def analyze_pages(self, pdf_bytes: bytes, pdf_hash: str, pages: Optional[str] = None):
+        """AnalyzeResult for the given pages (None = all), from the analysis cache or a new Azure analysis"""
+        result = self.cached_analysis(pdf_hash, pages)
+        if result is not None:
+            return result
         
+        model_id = AZURE_MODEL
         try:
-            print(f"⏳ Starting analysis with custom model '{AZURE_MODEL}'...")
-            poller = self.client.begin_analyze_document(
-                AZURE_MODEL,
-                body=pdf_bytes,
-                content_type="application/pdf"
-            )
+            print(f"⏳ Starting analysis with custom model '{AZURE_MODEL}' (pages {pages or 'all'})...")
+            poller = self.begin_analyze(AZURE_MODEL, pdf_bytes, pages)
             result = poller.result()
             print(f"✅ Analysis completed successfully with custom model!")
         except Exception as e:
             if "ModelNotFound" in str(e):
                 print(f"❌ Custom model '{AZURE_MODEL}' not found!")
                 print(f"🔄 Falling back to prebuilt-layout model...")
-                poller = self.client.begin_analyze_document(
-                    "prebuilt-layout",
-                    body=pdf_bytes,
-                    content_type="application/pdf"
-                )
+                model_id = FALLBACK_MODEL
+                poller = self.begin_analyze(model_id, pdf_bytes, pages)
                 result = poller.result()
                 print(f"✅ Analysis completed with prebuilt-layout fallback")
             else:
                 print(f"❌ Analysis failed with error: {e}")
                 raise e
         
-        return self.extract_medical_fields(result)
+        analysis_cache.save(pdf_hash, model_id, result, pages)
+        return result
+    
+    def extract_adaptive(self, analyze, page_count: Optional[int]) -> Dict[str, str]:
+        """Mapped fields from the leading pages, expanded to the remaining pages only when
+        REQUIRED_FIELDS are still empty. analyze(pages) returns the AnalyzeResult for a page range."""
+        if not self.leading_pages or (page_count is not None and page_count <= self.leading_pages):
+            return self.extract_medical_fields(analyze(None))
+        
+        mapped = self.extract_medical_fields(analyze(f"1-{self.leading_pages}"))
+        missing = [field for field in REQUIRED_FIELDS if not mapped.get(field)]
+        if not missing:
+            print(f"📄 Required fields found on pages 1-{self.leading_pages}; remaining pages not analyzed")
+            return mapped
+        
+        # Page count unknown (no PyPDF2): analyze the whole document instead of guessing the last page
+        rest = f"{self.leading_pages + 1}-{page_count}" if page_count else None
+        print(f"📄 Missing {missing} after pages 1-{self.leading_pages}; analyzing pages {rest or 'all'}")
+        try:
+            result = analyze(rest)
+        except LookupError as e:  # --remap-only and the remaining pages were never analyzed
+            print(f"⚠️  {e}")
+            return mapped
+        expanded = self.extract_medical_fields(result)
+        for field, value in expanded.items():
+            if value and not mapped.get(field):
+                mapped[field] = value
+        return mapped
+    
+    def analyze_document(self, pdf_bytes: bytes) -> Dict[str, str]:
+        """Analyze document using Azure Document Intelligence"""
+        print(f"\n{'='*60}")
+        print(f"🔍 ANALYZING DOCUMENT WITH AZURE AI")
+        print(f"{'='*60}")
+        print(f"📄 Document size: {len(pdf_bytes):,} bytes")
+        print(f"🤖 Using model: {AZURE_MODEL}")
+        print(f"🌐 Azure endpoint: {AZURE_ENDPOINT}")
+        
+        pdf_hash = analysis_cache.content_hash(pdf_bytes)
+        # An analysis of the whole document from an earlier run is reused as is
+        result = self.cached_analysis(pdf_hash)
+        if result is not None:
+            return self.extract_medical_fields(result)
+        return self.extract_adaptive(lambda pages: self.analyze_pages(pdf_bytes, pdf_hash, pages),
+                                     analysis_cache.page_count(pdf_bytes))
+    
+    def remap_document(self, doc_id: str) -> Dict[str, str]:
+        """Re-run field extraction and mapping on the stored analysis of a document (no DA or Azure calls)"""
+        pdf_bytes = analysis_cache.stored_pdf(doc_id)
+        if pdf_bytes is None:
+            raise LookupError(f"Document {doc_id} is not in the local document store; run without --remap-only first")
+        pdf_hash = analysis_cache.content_hash(pdf_bytes)
+        
+        def stored(pages):
+            result = self.cached_analysis(pdf_hash, pages)
+            if result is None:
+                raise LookupError(f"No stored Azure analysis of pages {pages or 'all'} for document {doc_id}; "
+                                  f"run without --remap-only first")
+            return result
+        
+        result = self.cached_analysis(pdf_hash)
+        if result is not None:
+            return self.extract_medical_fields(result)
+        return self.extract_adaptive(stored, analysis_cache.page_count(pdf_bytes))
     
     def extract_medical_fields(self, result) -> Dict[str, str]:
         """Extract specific medical fields from Azure result"""
@@ -212,76 +380,7 @@ class MedicalDocumentExtractor:
     
     def extract_with_patterns(self, content: str) -> Dict[str, str]:
         """Extract fields using regex patterns for medical documents"""
-        content_lower = content.lower()
-        patterns = {}
-        
-        # Patient Name patterns
-        name_patterns = [
-            r"patient\s*name[:\s]*([^\n\r]+)",
-            r"name[:\s]*([^\n\r]+)",
-            r"patient[:\s]*([^\n\r]+)",
-            r"client\s*name[:\s]*([^\n\r]+)"
-        ]
-        
-        # DOB patterns
-        dob_patterns = [
-            r"(?:dob|date\s*of\s*birth|birth\s*date|born)[:\s]*([0-9]{1,2}[\/\-][0-9]{1,2}[\/\-][0-9]{2,4})",
-            r"d\.o\.b[:\s]*([0-9]{1,2}[\/\-][0-9]{1,2}[\/\-][0-9]{2,4})"
-        ]
-        
-        # Start of Care patterns
-        soc_patterns = [
-            r"(?:start\s*of\s*care|soc|care\s*start)[:\s]*([0-9]{1,2}[\/\-][0-9]{1,2}[\/\-][0-9]{2,4})",
-            r"(?:admission\s*date|admit\s*date)[:\s]*([0-9]{1,2}[\/\-][0-9]{1,2}[\/\-][0-9]{2,4})"
-        ]
-        
-        # Episode dates patterns
-        episode_start_patterns = [
-            r"(?:episode\s*start|cert\s*period\s*from|episode\s*from)[:\s]*([0-9]{1,2}[\/\-][0-9]{1,2}[\/\-][0-9]{2,4})",
-            r"(?:from\s*date|period\s*from)[:\s]*([0-9]{1,2}[\/\-][0-9]{1,2}[\/\-][0-9]{2,4})"
-        ]
-        
-        episode_end_patterns = [
-            r"(?:episode\s*end|cert\s*period\s*to|episode\s*to)[:\s]*([0-9]{1,2}[\/\-][0-9]{1,2}[\/\-][0-9]{2,4})",
-            r"(?:to\s*date|period\s*to)[:\s]*([0-9]{1,2}[\/\-][0-9]{1,2}[\/\-][0-9]{2,4})"
-        ]
-        
-        # MRN patterns
-        mrn_patterns = [
-            r"(?:mrn|medical\s*record|patient\s*id|record\s*number|chart\s*#)[:\s]*([^\s\n]+)",
-            r"(?:mr\s*#|patient\s*#)[:\s]*([^\s\n]+)"
-        ]
-        
-        # ICD Code patterns
-        icd_patterns = [
-            r"(?:icd[:\s]*(?:10|9)?[:\s]*)?([A-Z][0-9]{2}\.?[0-9A-Z]*)",  # ICD-10 format
-            r"(?:diagnosis\s*code|dx\s*code)[:\s]*([A-Z][0-9]{2}\.?[0-9A-Z]*)",
-            r"(?:primary\s*diagnosis|secondary\s*diagnosis)[:\s]*([A-Z][0-9]{2}\.?[0-9A-Z]*)"
-        ]
-        
-        # Apply patterns
-        pattern_groups = {
-            'patient_name': name_patterns,
-            'dob': dob_patterns,
-            'start_of_care': soc_patterns,
-            'episode_start': episode_start_patterns,
-            'episode_end': episode_end_patterns,
-            'mrn': mrn_patterns,
-            'icd_codes': icd_patterns
-        }
-        
-        for field, pattern_list in pattern_groups.items():
-            for pattern in pattern_list:
-                matches = re.findall(pattern, content_lower, re.IGNORECASE)
-                if matches:
-                    if field == 'icd_codes':
-                        # Collect all ICD codes
-                        patterns[field] = ', '.join(matches)
-                    else:
-                        patterns[field] = matches[0].strip()
-                    break
-        
-        return patterns
+        return scan_patterns(content)
     
     def map_to_target_fields(self, extracted: Dict[str, str]) -> Dict[str, str]:
         """Map extracted fields to target output fields"""
@@ -334,9 +433,52 @@ class MedicalDocumentExtractor:
         
         return mapped
     
-    def process_csv(self, input_file: str, output_file: str):
-        """Process CSV file and extract medical fields"""
-        if not AUTH_TOKEN:
+    def process_row(self, row_count: int, row: Dict[str, str], remap_only: bool = False):
+        """Fetch, analyze and map one input row; returns (row with the extracted fields, succeeded)"""
+        doc_id = row.get("ID") or row.get("DocID") or row.get("DocumentID") or ""
+        
+        print(f"\n{'='*80}")
+        print(f"📄 PROCESSING DOCUMENT {row_count}")
+        print(f"{'='*80}")
+        
+        if not doc_id:
+            print(f"⚠️  No document ID found in row {row_count}")
+            print(f"📋 Available columns: {list(row.keys())}")
+            return row, False
+        
+        try:
+            print(f"🆔 Document ID: {doc_id}")
+            print(f"👤 Patient: {row.get('Patient', 'Unknown')}")
+            print(f"🏥 Facility: {row.get('Facility', 'Unknown')}")
+            print(f"👨‍⚕️ Physician: {row.get('Physician', 'Unknown')}")
+            
+            if remap_only:
+                medical_fields = self.remap_document(doc_id)
+            else:
+                pdf_bytes = self.fetch_pdf_bytes(doc_id, AUTH_TOKEN)
+                medical_fields = self.analyze_document(pdf_bytes)
+            
+            # Add extracted fields to row
+            fields_added = 0
+            for field, value in medical_fields.items():
+                if value:
+                    row[field] = value
+                    fields_added += 1
+            
+            print(f"\n✅ DOCUMENT {row_count} COMPLETED SUCCESSFULLY!")
+            print(f"   📊 Fields extracted: {fields_added}/{len(OUTPUT_FIELDS)}")
+            print(f"   📋 Extracted data: {[(k, v) for k, v in medical_fields.items() if v]}")
+            return row, True
+            
+        except Exception as e:
+            print(f"\n❌ DOCUMENT {row_count} (ID {doc_id}) FAILED!")
+            print(f"   🚨 Error: {str(e)}")
+            print(f"   📋 Original row data will be preserved")
+            return row, False
+    
+    def process_csv(self, input_file: str, output_file: str, remap_only: bool = False):
+        """Process CSV file and extract medical fields (from stored analyses only with remap_only)"""
+        if not AUTH_TOKEN and not remap_only:
             raise RuntimeError("AUTH_TOKEN not set in environment")
         
         print(f"\n{'='*80}")
@@ -346,18 +488,19 @@ class MedicalDocumentExtractor:
         print(f"📁 Output file: {output_file}")
         print(f"🤖 Azure model: {AZURE_MODEL}")
         print(f"🔑 Auth token: {AUTH_TOKEN[:20]}...{AUTH_TOKEN[-10:] if len(AUTH_TOKEN) > 30 else AUTH_TOKEN}")
+        if remap_only:
+            print(f"💾 Remap only: using stored Azure analyses, no DA or Azure calls")
+        else:
+            print(f"⚡ Analyses in flight: {self.max_in_flight} (polling every {self.polling_interval:.1f}s)")
         
         with open(input_file, newline="", encoding="utf-8") as src, \
              open(output_file, "w", newline="", encoding="utf-8") as dest:
             
             reader = csv.DictReader(src)
-            fieldnames = list(reader.fieldnames) + [
-                "patient_name", "dob", "start_of_care", 
-                "episode_start", "episode_end", "mrn", "icd_codes"
-            ]
+            fieldnames = list(reader.fieldnames) + OUTPUT_FIELDS
             
             print(f"📋 Original CSV columns: {list(reader.fieldnames)}")
-            print(f"📋 New columns being added: patient_name, dob, start_of_care, episode_start, episode_end, mrn, icd_codes")
+            print(f"📋 New columns being added: {', '.join(OUTPUT_FIELDS)}")
             
             writer = csv.DictWriter(dest, fieldnames=fieldnames)
             writer.writeheader()
@@ -366,53 +509,27 @@ class MedicalDocumentExtractor:
             success_count = 0
             error_count = 0
             
-            for row in reader:
-                row_count += 1
-                doc_id = row.get("ID") or row.get("DocID") or row.get("DocumentID") or ""
-                
-                print(f"\n{'='*80}")
-                print(f"📄 PROCESSING DOCUMENT {row_count}")
-                print(f"{'='*80}")
-                
-                if not doc_id:
-                    print(f"⚠️  No document ID found in row {row_count}")
-                    print(f"📋 Available columns: {list(row.keys())}")
-                    writer.writerow(row)
-                    error_count += 1
-                    continue
-                
-                try:
-                    print(f"🆔 Document ID: {doc_id}")
-                    print(f"👤 Patient: {row.get('Patient', 'Unknown')}")
-                    print(f"🏥 Facility: {row.get('Facility', 'Unknown')}")
-                    print(f"👨‍⚕️ Physician: {row.get('Physician', 'Unknown')}")
-                    
-                    pdf_bytes = self.fetch_pdf_bytes(doc_id, AUTH_TOKEN)
-                    medical_fields = self.analyze_document(pdf_bytes)
-                    
-                    # Add extracted fields to row
-                    fields_added = 0
-                    for field, value in medical_fields.items():
-                        if value:
-                            row[field] = value
-                            fields_added += 1
-                    
-                    writer.writerow(row)
-                    success_count += 1
-                    
-                    print(f"\n✅ DOCUMENT {row_count} COMPLETED SUCCESSFULLY!")
-                    print(f"   📊 Fields extracted: {fields_added}/7")
-                    print(f"   📋 Extracted data: {[(k, v) for k, v in medical_fields.items() if v]}")
-                    
-                except Exception as e:
-                    print(f"\n❌ DOCUMENT {row_count} FAILED!")
-                    print(f"   🚨 Error: {str(e)}")
-                    print(f"   📋 Original row data will be preserved")
+            if self.max_in_flight <= 1 or remap_only:
+                results = (self.process_row(index, row, remap_only) for index, row in enumerate(reader, 1))
+                executor = None
+            else:
+                # Each worker holds one outstanding poller; results are written back in input order
+                executor = ThreadPoolExecutor(max_workers=self.max_in_flight)
+                futures = [executor.submit(self.process_row, index, row) for index, row in enumerate(reader, 1)]
+                results = (future.result() for future in futures)
+            
+            try:
+                for row, succeeded in results:
+                    row_count += 1
                     writer.writerow(row)
-                    error_count += 1
-                    continue
+                    if succeeded:
+                        success_count += 1
+                    else:
+                        error_count += 1
+            finally:
+                if executor is not None:
+                    executor.shutdown(wait=True)
                 
-                time.sleep(0.2)  # Rate limiting
         
         print(f"\n{'='*80}")
         print(f"🎉 PROCESSING COMPLETE!")
@@ -427,7 +544,7 @@ class MedicalDocumentExtractor:
         
         print(f"\n🎯 NEXT STEPS:")
         print(f"   1. Open the output CSV file: {output_file}")
-        print(f"   2. Check the new columns: patient_name, dob, start_of_care, episode_start, episode_end, mrn, icd_codes")
+        print(f"   2. Check the new columns: {', '.join(OUTPUT_FIELDS)}")
         print(f"   3. Verify the extracted data matches your expectations")
         print(f"   4. If accuracy is low, consider retraining your Azure model with more examples")
 
@@ -439,8 +556,21 @@ def main():
     print("🎯 Target Fields: Name, DOB, Start of Care, Episode Dates, ICD Codes")
     print("=" * 50)
     
-    extractor = MedicalDocumentExtractor()
-    extractor.process_csv(INPUT_CSV, OUTPUT_CSV)
+    parser = argparse.ArgumentParser(description="Extract medical fields from DA documents with Azure Document Intelligence")
+    parser.add_argument("input_csv", nargs="?", default=INPUT_CSV, help="Inbox CSV with an ID column")
+    parser.add_argument("--max-in-flight", type=int, default=AZURE_MAX_IN_FLIGHT,
+                        help="Documents fetched and analyzed concurrently (1 = one at a time)")
+    parser.add_argument("--tps", type=float, default=AZURE_TPS,
+                        help="Transactions per second allowed by the Azure resource (0 = unlimited)")
+    parser.add_argument("--leading-pages", type=int, default=AZURE_LEADING_PAGES,
+                        help="Analyze only pages 1-N first and the rest only if required fields are missing (0 = all pages)")
+    parser.add_argument("--remap-only", action="store_true",
+                        help="Re-run field extraction and mapping on stored Azure analyses without calling DA or Azure")
+    args = parser.parse_args()
+    
+    extractor = MedicalDocumentExtractor(max_in_flight=args.max_in_flight, tps=args.tps,
+                                         leading_pages=args.leading_pages)
+    extractor.process_csv(args.input_csv, OUTPUT_CSV, remap_only=args.remap_only)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -1,12 +1,11 @@
 import os
 import csv
 import json
-import time
 import logging
 from datetime import datetime
 from typing import Dict, Optional, Tuple, List
 
-import requests
+import http_client
 
 ###############################################################################
 # Config – replace the placeholder values below or load them from environment #
@@ -44,7 +43,7 @@ def get_da_token() -> str:
         "password": DA_PASSWORD
     }
     headers = {"Content-Type": "application/x-www-form-urlencoded"}
-    resp = requests.post(DA_TOKEN_URL, data=data, headers=headers, timeout=30)
+    resp = http_client.post(DA_TOKEN_URL, data=data, headers=headers, timeout=30)
     resp.raise_for_status()
     token = resp.json().get("access_token")
     if not token:
@@ -55,7 +54,7 @@ def get_da_token() -> str:
 def da_get(url: str, token: str) -> dict:
     """Helper to GET from DA with bearer token."""
     headers = {"Authorization": f"Bearer {token}"}
-    resp = requests.get(url, headers=headers, timeout=30)
+    resp = http_client.get(url, headers=headers, timeout=30)
     resp.raise_for_status()
     return resp.json()
 
@@ -113,7 +112,7 @@ def create_pg_patient(payload: Dict) -> Tuple[bool, str]:
         "x-api-key": PG_API_KEY
     }
     try:
-        resp = requests.post(PG_CREATE_PATIENT, headers=headers, json=payload, timeout=30)
+        resp = http_client.post(PG_CREATE_PATIENT, headers=headers, json=payload, timeout=30)
         if resp.status_code == 201:
             pid = resp.json().get("id") or "created"
             return True, str(pid)
@@ -159,8 +158,6 @@ def process_failure_sheet():
             row["creation_status"] = "CREATED" if success else "FAILED"
             row["pg_patient_result"] = result
             writer.writerow(row)
-            # Quick pause to respect rate-limits
-            time.sleep(0.3)
 
     print(f"✅ Patient creation run complete. Results saved to {OUTPUT_CSV}")
 
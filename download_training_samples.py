@@ -4,14 +4,14 @@ Download sample medical documents for Azure Document Intelligence training
 """
 import os
 import csv
-import base64
-import requests
 from dotenv import load_dotenv
 
+import document_store
+
 load_dotenv()
 
 AUTH_TOKEN = os.getenv("AUTH_TOKEN", "")
-DA_GETFILE_URL = "https://api.doctoralliance.com/document/getfile?docId.id={doc_id}"
+DA_GETFILE_URL = os.getenv("DA_GETFILE_URL", "https://api.doctoralliance.com/document/getfile?docId.id={doc_id}")
 SAMPLES_DIR = "azure_training_samples"
 
 def fetch_pdf_and_save(doc_id: str, token: str) -> bool:
@@ -21,21 +21,17 @@ def fetch_pdf_and_save(doc_id: str, token: str) -> bool:
         headers = {"Authorization": f"Bearer {token}"}
         
         print(f"Fetching document {doc_id}...")
-        response = requests.get(url, headers=headers, timeout=60)
-        
-        if response.status_code != 200:
-            print(f"Failed to fetch {doc_id}: {response.status_code}")
-            return False
-            
-        payload = response.json().get("value", {})
-        buffer_b64 = payload.get("documentBuffer")
-        
-        if not buffer_b64:
-            print(f"No document buffer for {doc_id}")
+        try:
+            document = document_store.get_store().fetch(doc_id, url, headers)
+        except document_store.DocumentFetchError as e:
+            if e.status_code != 200:
+                print(f"Failed to fetch {doc_id}: {e.status_code}")
+            else:
+                print(f"No document buffer for {doc_id}")
             return False
             
-        # Decode and save PDF
-        pdf_bytes = base64.b64decode(buffer_b64)
+        # Save PDF
+        pdf_bytes = document.pdf_bytes
         file_path = os.path.join(SAMPLES_DIR, f"{doc_id}.pdf")
         
         with open(file_path, "wb") as f:
@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the DA, WAV, Gemini and Azure Document Intelligence APIs.
+
+Lets final_version.py, enhanced_medical_extractor.py / ai_extract_fields.py and the
+PatientCreationBot run end to end on one machine for throughput benchmarking,
+without touching production systems or paying for LLM / Azure calls. PDFs are
+served from azure_training_samples_bulk/ (a document ID without a matching file
+is mapped onto one of the samples deterministically).
+
+Endpoints
+    DA       GET  /document/getfile?docId.id=ID      (also under any prefix, e.g. /api/document/getfile)
+             GET  /document/get?docId.id=ID
+             POST /api/token
+             GET  /api/patient/get?patientId.id=ID    POST /api/patient
+    WAV      GET  /api/Patient/company/pg/{pg_id}     POST /api/Patient/create
+             GET  /api/Patient/get-patient/{id}       POST /api/Order
+    Gemini   POST /v1beta/models/{model}:generateContent
+    Azure    POST /documentintelligence/documentModels/{model}:analyze
+             GET  /documentintelligence/documentModels/{model}/analyzeResults/{id}
+
+Usage:
+    python mock_services.py --port 8765 --da-latency-ms 300 --llm-latency-ms 2500 --error-rate 0.02
+
+Then point the bots at it:
+    DA_API_BASE=http://127.0.0.1:8765 WAV_API_BASE=http://127.0.0.1:8765 \\
+    GEMINI_API_ENDPOINT=http://127.0.0.1:8765 python final_version.py --csv primacare.csv
+    DA_GETFILE_URL='http://127.0.0.1:8765/document/getfile?docId.id={doc_id}' \\
+    AZURE_FORM_ENDPOINT=http://127.0.0.1:8765/ python enhanced_medical_extractor.py input.csv
+    DA_API_BASE_URL=http://127.0.0.1:8765/api DA_API_TOKEN_URL=http://127.0.0.1:8765/api/token \\
+    python main.py                                   (PatientCreationBot)
+"""
+import argparse
+import base64
+import glob
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+try:
+    import fitz  # optional: gives the fake Azure result real document text
+except ImportError:
+    fitz = None
+
+FIRST_NAMES = ["JOHN", "MARY", "ROBERT", "LINDA", "JAMES", "PATRICIA", "DAVID", "BARBARA"]
+LAST_NAMES = ["SMITH", "JOHNSON", "WILLIAMS", "BROWN", "JONES", "GARCIA", "MILLER", "DAVIS"]
+KV_LINE_RE = re.compile(r'^\s*([A-Za-z][A-Za-z .#/()-]{1,40}):\s*(\S.{0,80})$', re.MULTILINE)
+
+
+def _seed(value):
+    return int(hashlib.sha256(str(value).encode("utf-8")).hexdigest()[:12], 16)
+
+
+def fake_patient(seed):
+    rng = random.Random(seed)
+    soc = datetime(2025, 1, 1) + timedelta(days=rng.randrange(300))
+    dob = datetime(1930, 1, 1) + timedelta(days=rng.randrange(25000))
+    return {
+        "patientFName": rng.choice(FIRST_NAMES),
+        "patientLName": rng.choice(LAST_NAMES),
+        "dob": dob.strftime("%m/%d/%Y"),
+        "patientSex": rng.choice(["MALE", "FEMALE"]),
+        "medicalRecordNo": f"MRN{rng.randrange(10**6):06d}",
+        "billingProvider": "", "npi": "", "physicianNPI": f"1{rng.randrange(10**9):09d}",
+        "nameOfAgency": "Mock Home Health", "address": f"{rng.randrange(1, 9999)} Main St",
+        "city": "Springfield", "state": "IL", "zip": f"{rng.randrange(60000, 62999)}",
+        "email": "", "phoneNumber": f"555{rng.randrange(10**7):07d}",
+        "serviceLine": "Home Health", "payorSource": "Medicare",
+        "episodeDiagnoses": [{
+            "startOfCare": soc.strftime("%m/%d/%Y"),
+            "startOfEpisode": soc.strftime("%m/%d/%Y"),
+            "endOfEpisode": (soc + timedelta(days=59)).strftime("%m/%d/%Y"),
+            "firstDiagnosis": "I10", "secondDiagnosis": "E11.9", "thirdDiagnosis": "",
+            "fourthDiagnosis": "", "fifthDiagnosis": "", "sixthDiagnosis": "",
+        }],
+    }
+
+
+def fake_order(seed):
+    patient = fake_patient(seed)
+    episode = patient["episodeDiagnoses"][0]
+    return {
+        "orderNo": f"ORD{random.Random(seed).randrange(10**6):06d}", "orderDate": episode["startOfCare"],
+        "startOfCare": episode["startOfCare"], "episodeStartDate": episode["startOfEpisode"],
+        "episodeEndDate": episode["endOfEpisode"], "documentID": "", "mrn": patient["medicalRecordNo"],
+        "patientName": f"{patient['patientFName']} {patient['patientLName']}",
+        "sentToPhysicianDate": "", "signedByPhysicianDate": "", "patientId": "", "companyId": "",
+        "pgCompanyId": "", "bit64Url": "", "documentName": "", "serviceLine": patient["serviceLine"],
+        "payorSource": patient["payorSource"], "patientSex": patient["patientSex"],
+        "patientAddress": patient["address"], "patientCity": patient["city"], "patientState": patient["state"],
+        "patientZip": patient["zip"], "patientPhone": patient["phoneNumber"],
+        "sentToPhysicianStatus": False, "signedByPhysicianStatus": True,
+    }
+
+
+class MockState:
+    def __init__(self, samples_dir, latency_ms, jitter, error_rate, throttle_rate):
+        self.samples = sorted(glob.glob(os.path.join(samples_dir, "*.pdf")))
+        if not self.samples:
+            raise SystemExit(f"No PDFs found in {samples_dir}")
+        self.latency_ms = latency_ms  # {"da": ms, "wav": ms, "llm": ms, "azure": ms}
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.lock = threading.Lock()
+        self.patients = {}        # patient id -> roster record
+        self.orders = {}          # documentID -> order id
+        self.analyses = {}        # operation id -> analyzeResult
+        self.pdf_cache = {}
+        self.counts = {}
+
+    def pdf_path(self, doc_id):
+        exact = [p for p in self.samples if os.path.splitext(os.path.basename(p))[0] == str(doc_id)]
+        return exact[0] if exact else self.samples[_seed(doc_id) % len(self.samples)]
+
+    def pdf_bytes(self, doc_id):
+        path = self.pdf_path(doc_id)
+        with self.lock:
+            if path not in self.pdf_cache:
+                with open(path, "rb") as f:
+                    self.pdf_cache[path] = f.read()
+            return self.pdf_cache[path]
+
+    def count(self, route):
+        with self.lock:
+            self.counts[route] = self.counts.get(route, 0) + 1
+
+
+def pdf_text(pdf_bytes):
+    if fitz is None:
+        return ""
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as document:
+        return "\n".join(page.get_text() for page in document)
+
+
+def analyze_result(model_id, pdf_bytes):
+    """Minimal AnalyzeResult: document text plus "Label: value" lines as key-value pairs"""
+    content = pdf_text(pdf_bytes)
+    pairs = [
+        {"key": {"content": key.strip()}, "value": {"content": value.strip()}, "confidence": 0.9}
+        for key, value in KV_LINE_RE.findall(content)
+    ]
+    return {
+        "apiVersion": "2024-11-30", "modelId": model_id, "stringIndexType": "textElements",
+        "content": content, "pages": [], "tables": [], "keyValuePairs": pairs, "documents": [],
+    }
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    server_version = "MockServices/1.0"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    # -- plumbing ----------------------------------------------------------
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _json_body(self, raw):
+        if not raw or "json" not in (self.headers.get("Content-Type") or "json"):
+            return {}
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return {}
+
+    def _send(self, status, payload=None, headers=None, raw=None):
+        data = raw if raw is not None else (b"" if payload is None else json.dumps(payload).encode("utf-8"))
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json" if raw is None else "text/plain")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _simulate(self, group):
+        """Apply latency and injected failures; returns True when a failure response was sent"""
+        base = self.state.latency_ms.get(group, 0) / 1000
+        if base > 0:
+            time.sleep(max(0.0, random.uniform(base * (1 - self.state.jitter), base * (1 + self.state.jitter))))
+        roll = random.random()
+        if roll < self.state.throttle_rate:
+            self._send(429, {"error": "mock rate limit"}, {"Retry-After": "1"})
+            return True
+        if roll < self.state.throttle_rate + self.state.error_rate:
+            self._send(503, {"error": "mock injected failure"})
+            return True
+        return False
+
+    def _route(self, method):
+        parts = urlsplit(self.path)
+        path, query = parts.path, parse_qs(parts.query)
+        self.state.count(f"{method} {re.sub(r'/[0-9a-fA-F-]{6,}', '/{id}', path)}")
+
+        # Always drain the body (the DA getfile/get calls send JSON on GET) so keep-alive stays in sync
+        raw = self._body()
+        body = self._json_body(raw)
+
+        if path.endswith("/document/getfile"):
+            return self._da_getfile(query)
+        if path.endswith("/document/get"):
+            return self._da_document(query)
+        if path.endswith("/token") and method == "POST":
+            return self._simulate("da") or self._send(200, {"access_token": "mock-token", "token_type": "bearer", "expires_in": 3600})
+        if path.lower().endswith("/patient/get"):
+            return self._da_patient(query)
+        if path.lower().endswith("/api/patient") and method == "POST":
+            return self._simulate("da") or self._send(200, {"id": str(uuid.uuid4()), **body})
+        match = re.match(r"^/api/Patient/company/pg/([^/]+)$", path)
+        if match:
+            return self._wav_roster()
+        if path == "/api/Patient/create" and method == "POST":
+            return self._wav_create_patient(body)
+        match = re.match(r"^/api/Patient/get-patient/([^/]+)$", path)
+        if match:
+            return self._wav_get_patient(match.group(1))
+        if path == "/api/Order" and method == "POST":
+            return self._wav_order(body)
+        match = re.match(r"^/v1beta/models/([^:]+):generateContent$", path)
+        if match and method == "POST":
+            return self._gemini(match.group(1), body)
+        match = re.match(r"^/documentintelligence/documentModels/([^:/]+):analyze$", path)
+        if match and method == "POST":
+            return self._azure_analyze(match.group(1), raw, body)
+        match = re.match(r"^/documentintelligence/documentModels/([^/]+)/analyzeResults/([^/]+)$", path)
+        if match:
+            return self._azure_result(match.group(2))
+        self._send(404, {"error": f"no mock for {method} {path}"})
+
+    def do_GET(self):
+        self._route("GET")
+
+    def do_POST(self):
+        self._route("POST")
+
+    def do_PUT(self):
+        self._route("PUT")
+
+    # -- DA ----------------------------------------------------------------
+    def _doc_id(self, query):
+        return (query.get("docId.id") or [""])[0]
+
+    def _da_getfile(self, query):
+        if self._simulate("da"):
+            return
+        doc_id = self._doc_id(query)
+        seed = _seed(doc_id)
+        episode = fake_patient(seed)["episodeDiagnoses"][0]
+        self._send(200, {"value": {
+            "documentBuffer": base64.b64encode(self.state.pdf_bytes(doc_id)).decode("ascii"),
+            "patientId": {"id": 100000 + seed % 900000, "externalId": ""},
+            "document": {"status": {"startOfCareDate": episode["startOfCare"],
+                                    "certPeriodFrom": episode["startOfEpisode"],
+                                    "certPeriodTo": episode["endOfEpisode"]}},
+        }})
+
+    def _da_document(self, query):
+        if self._simulate("da"):
+            return
+        signed = datetime(2025, 6, 1) + timedelta(days=_seed(self._doc_id(query)) % 90)
+        self._send(200, {"value": {"documentStatus": "Signed", "physicianSigndate": signed.isoformat()}})
+
+    def _da_patient(self, query):
+        if self._simulate("da"):
+            return
+        patient_id = (query.get("patientId.id") or [""])[0]
+        self._send(200, {"value": {"id": patient_id, **fake_patient(_seed(patient_id))}})
+
+    # -- WAV ---------------------------------------------------------------
+    def _wav_roster(self):
+        if self._simulate("wav"):
+            return
+        with self.state.lock:
+            records = list(self.state.patients.values())
+        self._send(200, records)
+
+    def _wav_create_patient(self, body):
+        if self._simulate("wav"):
+            return
+        patient_id = str(uuid.uuid4())
+        with self.state.lock:
+            self.state.patients[patient_id] = {"id": patient_id, "agencyInfo": body}
+        self._send(201, {"id": patient_id})
+
+    def _wav_get_patient(self, patient_id):
+        if self._simulate("wav"):
+            return
+        with self.state.lock:
+            record = self.state.patients.get(patient_id)
+        self._send(200, record) if record else self._send(404, {"error": "patient not found"})
+
+    def _wav_order(self, body):
+        if self._simulate("wav"):
+            return
+        doc_id = str(body.get("documentID", ""))
+        with self.state.lock:
+            existing = self.state.orders.get(doc_id)
+            if existing is None:
+                self.state.orders[doc_id] = order_id = str(uuid.uuid4())
+        if existing is not None:
+            return self._send(409, {"orderId": existing, "message": "duplicate order"})
+        self._send(201, {"id": order_id})
+
+    # -- Gemini ------------------------------------------------------------
+    def _gemini(self, model, body):
+        if self._simulate("llm"):
+            return
+        texts = [part.get("text", "") for content in body.get("contents", []) for part in content.get("parts", [])]
+        document_text = texts[0] if texts else ""
+        prompt = texts[-1] if texts else ""
+        seed = _seed(document_text)
+        if (body.get("generationConfig") or body.get("generation_config") or {}).get("responseSchema") \
+                or (body.get("generationConfig") or {}).get("response_schema"):
+            result = {"patient": fake_patient(seed), "order": fake_order(seed)}
+        elif '"orderNo"' in prompt and '"patientFName"' not in prompt:
+            result = fake_order(seed)
+        else:
+            result = fake_patient(seed)
+        output = json.dumps(result)
+        prompt_tokens = sum(len(t) for t in texts) // 4
+        self._send(200, {
+            "candidates": [{"content": {"parts": [{"text": output}], "role": "model"},
+                            "finishReason": "STOP", "index": 0}],
+            "usageMetadata": {"promptTokenCount": prompt_tokens, "candidatesTokenCount": len(output) // 4,
+                              "totalTokenCount": prompt_tokens + len(output) // 4},
+            "modelVersion": model,
+        })
+
+    # -- Azure Document Intelligence ---------------------------------------
+    def _azure_analyze(self, model_id, raw, body):
+        pdf_bytes = base64.b64decode(body["base64Source"]) if body.get("base64Source") else raw
+        if self._simulate("azure"):
+            return
+        operation_id = str(uuid.uuid4())
+        with self.state.lock:
+            self.state.analyses[operation_id] = analyze_result(model_id, pdf_bytes)
+        host = self.headers.get("Host", f"127.0.0.1:{self.server.server_address[1]}")
+        location = (f"http://{host}/documentintelligence/documentModels/{model_id}/analyzeResults/"
+                    f"{operation_id}?api-version=2024-11-30")
+        self._send(202, headers={"Operation-Location": location, "Retry-After": "0"})
+
+    def _azure_result(self, operation_id):
+        with self.state.lock:
+            result = self.state.analyses.get(operation_id)
+        if result is None:
+            return self._send(404, {"error": {"code": "NotFound", "message": "unknown analyze operation"}})
+        now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        self._send(200, {"status": "succeeded", "createdDateTime": now, "lastUpdatedDateTime": now,
+                         "analyzeResult": result})
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, state, verbose=False):
+        super().__init__(address, MockHandler)
+        self.state = state
+        self.verbose = verbose
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock of the DA / WAV / Gemini / Azure APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--samples", default="azure_training_samples_bulk", help="Directory of PDFs to serve")
+    parser.add_argument("--da-latency-ms", type=float, default=200)
+    parser.add_argument("--wav-latency-ms", type=float, default=100)
+    parser.add_argument("--llm-latency-ms", type=float, default=2000)
+    parser.add_argument("--azure-latency-ms", type=float, default=3000)
+    parser.add_argument("--jitter", type=float, default=0.3, help="Latency jitter as a fraction of the mean")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    state = MockState(args.samples, {
+        "da": args.da_latency_ms, "wav": args.wav_latency_ms,
+        "llm": args.llm_latency_ms, "azure": args.azure_latency_ms,
+    }, args.jitter, args.error_rate, args.throttle_rate)
+    server = MockServer((args.host, args.port), state, args.verbose)
+    print(f"Mock services on http://{args.host}:{args.port} serving {len(state.samples)} PDFs from {args.samples}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print("Requests served:")
+        for route, count in sorted(state.counts.items()):
+            print(f"  {count:>6}  {route}")
+
+
+if __name__ == "__main__":
+    main()